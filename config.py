@@ -1,19 +1,75 @@
 """CryptoScanner — конфигурация проекта."""
 
+import logging
 import os
 import pathlib
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlencode
 
 from dotenv import load_dotenv
 
-load_dotenv()
 
-# API Keys
-COINDAR_TOKEN: str = os.getenv("COINDAR_ACCESS_TOKEN", "")
-COINGECKO_KEY: str = os.getenv("COINGECKO_API_KEY", "")
-CMC_KEY: str = os.getenv("CMC_API_KEY", "")
-RAPIDAPI_KEY: str = os.getenv("RAPIDAPI_KEY", "")
-CRYPTOPANIC_TOKEN: str = os.getenv("CRYPTOPANIC_TOKEN", "")
-GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+# API Keys — читаются лениво при первом обращении (см. __getattr__ внизу)
+@lru_cache(maxsize=1)
+def load_env() -> None:
+    """Прочитать .env один раз. Вызывать перед прямым os.getenv() ключей."""
+    load_dotenv()
+
+
+@lru_cache(maxsize=1)
+def coindar_token() -> str:
+    load_env()
+    return os.getenv("COINDAR_ACCESS_TOKEN", "")
+
+
+@lru_cache(maxsize=1)
+def coingecko_key() -> str:
+    load_env()
+    return os.getenv("COINGECKO_API_KEY", "")
+
+
+@lru_cache(maxsize=1)
+def cmc_key() -> str:
+    load_env()
+    return os.getenv("CMC_API_KEY", "")
+
+
+@lru_cache(maxsize=1)
+def rapidapi_key() -> str:
+    load_env()
+    return os.getenv("RAPIDAPI_KEY", "")
+
+
+@lru_cache(maxsize=1)
+def cryptopanic_token() -> str:
+    load_env()
+    return os.getenv("CRYPTOPANIC_TOKEN", "")
+
+
+@lru_cache(maxsize=1)
+def groq_api_key() -> str:
+    load_env()
+    return os.getenv("GROQ_API_KEY", "")
+
+
+@lru_cache(maxsize=1)
+def llm_cache_enabled() -> bool:
+    """LLM_CACHE_ENABLED (по умолчанию включён; 0/false/no/off — выключить)."""
+    load_env()
+    return os.getenv("LLM_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+@lru_cache(maxsize=1)
+def parallel_api_key() -> str:
+    """PARALLEL_API_KEY; предупреждение в лог один раз, если не задан."""
+    load_env()
+    key = os.getenv("PARALLEL_API_KEY") or ""
+    if not key:
+        logging.warning("PARALLEL_API_KEY not set — token scanner disabled")
+    return key
+
 
 # Base URLs
 COINDAR_BASE_URL: str = "https://coindar.org/api/v2"
@@ -39,16 +95,35 @@ REQUEST_TIMEOUT: int = 15
 USER_AGENT: str = "CryptoScanner/1.0"
 DEFAULT_DELAY: float = 1.0  # секунд между запросами
 
+# TTL кэша ответов справочных API (services/http_cache.py, таблица http_cache)
+CACHE_TTL_REFERENCE: int = 86400  # списки монет, теги, категории, фьючерсы Binance
+CACHE_TTL_QUOTES: int = 60        # цены и котировки
+CACHE_TTL_NEWS: int = 300         # RSS/ленты новостей между запусками сканера
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Адаптивная задержка: 429 → ×2 (до max_delay), серия 200 → −min_delay."""
+    min_delay: float
+    max_delay: float
+    initial_delay: float
+
+
 # Rate limits для новых источников
-CRYPTOCV_DELAY: float = 2.0       # без ключа, не злоупотреблять
-CRYPTOPANIC_DELAY: float = 2.0    # free tier
-BINANCE_DELAY: float = 2.0        # scraping, осторожно
-GROQ_DELAY: float = 1.0           # ~30 req/min на free
-GOOGLE_NEWS_DELAY: float = 2.0    # RSS, не злоупотреблять
+CRYPTOCV_POLICY = RateLimitPolicy(min_delay=2.0, max_delay=60.0, initial_delay=2.0)      # без ключа
+CRYPTOPANIC_POLICY = RateLimitPolicy(min_delay=2.0, max_delay=60.0, initial_delay=2.0)   # free tier
+BINANCE_POLICY = RateLimitPolicy(min_delay=2.0, max_delay=60.0, initial_delay=2.0)       # scraping
+GROQ_POLICY = RateLimitPolicy(min_delay=1.0, max_delay=30.0, initial_delay=1.0)          # ~30 req/min
+GOOGLE_NEWS_POLICY = RateLimitPolicy(min_delay=2.0, max_delay=60.0, initial_delay=2.0)   # RSS
+
+# Общий на процесс предел по host (services.rate_limit.host_limiter): запросов в полёте
+# на host от всех клиентов и корутин; темп (запросов/сек) — для host без своей policy
+HOST_CONCURRENCY: int = 16
+HOST_RATES: dict[str, float] = {"api.parallel.ai": 5.0}  # 1 / PARALLEL_POLICY.min_delay
 
 # Binance-listed символы для фильтрации
 # Phase 2: автозагрузка через Binance GET /api/v3/exchangeInfo
-BINANCE_SYMBOLS: set[str] = {
+BINANCE_SYMBOLS: frozenset[str] = frozenset(sys.intern(s) for s in {
     "BTC", "ETH", "BNB", "SOL", "XRP", "DOGE", "ADA", "AVAX", "LINK", "DOT",
     "MATIC", "UNI", "ATOM", "LTC", "FIL", "APT", "ARB", "OP", "NEAR", "SUI",
     "INJ", "TIA", "SEI", "RNDR", "FET", "AAVE", "MKR", "SNX", "CRV", "LDO",
@@ -59,7 +134,7 @@ BINANCE_SYMBOLS: set[str] = {
     "ONE", "FLOW", "EGLD", "QNT", "XTZ", "IOTA", "NEO", "ZIL", "KAVA", "CELO",
     "ROSE", "ZEC", "DASH", "EOS", "XLM", "BCH", "ETC", "DYDX", "GMX", "1INCH",
     "BAL", "YFI", "RPL", "SSV", "BLUR", "MAGIC", "AGI", "OCEAN", "ONDO", "TRB",
-}
+})
 
 # Google News RSS — поисковые запросы
 GOOGLE_NEWS_QUERIES: list[str] = [
@@ -72,6 +147,12 @@ GOOGLE_NEWS_QUERIES: list[str] = [
     "token unlock schedule",
     "crypto exchange new coin",
 ]
+# Готовые RSS URL (те же параметры, что GoogleNewsClient._build_url)
+GOOGLE_NEWS_URLS: tuple[str, ...] = tuple(
+    f"{GOOGLE_NEWS_RSS_BASE}?"
+    + urlencode({"q": q, "hl": "en", "gl": "US", "ceid": "US:en"})
+    for q in GOOGLE_NEWS_QUERIES
+)
 MAX_GOOGLE_NEWS_TOTAL: int = 100
 
 # Хардкод маппинга symbol → CoinGecko slug ID для топ-монет
@@ -108,6 +189,7 @@ COINGECKO_ID_MAP: dict[str, str] = {
     "IMX": "immutable-x",
     "STX": "blockstack",
 }
+COINGECKO_ID_MAP = {sys.intern(k): sys.intern(v) for k, v in COINGECKO_ID_MAP.items()}
 
 # Топ DAO для тестирования Snapshot
 SNAPSHOT_SPACES: list[str] = [
@@ -123,24 +205,65 @@ GROQ_OUTCOME_MAX_TOKENS: int = 500
 MAX_AI_OUTCOMES_PER_RUN: int = 20
 
 # === Step 1 v2: Token Scanner ===
-PARALLEL_API_KEY: str = os.getenv("PARALLEL_API_KEY") or ""
 PARALLEL_MAX_RESULTS: int = 5
 PARALLEL_MAX_CHARS: int = 2000
-PARALLEL_DELAY: float = 0.2  # секунд между запросами
+PARALLEL_POLICY = RateLimitPolicy(min_delay=0.2, max_delay=10.0, initial_delay=0.2)
+PARALLEL_CONCURRENCY: int = 8  # search_many: запросов одновременно в полёте
 
-TOP_EXCLUDE: set[str] = {
+TOP_EXCLUDE: frozenset[str] = frozenset({
     "BTC", "ETH", "BNB", "SOL", "XRP", "ADA", "DOGE", "TRX", "TON", "AVAX",
-}
+})
 SCAN_HORIZON_DAYS: int = 7
 MAX_GROQ_CALLS_PER_SCAN: int = 100
+SCAN_CONCURRENCY: int = 8  # scan_all_tokens: токенов в работе одновременно
 
 # === Step 3: Probability Estimator ===
 GROQ_SCANNER_MODEL: str = "llama-3.3-70b-versatile"
 
+# Step 3: не больше N вызовов Groq одновременно (3 температуры × события)
+MAX_CONCURRENT_PROBABILITY_CALLS: int = 6
+
+# Step 4: не больше N вызовов Groq одновременно (3 температуры × события)
+MAX_CONCURRENT_IMPACT_CALLS: int = 6
+IMPACT_BATCH_SIZE: int = 10  # событий в одном вызове estimate_batch_impacts
+
+# Кэш ответов LLM в памяти (services/llm_cache.py); вкл/выкл — env LLM_CACHE_ENABLED
+LLM_CACHE_MAXSIZE: int = 1000  # записей, вытеснение LRU
+LLM_CACHE_TTL: int = 3600      # сек
+
 # === Steps 5-6: Signal Calculator ===
 SIGNAL_THRESHOLD: float = 3.0  # минимальный |E[return]| для сигнала (в %)
 MAX_TOKEN_E_RETURN: float = 15.0  # максимальный |E[return]| на токен (%)
 
-if not PARALLEL_API_KEY:
-    import logging as _logging
-    _logging.warning("PARALLEL_API_KEY not set — token scanner disabled")
+
+# Старые имена ключей (config.GROQ_API_KEY, from config import ...) — PEP 562
+_LAZY_KEYS = {
+    "COINDAR_TOKEN": coindar_token,
+    "COINGECKO_KEY": coingecko_key,
+    "CMC_KEY": cmc_key,
+    "RAPIDAPI_KEY": rapidapi_key,
+    "CRYPTOPANIC_TOKEN": cryptopanic_token,
+    "GROQ_API_KEY": groq_api_key,
+    "PARALLEL_API_KEY": parallel_api_key,
+    "LLM_CACHE_ENABLED": llm_cache_enabled,
+}
+
+# Старые скалярные задержки (config.GROQ_DELAY) → policy.initial_delay
+_LEGACY_DELAYS = {
+    "CRYPTOCV_DELAY": CRYPTOCV_POLICY,
+    "CRYPTOPANIC_DELAY": CRYPTOPANIC_POLICY,
+    "BINANCE_DELAY": BINANCE_POLICY,
+    "GROQ_DELAY": GROQ_POLICY,
+    "GOOGLE_NEWS_DELAY": GOOGLE_NEWS_POLICY,
+    "PARALLEL_DELAY": PARALLEL_POLICY,
+}
+
+
+def __getattr__(name: str):
+    getter = _LAZY_KEYS.get(name)
+    if getter is not None:
+        return getter()
+    policy = _LEGACY_DELAYS.get(name)
+    if policy is not None:
+        return policy.initial_delay
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,29 +2,268 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
 import hashlib
 import json
 import logging
+import os
+import queue
 import re
 import sqlite3
+import threading
+from collections.abc import (AsyncIterator, Awaitable, Callable, Coroutine, Iterable,
+                             Iterator)
+from contextlib import asynccontextmanager, contextmanager
+from itertools import islice
+from typing import Any
 
 import config
 
 logger = logging.getLogger("crypto_scanner.db")
 
 # ---------------------------------------------------------------------------
-# Соединение
+# Соединение: один долгоживущий writer + пул read-only соединений
 # ---------------------------------------------------------------------------
 
-def _connect() -> sqlite3.Connection:
-    """Соединение с Row factory."""
-    conn = sqlite3.connect(str(config.DB_PATH))
+_READER_POOL_SIZE = 4
+_SQL_VAR_LIMIT = 900  # < SQLITE_MAX_VARIABLE_NUMBER (999 в старых сборках)
+_CACHED_STATEMENTS = 256  # кэш подготовленных statement'ов на соединение
+
+# WAL + synchronous=NORMAL: без fsync на каждый COMMIT, crash-safe
+_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA busy_timeout=5000",
+)
+# Для read-only соединений: только то, что не пишет в файл БД
+_READER_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+_writer: sqlite3.Connection | None = None
+_writer_lock = threading.Lock()
+_readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+_readers_opened = 0
+_readers_lock = threading.Lock()
+
+
+def _open_writer() -> sqlite3.Connection:
+    """Writer-соединение. PRAGMA выставляются один раз на всё время жизни.
+    isolation_level=None: транзакции только явные (BEGIN IMMEDIATE в _get_writer)."""
+    conn = sqlite3.connect(
+        str(config.DB_PATH), check_same_thread=False,
+        cached_statements=_CACHED_STATEMENTS, isolation_level=None,
+    )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def _open_reader() -> sqlite3.Connection:
+    """Read-only соединение (mode=ro). Нет файла БД — создаётся пустой
+    отдельным соединением, без _writer_lock: чтение бывает и внутри db_scope()."""
+    if not os.path.exists(config.DB_PATH):
+        sqlite3.connect(str(config.DB_PATH)).close()
+    conn = sqlite3.connect(
+        f"file:{config.DB_PATH}?mode=ro", uri=True, check_same_thread=False,
+        cached_statements=_CACHED_STATEMENTS, isolation_level=None,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in _READER_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+async def apply_pragmas(db) -> None:
+    """Те же PRAGMA для aiosqlite-соединения (один раз после connect)."""
+    for pragma in _PRAGMAS:
+        await db.execute(pragma)
+
+
+@contextmanager
+def _get_writer() -> Iterator[sqlite3.Connection]:
+    """Единственный writer под блокировкой.
+    BEGIN IMMEDIATE … COMMIT вокруг всего блока, ROLLBACK при ошибке."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _open_writer()
+        _writer.execute("BEGIN IMMEDIATE")
+        try:
+            yield _writer
+            _writer.execute("COMMIT")
+        except BaseException:
+            _writer.execute("ROLLBACK")
+            raise
+
+
+@contextmanager
+def _get_reader() -> Iterator[sqlite3.Connection]:
+    """Read-only соединение из пула (до _READER_POOL_SIZE штук)."""
+    global _readers_opened
+    try:
+        conn = _readers.get_nowait()
+    except queue.Empty:
+        with _readers_lock:
+            can_open = _readers_opened < _READER_POOL_SIZE
+            if can_open:
+                _readers_opened += 1
+        if can_open:
+            try:
+                conn = _open_reader()
+            except Exception:
+                with _readers_lock:
+                    _readers_opened -= 1
+                raise
+        else:
+            conn = _readers.get()
+    try:
+        yield conn
+    finally:
+        _readers.put(conn)
+
+
+# Компактный JSON для TEXT-колонок: без пробелов после "," и ":", без \uXXXX
+_json_compact = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+@contextmanager
+def _writer_scope(
+    conn: sqlite3.Connection | None,
+) -> Iterator[sqlite3.Connection]:
+    """Переданное соединение как есть (без BEGIN/COMMIT) или свой _get_writer()."""
+    if conn is not None:
+        yield conn
+    else:
+        with _get_writer() as own:
+            yield own
+
+
+@contextmanager
+def _reader_scope(
+    conn: sqlite3.Connection | None,
+) -> Iterator[sqlite3.Connection]:
+    """Переданное соединение как есть или read-only из пула."""
+    if conn is not None:
+        yield conn
+    else:
+        with _get_reader() as own:
+            yield own
+
+
+@contextmanager
+def db_scope() -> Iterator[sqlite3.Connection]:
+    """Одна транзакция на несколько sync-вызовов (один COMMIT на весь цикл):
+
+        with db_scope() as c:
+            upsert_tags(tags, conn=c)
+            upsert_events(events, conn=c)
+
+    Запись внутри блока — только с conn=c: writer не реентерабелен.
+    Чтение без conn= идёт через пул и видит только закоммиченные данные.
+    """
+    with _get_writer() as conn:
+        yield conn
+
+
+def close_connections() -> None:
+    """Закрыть writer и все read-only соединения пула."""
+    global _writer, _readers_opened
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+    with _readers_lock:
+        while True:
+            try:
+                _readers.get_nowait().close()
+            except queue.Empty:
+                break
+        _readers_opened = 0
+
+
+atexit.register(close_connections)
+
+
+# ---------------------------------------------------------------------------
+# Async: пул aiosqlite-соединений
+# ---------------------------------------------------------------------------
+
+_ASYNC_POOL_SIZE = 4
+_async_idle: list = []  # LIFO: последнее вернувшееся соединение — самое «тёплое»
+
+
+async def _open_async():
+    """aiosqlite-соединение: row_factory и PRAGMA один раз на соединение."""
+    import aiosqlite
+    db = await aiosqlite.connect(str(config.DB_PATH))
+    db.row_factory = sqlite3.Row
+    await apply_pragmas(db)
+    return db
+
+
+@asynccontextmanager
+async def async_connection() -> AsyncIterator:
+    """aiosqlite-соединение из пула (до _ASYNC_POOL_SIZE простаивающих).
+    При исключении соединение закрывается — незакоммиченное откатывается."""
+    db = _async_idle.pop() if _async_idle else await _open_async()
+    ok = False
+    try:
+        yield db
+        ok = True
+    finally:
+        if ok and len(_async_idle) < _ASYNC_POOL_SIZE:
+            _async_idle.append(db)
+        else:
+            await db.close()
+
+
+async def close_async_connections() -> None:
+    """Закрыть все простаивающие aiosqlite-соединения пула."""
+    while _async_idle:
+        await _async_idle.pop().close()
+
+
+_shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+
+
+def on_async_shutdown(hook: Callable[[], Awaitable[None]]) -> None:
+    """Зарегистрировать корутину-функцию, которую run_async вызовет по завершении
+    (закрытие долгоживущих async-ресурсов: httpx-клиенты и т.п.). Повторно — без дублей."""
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
+def run_async(main: Coroutine) -> Any:
+    """asyncio.run(main) на uvloop (если установлен) + on_async_shutdown-хуки
+    и закрытие пула aiosqlite-соединений по завершении."""
+    async def _run():
+        try:
+            return await main
+        finally:
+            for hook in _shutdown_hooks:
+                try:
+                    await hook()
+                except Exception as e:
+                    logger.warning(f"shutdown hook {hook.__qualname__}: {e}")
+            await close_async_connections()
+    try:
+        import uvloop
+    except ImportError:  # Windows / не установлен — стандартный цикл asyncio
+        return asyncio.run(_run())
+    return uvloop.run(_run())
+
+
 # ---------------------------------------------------------------------------
 # Инициализация
 # ---------------------------------------------------------------------------
@@ -43,15 +282,17 @@ _SCHEMA: list[str] = [
         symbol TEXT NOT NULL,
         image_url TEXT
     )""",
-    "CREATE INDEX IF NOT EXISTS idx_cc_symbol ON coins_coindar(symbol)",
+    "DROP INDEX IF EXISTS idx_cc_symbol",
+    "CREATE INDEX IF NOT EXISTS idx_cc_symbol_nocase ON coins_coindar(symbol COLLATE NOCASE)",
 
     # coins_coingecko
     """CREATE TABLE IF NOT EXISTS coins_coingecko (
         id TEXT PRIMARY KEY,
         symbol TEXT NOT NULL,
         name TEXT NOT NULL
-    )""",
-    "CREATE INDEX IF NOT EXISTS idx_cg_symbol ON coins_coingecko(symbol)",
+    ) WITHOUT ROWID""",
+    "DROP INDEX IF EXISTS idx_cg_symbol",
+    "CREATE INDEX IF NOT EXISTS idx_cg_symbol_nocase ON coins_coingecko(symbol COLLATE NOCASE)",
 
     # coins_cmc
     """CREATE TABLE IF NOT EXISTS coins_cmc (
@@ -60,7 +301,8 @@ _SCHEMA: list[str] = [
         name TEXT NOT NULL,
         slug TEXT
     )""",
-    "CREATE INDEX IF NOT EXISTS idx_cmc_symbol ON coins_cmc(symbol)",
+    "DROP INDEX IF EXISTS idx_cmc_symbol",
+    "CREATE INDEX IF NOT EXISTS idx_cmc_symbol_nocase ON coins_cmc(symbol COLLATE NOCASE)",
 
     # events (расширенная: Coindar + AI-parsed + Binance direct)
     """CREATE TABLE IF NOT EXISTS events (
@@ -88,6 +330,14 @@ _SCHEMA: list[str] = [
     "CREATE INDEX IF NOT EXISTS idx_events_date ON events(date_start)",
     "CREATE INDEX IF NOT EXISTS idx_events_type ON events(event_type)",
 
+    # event_tags (events.tags CSV → many-to-many)
+    """CREATE TABLE IF NOT EXISTS event_tags (
+        event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+        tag_id INTEGER NOT NULL,
+        PRIMARY KEY (event_id, tag_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_event_tags_tag ON event_tags(tag_id)",
+
     # raw_news (сырые новости из всех источников)
     """CREATE TABLE IF NOT EXISTS raw_news (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -129,198 +379,255 @@ _SCHEMA: list[str] = [
 ]
 
 
+_SCHEMA_VERSION = 3  # увеличивать при каждом изменении _SCHEMA
+
+# Узкие таблицы с TEXT PK: кластерный B-tree по PK вместо rowid + автоиндекса.
+# INTEGER PRIMARY KEY (tags, coins_*) — и так alias rowid, выгоды нет.
+_WITHOUT_ROWID_TABLES: tuple[str, ...] = ("coins_coingecko",)
+
+
+def _detach_rowid_tables(conn: sqlite3.Connection) -> list[str]:
+    """Миграция: старые rowid-версии _WITHOUT_ROWID_TABLES → _old_<name>.
+    Их индексы удаляются, чтобы _SCHEMA создал их на новой таблице."""
+    detached = []
+    for name in _WITHOUT_ROWID_TABLES:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,),
+        ).fetchone()
+        if row is None or "WITHOUT ROWID" in row[0].upper():
+            continue
+        for (idx,) in conn.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (name,),
+        ).fetchall():
+            conn.execute(f"DROP INDEX {idx}")
+        conn.execute(f"ALTER TABLE {name} RENAME TO _old_{name}")
+        detached.append(name)
+    return detached
+
+
 def init_db() -> None:
-    """Создать ВСЕ таблицы и индексы."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
+    """Создать ВСЕ таблицы и индексы — одной транзакцией.
+    Если PRAGMA user_version уже >= _SCHEMA_VERSION, ничего не делает."""
+    with _get_writer() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            return
+        detached = _detach_rowid_tables(conn)
         for stmt in _SCHEMA:
-            cur.execute(stmt)
-        conn.commit()
-    finally:
-        conn.close()
+            conn.execute(stmt)
+        for name in detached:
+            conn.execute(f"INSERT OR IGNORE INTO {name} SELECT * FROM _old_{name}")
+            conn.execute(f"DROP TABLE _old_{name}")
+        conn.execute(_SQL_FILL_EVENT_TAGS, (0,))  # миграция: CSV → event_tags
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
 
 
 # ---------------------------------------------------------------------------
 # Coindar
 # ---------------------------------------------------------------------------
 
-def upsert_tags(tags: list[dict]) -> int:
+_SQL_UPSERT_TAGS = "INSERT OR REPLACE INTO tags (id, name) VALUES (?, ?)"
+
+
+def upsert_tags(tags: list[dict], *, conn: sqlite3.Connection | None = None) -> int:
     """INSERT OR REPLACE теги. Возвращает кол-во."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        for t in tags:
-            cur.execute(
-                "INSERT OR REPLACE INTO tags (id, name) VALUES (?, ?)",
-                (t["id"], t["name"]),
-            )
-        conn.commit()
+    with _writer_scope(conn) as conn:
+        conn.executemany(
+            _SQL_UPSERT_TAGS,
+            [(t["id"], t["name"]) for t in tags],
+        )
         return len(tags)
-    finally:
-        conn.close()
 
 
-def upsert_coindar_coins(coins: list[dict]) -> int:
+_SQL_UPSERT_COINDAR_COINS = (
+    "INSERT OR REPLACE INTO coins_coindar (id, name, symbol, image_url) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+
+def upsert_coindar_coins(
+    coins: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR REPLACE монеты Coindar. Возвращает кол-во."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        for c in coins:
-            cur.execute(
-                "INSERT OR REPLACE INTO coins_coindar (id, name, symbol, image_url) "
-                "VALUES (?, ?, ?, ?)",
-                (c["id"], c["name"], c["symbol"], c.get("image_url")),
-            )
-        conn.commit()
+    with _writer_scope(conn) as conn:
+        conn.executemany(
+            _SQL_UPSERT_COINDAR_COINS,
+            [(c["id"], c["name"], c["symbol"], c.get("image_url")) for c in coins],
+        )
         return len(coins)
-    finally:
-        conn.close()
 
 
-def upsert_events(events: list[dict]) -> int:
+_SQL_UPSERT_EVENTS = (
+    "INSERT OR IGNORE INTO events "
+    "(caption, source, source_type, source_reliable, important, "
+    "date_public, date_start, date_end, coin_id, coin_symbol, "
+    "coin_price_changes, tags, event_type, importance, news_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# Разбор events.tags ("1,2,3") в event_tags для событий с id > ?
+_SQL_FILL_EVENT_TAGS = """
+WITH RECURSIVE split(event_id, tag_id, rest) AS (
+    SELECT id, '', tags || ',' FROM events WHERE tags IS NOT NULL AND id > ?
+    UNION ALL
+    SELECT event_id,
+           trim(substr(rest, 1, instr(rest, ',') - 1)),
+           substr(rest, instr(rest, ',') + 1)
+    FROM split WHERE rest <> ''
+)
+INSERT OR IGNORE INTO event_tags (event_id, tag_id)
+SELECT event_id, tag_id FROM split WHERE tag_id <> ''
+"""
+
+
+def upsert_events(
+    events: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR IGNORE события. Возвращает кол-во вставленных."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        inserted = 0
-        for e in events:
-            try:
-                cur.execute(
-                    "INSERT OR IGNORE INTO events "
-                    "(caption, source, source_type, source_reliable, important, "
-                    "date_public, date_start, date_end, coin_id, coin_symbol, "
-                    "coin_price_changes, tags, event_type, importance, news_id) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        e["caption"],
-                        e.get("source"),
-                        e.get("source_type", "unknown"),
-                        e.get("source_reliable", 0),
-                        e.get("important", 0),
-                        e.get("date_public"),
-                        e["date_start"],
-                        e.get("date_end"),
-                        e.get("coin_id"),
-                        e.get("coin_symbol"),
-                        e.get("coin_price_changes"),
-                        e.get("tags"),
-                        e.get("event_type"),
-                        e.get("importance", "medium"),
-                        e.get("news_id"),
-                    ),
-                )
-                if cur.rowcount > 0:
-                    inserted += 1
-            except sqlite3.IntegrityError:
-                pass
-        conn.commit()
+    rows = [
+        (
+            e["caption"],
+            e.get("source"),
+            e.get("source_type", "unknown"),
+            e.get("source_reliable", 0),
+            e.get("important", 0),
+            e.get("date_public"),
+            e["date_start"],
+            e.get("date_end"),
+            e.get("coin_id"),
+            e.get("coin_symbol"),
+            e.get("coin_price_changes"),
+            e.get("tags"),
+            e.get("event_type"),
+            e.get("importance", "medium"),
+            e.get("news_id"),
+        )
+        for e in events
+    ]
+    with _writer_scope(conn) as conn:
+        # AUTOINCREMENT: все новые id > max_id
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        before = conn.total_changes
+        conn.executemany(_SQL_UPSERT_EVENTS, rows)
+        inserted = conn.total_changes - before
+        if inserted:
+            conn.execute(_SQL_FILL_EVENT_TAGS, (max_id,))
         return inserted
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # CoinGecko
 # ---------------------------------------------------------------------------
 
-def upsert_coingecko_coins(coins: list[dict]) -> int:
+_SQL_UPSERT_COINGECKO_COINS = (
+    "INSERT OR REPLACE INTO coins_coingecko (id, symbol, name) VALUES (?, ?, ?)"
+)
+
+
+def upsert_coingecko_coins(
+    coins: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR REPLACE монеты CoinGecko. Возвращает кол-во."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        for c in coins:
-            cur.execute(
-                "INSERT OR REPLACE INTO coins_coingecko (id, symbol, name) "
-                "VALUES (?, ?, ?)",
-                (c["id"], c["symbol"], c["name"]),
-            )
-        conn.commit()
+    with _writer_scope(conn) as conn:
+        conn.executemany(
+            _SQL_UPSERT_COINGECKO_COINS,
+            [(c["id"], c["symbol"], c["name"]) for c in coins],
+        )
         return len(coins)
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # CoinMarketCap
 # ---------------------------------------------------------------------------
 
-def upsert_cmc_coins(coins: list[dict]) -> int:
+_SQL_UPSERT_CMC_COINS = (
+    "INSERT OR REPLACE INTO coins_cmc (id, symbol, name, slug) VALUES (?, ?, ?, ?)"
+)
+
+
+def upsert_cmc_coins(
+    coins: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR REPLACE монеты CMC. Возвращает кол-во."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        for c in coins:
-            cur.execute(
-                "INSERT OR REPLACE INTO coins_cmc (id, symbol, name, slug) "
-                "VALUES (?, ?, ?, ?)",
-                (c["id"], c["symbol"], c["name"], c.get("slug")),
-            )
-        conn.commit()
+    with _writer_scope(conn) as conn:
+        conn.executemany(
+            _SQL_UPSERT_CMC_COINS,
+            [(c["id"], c["symbol"], c["name"], c.get("slug")) for c in coins],
+        )
         return len(coins)
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # Snapshot
 # ---------------------------------------------------------------------------
 
-def upsert_proposals(proposals: list[dict]) -> int:
+_SQL_UPSERT_PROPOSALS = (
+    "INSERT OR REPLACE INTO proposals "
+    "(id, title, space_id, space_name, choices, scores, "
+    "scores_total, votes, state, start_ts, end_ts) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def upsert_proposals(
+    proposals: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR REPLACE proposals. Возвращает кол-во."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        for p in proposals:
-            choices_json = json.dumps(p.get("choices", []), ensure_ascii=False)
-            scores_json = json.dumps(p.get("scores", []), ensure_ascii=False)
-            cur.execute(
-                "INSERT OR REPLACE INTO proposals "
-                "(id, title, space_id, space_name, choices, scores, "
-                "scores_total, votes, state, start_ts, end_ts) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    with _writer_scope(conn) as conn:
+        conn.executemany(
+            _SQL_UPSERT_PROPOSALS,
+            [
                 (
                     p["id"],
                     p["title"],
                     p["space_id"],
                     p.get("space_name"),
-                    choices_json,
-                    scores_json,
+                    _json_compact(p.get("choices", [])),
+                    _json_compact(p.get("scores", [])),
                     p.get("scores_total"),
                     p.get("votes"),
                     p.get("state"),
                     p.get("start_ts"),
                     p.get("end_ts"),
-                ),
-            )
-        conn.commit()
+                )
+                for p in proposals
+            ],
+        )
         return len(proposals)
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # Lookups
 # ---------------------------------------------------------------------------
 
-def get_coin_id_by_symbol(table: str, symbol: str) -> int | str | None:
+def get_coin_id_by_symbol(
+    table: str, symbol: str, *, conn: sqlite3.Connection | None = None
+) -> int | str | None:
     """Получить id монеты по символу из указанной таблицы."""
     allowed = {"coins_coindar", "coins_coingecko", "coins_cmc"}
     if table not in allowed:
         raise ValueError(f"Недопустимая таблица: {table}")
-    conn = _connect()
-    try:
+    with _reader_scope(conn) as conn:
         row = conn.execute(
-            f"SELECT id FROM {table} WHERE UPPER(symbol) = UPPER(?) LIMIT 1",
+            f"SELECT id FROM {table} WHERE symbol = ? COLLATE NOCASE LIMIT 1",
             (symbol,),
         ).fetchone()
         return row["id"] if row else None
-    finally:
-        conn.close()
+
+
+def _chunked(items: Iterable, size: int = _SQL_VAR_LIMIT) -> Iterator[tuple]:
+    """Режет items на кортежи не длиннее size — для IN (?,?,...)."""
+    it = iter(items)
+    while chunk := tuple(islice(it, size)):
+        yield chunk
 
 
 def get_coins_by_symbols(
-    table: str, symbols: set[str]
+    table: str, symbols: set[str] | frozenset[str],
+    *, conn: sqlite3.Connection | None = None,
 ) -> dict[str, int | str]:
     """Маппинг symbol → id для набора символов."""
     allowed = {"coins_coindar", "coins_coingecko", "coins_cmc"}
@@ -328,101 +635,94 @@ def get_coins_by_symbols(
         raise ValueError(f"Недопустимая таблица: {table}")
     if not symbols:
         return {}
-    conn = _connect()
-    try:
-        placeholders = ",".join("?" for _ in symbols)
-        upper_symbols = [s.upper() for s in symbols]
-        rows = conn.execute(
-            f"SELECT id, symbol FROM {table} WHERE UPPER(symbol) IN ({placeholders})",
-            upper_symbols,
-        ).fetchall()
-        return {row["symbol"].upper(): row["id"] for row in rows}
-    finally:
-        conn.close()
+    result: dict[str, int | str] = {}
+    with _reader_scope(conn) as conn:
+        for chunk in _chunked(symbols):
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, symbol FROM {table} "
+                f"WHERE symbol COLLATE NOCASE IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            result.update((row["symbol"].upper(), row["id"]) for row in rows)
+    return result
 
 
 # ---------------------------------------------------------------------------
 # Stats
 # ---------------------------------------------------------------------------
 
-def get_events_stats(binance_coin_ids: set[int]) -> dict:
+_SQL_TOP_TAGS = """
+SELECT et.tag_id, t.name, COUNT(*) AS cnt
+FROM event_tags et
+LEFT JOIN tags t ON t.id = et.tag_id
+GROUP BY et.tag_id
+ORDER BY cnt DESC
+LIMIT 5
+"""
+
+
+def get_events_stats(
+    binance_coin_ids: set[int], *, conn: sqlite3.Connection | None = None
+) -> dict:
     """Статистика событий: всего, binance, reliable, important, top_tags, top_coins."""
-    conn = _connect()
-    try:
-        total = conn.execute("SELECT COUNT(*) AS c FROM events").fetchone()["c"]
-        reliable = conn.execute(
-            "SELECT COUNT(*) AS c FROM events WHERE source_reliable = 1"
-        ).fetchone()["c"]
-        important = conn.execute(
-            "SELECT COUNT(*) AS c FROM events WHERE important = 1"
-        ).fetchone()["c"]
+    with _reader_scope(conn) as conn:
+        counts = conn.execute(
+            "SELECT COUNT(*) AS total, "
+            "COALESCE(SUM(source_reliable = 1), 0) AS reliable, "
+            "COALESCE(SUM(important = 1), 0) AS important "
+            "FROM events"
+        ).fetchone()
 
         binance_count = 0
         if binance_coin_ids:
-            placeholders = ",".join("?" for _ in binance_coin_ids)
-            binance_count = conn.execute(
-                f"SELECT COUNT(*) AS c FROM events WHERE coin_id IN ({placeholders})",
-                list(binance_coin_ids),
-            ).fetchone()["c"]
-
-        # top tags — считаем в Python через разбор CSV
-        rows = conn.execute("SELECT tags FROM events WHERE tags IS NOT NULL").fetchall()
-        from collections import Counter
-        tag_counter: Counter[str] = Counter()
-        for row in rows:
-            for tag_id in str(row["tags"]).split(","):
-                tag_id = tag_id.strip()
-                if tag_id:
-                    tag_counter[tag_id] += 1
-
-        # маппинг tag id → name
-        tag_names: dict[str, str] = {}
-        for trow in conn.execute("SELECT id, name FROM tags").fetchall():
-            tag_names[str(trow["id"])] = trow["name"]
-
+            for chunk in _chunked(binance_coin_ids):
+                placeholders = ",".join("?" * len(chunk))
+                binance_count += conn.execute(
+                    f"SELECT COUNT(*) AS c FROM events WHERE coin_id IN ({placeholders})",
+                    chunk,
+                ).fetchone()["c"]
+
+        # top tags — из event_tags по индексу, имена подтягиваются JOIN'ом
         top_tags = [
-            {"id": tid, "name": tag_names.get(tid, f"tag_{tid}"), "count": cnt}
-            for tid, cnt in tag_counter.most_common(5)
+            {
+                "id": str(r["tag_id"]),
+                "name": r["name"] if r["name"] is not None else f"tag_{r['tag_id']}",
+                "count": r["cnt"],
+            }
+            for r in conn.execute(_SQL_TOP_TAGS).fetchall()
         ]
 
-        # top coins
+        # top coins — символ и имя одним JOIN вместо запроса на каждую монету
         top_coins_rows = conn.execute(
-            "SELECT coin_id, COUNT(*) AS cnt FROM events "
-            "WHERE coin_id IS NOT NULL GROUP BY coin_id ORDER BY cnt DESC LIMIT 5"
+            "SELECT e.coin_id, c.symbol, c.name, COUNT(*) AS cnt FROM events e "
+            "LEFT JOIN coins_coindar c ON c.id = e.coin_id "
+            "WHERE e.coin_id IS NOT NULL GROUP BY e.coin_id ORDER BY cnt DESC LIMIT 5"
         ).fetchall()
         top_coins = []
         for r in top_coins_rows:
             cid = r["coin_id"]
-            crow = conn.execute(
-                "SELECT symbol, name FROM coins_coindar WHERE id = ?", (cid,)
-            ).fetchone()
-            symbol = crow["symbol"] if crow else str(cid)
-            name = crow["name"] if crow else "?"
-            on_binance = cid in binance_coin_ids
             top_coins.append({
                 "coin_id": cid,
-                "symbol": symbol,
-                "name": name,
+                "symbol": r["symbol"] if r["symbol"] is not None else str(cid),
+                "name": r["name"] if r["name"] is not None else "?",
                 "count": r["cnt"],
-                "binance": on_binance,
+                "binance": cid in binance_coin_ids,
             })
 
         return {
-            "total": total,
+            "total": counts["total"],
             "binance": binance_count,
-            "reliable": reliable,
-            "important": important,
+            "reliable": counts["reliable"],
+            "important": counts["important"],
             "top_tags": top_tags,
             "top_coins": top_coins,
         }
-    finally:
-        conn.close()
 
 
-def get_proposals_stats() -> dict:
+def get_proposals_stats(*, conn: sqlite3.Connection | None = None) -> dict:
     """Статистика proposals: всего активных, по DAO."""
-    conn = _connect()
-    try:
+    with _reader_scope(conn) as conn:
         active = conn.execute(
             "SELECT COUNT(*) AS c FROM proposals WHERE state = 'active'"
         ).fetchone()["c"]
@@ -444,89 +744,80 @@ def get_proposals_stats() -> dict:
         ]
 
         return {"active": active, "by_dao": dao_list}
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
 # Raw News
 # ---------------------------------------------------------------------------
 
-def upsert_raw_news(news_items: list[dict]) -> int:
+_SQL_UPSERT_RAW_NEWS = (
+    "INSERT OR IGNORE INTO raw_news "
+    "(source, title, url, published_at, tickers, domain, "
+    "sentiment, votes_positive, votes_important, raw_json) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def upsert_raw_news(
+    news_items: list[dict], *, conn: sqlite3.Connection | None = None
+) -> int:
     """INSERT OR IGNORE в raw_news. Возвращает кол-во новых."""
-    conn = _connect()
-    try:
-        cur = conn.cursor()
-        inserted = 0
-        for n in news_items:
-            try:
-                raw_json_str = json.dumps(n.get("raw_json", {}), ensure_ascii=False)
-                cur.execute(
-                    "INSERT OR IGNORE INTO raw_news "
-                    "(source, title, url, published_at, tickers, domain, "
-                    "sentiment, votes_positive, votes_important, raw_json) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        n["source"],
-                        n["title"],
-                        n.get("url"),
-                        n.get("published_at"),
-                        n.get("tickers", ""),
-                        n.get("domain"),
-                        n.get("sentiment"),
-                        n.get("votes_positive", 0),
-                        n.get("votes_important", 0),
-                        raw_json_str,
-                    ),
-                )
-                if cur.rowcount > 0:
-                    inserted += 1
-            except sqlite3.IntegrityError:
-                pass
-        conn.commit()
-        return inserted
-    finally:
-        conn.close()
+    rows = [
+        (
+            n["source"],
+            n["title"],
+            n.get("url"),
+            n.get("published_at"),
+            n.get("tickers", ""),
+            n.get("domain"),
+            n.get("sentiment"),
+            n.get("votes_positive", 0),
+            n.get("votes_important", 0),
+            _json_compact(n.get("raw_json", {})),
+        )
+        for n in news_items
+    ]
+    with _writer_scope(conn) as conn:
+        before = conn.total_changes
+        conn.executemany(_SQL_UPSERT_RAW_NEWS, rows)
+        return conn.total_changes - before
 
 
-def get_unprocessed_news(limit: int = 50) -> list[dict]:
+def get_unprocessed_news(
+    limit: int = 50, *, conn: sqlite3.Connection | None = None
+) -> list[dict]:
     """SELECT * FROM raw_news WHERE processed = 0."""
-    conn = _connect()
-    try:
+    with _reader_scope(conn) as conn:
         rows = conn.execute(
             "SELECT * FROM raw_news WHERE processed = 0 "
             "ORDER BY fetched_at LIMIT ?",
             (limit,),
         ).fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
 
 
-def mark_news_processed(news_ids: list[int]) -> None:
+def mark_news_processed(
+    news_ids: list[int], *, conn: sqlite3.Connection | None = None
+) -> None:
     """UPDATE raw_news SET processed = 1 WHERE id IN (...)."""
     if not news_ids:
         return
-    conn = _connect()
-    try:
-        placeholders = ",".join("?" for _ in news_ids)
-        conn.execute(
-            f"UPDATE raw_news SET processed = 1 WHERE id IN ({placeholders})",
-            news_ids,
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    with _writer_scope(conn) as conn:
+        for chunk in _chunked(news_ids):
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(
+                f"UPDATE raw_news SET processed = 1 WHERE id IN ({placeholders})",
+                chunk,
+            )
 
 
 # ---------------------------------------------------------------------------
 # News Stats
 # ---------------------------------------------------------------------------
 
-def get_news_stats() -> dict:
+def get_news_stats(*, conn: sqlite3.Connection | None = None) -> dict:
     """Статистика: кол-во по source, processed vs unprocessed."""
-    conn = _connect()
-    try:
+    with _reader_scope(conn) as conn:
         total = conn.execute("SELECT COUNT(*) AS c FROM raw_news").fetchone()["c"]
         processed = conn.execute(
             "SELECT COUNT(*) AS c FROM raw_news WHERE processed = 1"
@@ -543,21 +834,16 @@ def get_news_stats() -> dict:
             "unprocessed": total - processed,
             "by_source": sources,
         }
-    finally:
-        conn.close()
 
 
-def get_events_by_type() -> dict:
+def get_events_by_type(*, conn: sqlite3.Connection | None = None) -> dict:
     """Группировка событий по event_type."""
-    conn = _connect()
-    try:
+    with _reader_scope(conn) as conn:
         rows = conn.execute(
             "SELECT event_type, COUNT(*) AS cnt FROM events "
             "WHERE event_type IS NOT NULL GROUP BY event_type ORDER BY cnt DESC"
         ).fetchall()
         return {r["event_type"]: r["cnt"] for r in rows}
-    finally:
-        conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -577,15 +863,22 @@ async def ensure_outcome_tables(db) -> None:
             source TEXT,
             source_name TEXT,
             created_at TEXT DEFAULT (datetime('now')),
-            outcomes_generated BOOLEAN DEFAULT 0
+            outcomes_generated BOOLEAN DEFAULT 0,
+            normalized_title TEXT,
+            norm_word_count INTEGER
         )
     """)
+    await _ensure_normalized_title(db)
     await db.execute(
         "CREATE INDEX IF NOT EXISTS idx_ev2_type ON events_v2(event_type)"
     )
     await db.execute(
         "CREATE INDEX IF NOT EXISTS idx_ev2_coin ON events_v2(coin_symbol)"
     )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ev2_dedup "
+        "ON events_v2(coin_symbol, event_type, norm_word_count)"
+    )
     await db.execute("""
         CREATE TABLE IF NOT EXISTS event_outcomes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -607,15 +900,41 @@ async def ensure_outcome_tables(db) -> None:
     await db.commit()
 
 
-_DATE_RE = re.compile(
+# Даты и числа/$/% удаляются одним проходом (дата в альтернативе первой —
+# тот же порядок, что был у двух последовательных sub), затем пунктуация.
+# Пробелы схлопывает split().
+_DATE_NUM_RE = re.compile(
     r"\b(?:"
     r"\d{4}[-/]\d{1,2}[-/]\d{1,2}"
     r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*\s+\d{1,2}"
     r"|\d{1,2}/\d{1,2}/\d{4}"
-    r")\b", re.IGNORECASE)
-_NUM_RE = re.compile(r"[+\-]?\$?\d[\d,.]*[%$BMKbmk]?")
-_PUNCT_RE = re.compile(r"[^\w\s]")
-_MULTI_SPACE = re.compile(r"\s+")
+    r")\b"
+    r"|[+\-]?\$?\d[\d,.]*[%$BMKbmk]?", re.IGNORECASE)
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+
+
+async def _ensure_normalized_title(db) -> None:
+    """Миграция старых БД: колонки normalized_title/norm_word_count + backfill."""
+    cursor = await db.execute("PRAGMA table_info(events_v2)")
+    existing = {row[1] for row in await cursor.fetchall()}
+    if "normalized_title" not in existing:
+        await db.execute("ALTER TABLE events_v2 ADD COLUMN normalized_title TEXT")
+    if "norm_word_count" not in existing:
+        await db.execute("ALTER TABLE events_v2 ADD COLUMN norm_word_count INTEGER")
+    cursor = await db.execute(
+        "SELECT id, title FROM events_v2 WHERE normalized_title IS NULL"
+    )
+    rows = await cursor.fetchall()
+    if rows:
+        updates = []
+        for row in rows:
+            norm = normalize_event_title(row[1])
+            updates.append((norm, len(set(norm.split())), row[0]))
+        await db.executemany(
+            "UPDATE events_v2 SET normalized_title = ?, norm_word_count = ? "
+            "WHERE id = ?",
+            updates,
+        )
 
 
 def normalize_event_title(title: str) -> str:
@@ -624,11 +943,7 @@ def normalize_event_title(title: str) -> str:
     1. lowercase  2. убрать даты  3. убрать числа/$/%
     4. убрать пунктуацию  5. отсортировать слова
     """
-    t = title.lower()
-    t = _DATE_RE.sub("", t)
-    t = _NUM_RE.sub("", t)
-    t = _PUNCT_RE.sub(" ", t)
-    t = _MULTI_SPACE.sub(" ", t).strip()
+    t = _PUNCT_RE.sub(" ", _DATE_NUM_RE.sub("", title.lower()))
     return " ".join(sorted(t.split()))
 
 
@@ -638,21 +953,28 @@ async def find_similar_event(db, coin_symbol: str, event_type: str,
 
     Критерии: тот же coin_symbol + event_type, совпадение >=60% слов
     в нормализованных заголовках, дата +/-3 дня (если обе есть).
+    Overlap >= 0.6 возможен только при 0.6 <= n_ex/n_new <= 1/0.6 —
+    кандидаты отсекаются по norm_word_count в SQL (индекс idx_ev2_dedup).
+    Пересечение считается битсетом: каждому слову нового заголовка свой бит,
+    |A & B| = popcount OR-маски слов кандидата.
     """
-    cursor = await db.execute(
-        "SELECT title, date_event FROM events_v2 "
-        "WHERE coin_symbol = ? AND event_type = ?",
-        (coin_symbol, event_type),
-    )
-    rows = await cursor.fetchall()
     words_new = set(normalize_event_title(title).split())
     if not words_new:
         return False
+    n_new = len(words_new)
+    word_bits = {w: 1 << i for i, w in enumerate(words_new)}.get
+    cursor = await db.execute(
+        "SELECT normalized_title, norm_word_count, date_event FROM events_v2 "
+        "WHERE coin_symbol = ? AND event_type = ? "
+        "AND norm_word_count * 5 >= ? AND norm_word_count * 3 <= ?",
+        (coin_symbol, event_type, n_new * 3, n_new * 5),
+    )
+    rows = await cursor.fetchall()
     for row in rows:
-        words_ex = set(normalize_event_title(row["title"]).split())
-        if not words_ex:
-            continue
-        overlap = len(words_new & words_ex) / max(len(words_new), len(words_ex))
+        mask = 0
+        for w in row["normalized_title"].split():
+            mask |= word_bits(w, 0)
+        overlap = mask.bit_count() / max(n_new, row["norm_word_count"])
         if overlap >= 0.6:
             if date_event and row["date_event"]:
                 try:
@@ -668,9 +990,9 @@ async def find_similar_event(db, coin_symbol: str, event_type: str,
 
 
 def make_event_id(coin_symbol: str, event_type: str, title: str) -> str:
-    """MD5 хэш для дедупликации событий."""
+    """BLAKE2b-128 хэш для дедупликации событий (32 hex, как раньше у MD5)."""
     raw = coin_symbol.lower() + event_type + title.lower().strip()
-    return hashlib.md5(raw.encode()).hexdigest()
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
 
 
 async def save_event(db, event: dict) -> str | None:
@@ -686,11 +1008,13 @@ async def save_event(db, event: dict) -> str | None:
     event_id = make_event_id(
         event["coin_symbol"], event["event_type"], event["title"]
     )
-    await db.execute(
-        """INSERT OR IGNORE INTO events_v2
+    norm = normalize_event_title(event["title"])
+    cursor = await db.execute(
+        """INSERT INTO events_v2
            (id, coin_symbol, event_type, title, date_event,
-            importance, source, source_name)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            importance, source, source_name, normalized_title, norm_word_count)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(id) DO NOTHING RETURNING id""",
         (
             event_id,
             event["coin_symbol"],
@@ -700,9 +1024,15 @@ async def save_event(db, event: dict) -> str | None:
             event.get("importance", "medium"),
             event.get("source"),
             event.get("source_name"),
+            norm,
+            len(set(norm.split())),
         ),
     )
+    row = await cursor.fetchone()
     await db.commit()
+    if row is None:
+        logger.info("Exact duplicate skipped: %s", event["title"])
+        return None
     return event_id
 
 
@@ -717,25 +1047,27 @@ async def get_unprocessed_events(db, limit: int = 50) -> list:
     return [dict(row) for row in rows]
 
 
+_SQL_INSERT_OUTCOMES = """INSERT INTO event_outcomes
+   (event_id, outcome_key, outcome_text, outcome_category, is_template)
+   VALUES (?, ?, ?, ?, ?)"""
+
+
 async def save_outcomes(db, event_id: str, outcomes: list) -> None:
     """Сохранить исходы. Удаляет старые перед вставкой (чистая перегенерация)."""
     await db.execute(
         "DELETE FROM event_outcomes WHERE event_id = ?", (event_id,)
     )
-    for o in outcomes:
-        text = o["text"][:100]
-        await db.execute(
-            """INSERT INTO event_outcomes
-               (event_id, outcome_key, outcome_text, outcome_category, is_template)
-               VALUES (?, ?, ?, ?, ?)""",
-            (
-                event_id,
-                o["key"],
-                text,
-                o["category"],
-                1 if o.get("is_template", True) else 0,
-            ),
+    rows = [
+        (
+            event_id,
+            o["key"],
+            o["text"][:100],
+            o["category"],
+            1 if o.get("is_template", True) else 0,
         )
+        for o in outcomes
+    ]
+    await db.executemany(_SQL_INSERT_OUTCOMES, rows)
     await db.execute(
         "UPDATE events_v2 SET outcomes_generated = 1 WHERE id = ?",
         (event_id,),
@@ -770,14 +1102,37 @@ async def count_events_by_token(db) -> list:
 # Async: probability estimator (Step 3)
 # ---------------------------------------------------------------------------
 
-async def ensure_probability_columns(db) -> None:
-    """Добавить колонки probability если их нет. Idempotent."""
-    for col in ["probability REAL", "probability_low REAL", "probability_high REAL"]:
-        col_name = col.split()[0]
-        try:
-            await db.execute(f"SELECT {col_name} FROM event_outcomes LIMIT 1")
-        except Exception:
-            await db.execute(f"ALTER TABLE event_outcomes ADD COLUMN {col}")
+_OUTCOME_EXTRA_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("probability", "REAL"),
+    ("probability_low", "REAL"),
+    ("probability_high", "REAL"),
+    ("price_impact_pct", "REAL"),
+    ("price_impact_low", "REAL"),
+    ("price_impact_high", "REAL"),
+)
+
+
+async def ensure_outcome_extra_columns(db) -> None:
+    """Добавить колонки probability / price_impact если их нет. Idempotent.
+    Вызывать один раз при старте (Шаги 3-4)."""
+    cursor = await db.execute("PRAGMA table_info(event_outcomes)")
+    existing = {row[1] for row in await cursor.fetchall()}
+    for name, col_type in _OUTCOME_EXTRA_COLUMNS:
+        if name not in existing:
+            await db.execute(
+                f"ALTER TABLE event_outcomes ADD COLUMN {name} {col_type}"
+            )
+    # Частичный индекс только по незаполненным исходам — для anti-join
+    # в get_events_with_complete_data. ANALYZE один раз после создания.
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_eo_incomplete'"
+    )
+    if await cursor.fetchone() is None:
+        await db.execute(
+            "CREATE INDEX idx_eo_incomplete ON event_outcomes(event_id) "
+            "WHERE probability IS NULL OR price_impact_pct IS NULL"
+        )
+        await db.execute("ANALYZE event_outcomes")
     await db.commit()
 
 
@@ -820,18 +1175,6 @@ async def update_outcome_probability(db, event_id: str, outcome_key: str,
 # Async: impact estimator (Step 4)
 # ---------------------------------------------------------------------------
 
-async def ensure_impact_columns(db) -> None:
-    """Добавить колонки price_impact если их нет. Idempotent."""
-    for col in ["price_impact_pct REAL", "price_impact_low REAL",
-                "price_impact_high REAL"]:
-        col_name = col.split()[0]
-        try:
-            await db.execute(f"SELECT {col_name} FROM event_outcomes LIMIT 1")
-        except Exception:
-            await db.execute(f"ALTER TABLE event_outcomes ADD COLUMN {col}")
-    await db.commit()
-
-
 async def get_events_without_impacts(db, limit: int = 50) -> list[dict]:
     """События с вероятностями но без оценки влияния на цену."""
     cursor = await db.execute(
@@ -862,21 +1205,83 @@ async def update_outcome_impact(db, event_id: str, outcome_key: str,
 # Async: signal calculator (Steps 5-6)
 # ---------------------------------------------------------------------------
 
+# Anti-join: eo2 — любой незаполненный исход события (поиск по idx_eo_incomplete)
+_SQL_EVENTS_COMPLETE = (
+    "SELECT e.*, eo.outcome_key, eo.outcome_text, eo.outcome_category, "
+    "eo.probability, eo.probability_low, eo.probability_high, "
+    "eo.price_impact_pct, eo.price_impact_low, eo.price_impact_high "
+    "FROM events_v2 e "
+    "JOIN event_outcomes eo ON e.id = eo.event_id "
+    "LEFT JOIN event_outcomes eo2 ON eo2.event_id = e.id "
+    "AND (eo2.probability IS NULL OR eo2.price_impact_pct IS NULL) "
+    "WHERE eo.probability IS NOT NULL AND eo.price_impact_pct IS NOT NULL "
+    "AND eo2.event_id IS NULL "
+    "ORDER BY e.coin_symbol, e.created_at DESC "
+    "LIMIT ?"
+)
+
+
+async def iter_events_with_complete_data(db, limit: int = 50) -> AsyncIterator:
+    """То же, что get_events_with_complete_data, но строки отдаются по мере
+    чтения курсора (aiosqlite fetchmany-пачками) — без списка всех строк."""
+    async with db.execute(_SQL_EVENTS_COMPLETE, (limit,)) as cursor:
+        async for row in cursor:
+            yield row
+
+
 async def get_events_with_complete_data(db, limit: int = 50) -> list:
     """События у которых ВСЕ outcomes имеют probability И price_impact_pct."""
+    cursor = await db.execute(_SQL_EVENTS_COMPLETE, (limit,))
+    return await cursor.fetchall()
+
+
+# ---------------------------------------------------------------------------
+# Async: TTL-кэш ответов справочных API (services/http_cache.py)
+# ---------------------------------------------------------------------------
+
+async def ensure_http_cache_table(db) -> None:
+    """Создать таблицу http_cache если не существует."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            key TEXT PRIMARY KEY,
+            endpoint TEXT NOT NULL,
+            body TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_http_cache_endpoint ON http_cache(endpoint)"
+    )
+    await db.commit()
+
+
+async def get_http_cache(db, key: str, now: float) -> str | None:
+    """JSON-тело по ключу, если запись не истекла. Иначе None."""
     cursor = await db.execute(
-        "SELECT e.*, eo.outcome_key, eo.outcome_text, eo.outcome_category, "
-        "eo.probability, eo.probability_low, eo.probability_high, "
-        "eo.price_impact_pct, eo.price_impact_low, eo.price_impact_high "
-        "FROM events_v2 e "
-        "JOIN event_outcomes eo ON e.id = eo.event_id "
-        "WHERE eo.probability IS NOT NULL AND eo.price_impact_pct IS NOT NULL "
-        "AND e.id NOT IN ("
-        "  SELECT event_id FROM event_outcomes "
-        "  WHERE probability IS NULL OR price_impact_pct IS NULL"
-        ") "
-        "ORDER BY e.coin_symbol, e.created_at DESC "
-        "LIMIT ?",
-        (limit,),
+        "SELECT body FROM http_cache WHERE key = ? AND expires_at > ?", (key, now)
     )
-    return await cursor.fetchall()
+    row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+async def put_http_cache(db, key: str, endpoint: str, body: str,
+                         expires_at: float) -> None:
+    """Сохранить/перезаписать JSON-тело."""
+    await db.execute(
+        "INSERT OR REPLACE INTO http_cache (key, endpoint, body, expires_at) "
+        "VALUES (?, ?, ?, ?)",
+        (key, endpoint, body, expires_at),
+    )
+    await db.commit()
+
+
+async def invalidate_http_cache(db, endpoint: str | None = None) -> int:
+    """Удалить записи endpoint (все — если None). Возвращает кол-во."""
+    if endpoint is None:
+        cursor = await db.execute("DELETE FROM http_cache")
+    else:
+        cursor = await db.execute(
+            "DELETE FROM http_cache WHERE endpoint = ?", (endpoint,)
+        )
+    await db.commit()
+    return cursor.rowcount
@@ -1,58 +1,121 @@
 """CryptoScanner — получение списка торгуемых USDT Futures токенов Binance."""
 
+import asyncio
 import logging
 import time
+from dataclasses import dataclass, field
 from typing import Optional
 
 import httpx
+import orjson
+
+from config import CACHE_TTL_REFERENCE
+from services.http_cache import cached
 
 logger = logging.getLogger("crypto_scanner.binance_tokens")
 
-_cached_tokens: list[str] = []
-_cache_time: float = 0.0
+
+@dataclass
+class _TokenCache:
+    """Кэш в памяти: свежий до soft_expires, stale (с фоновым обновлением) до expires_at.
+    lock и refreshing принадлежат event loop `loop` (run_async может запускаться повторно)."""
+    tokens: list[str] = field(default_factory=list)
+    soft_expires: float = 0.0
+    expires_at: float = 0.0
+    lock: Optional[asyncio.Lock] = None
+    refreshing: Optional[asyncio.Task] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+_cache = _TokenCache()
+
+
+def _loop_lock() -> asyncio.Lock:
+    """Lock текущего event loop. Новый loop — новый lock, фоновая задача
+    прошлого loop забывается (её loop уже не работает)."""
+    loop = asyncio.get_running_loop()
+    if _cache.loop is not loop:
+        _cache.lock = asyncio.Lock()
+        _cache.refreshing = None
+        _cache.loop = loop
+    return _cache.lock
 
 
 async def get_futures_tokens(
-    http_client: httpx.AsyncClient, exclude: Optional[set] = None,
-    cache_ttl: int = 86400,
+    http_client: httpx.AsyncClient, exclude: Optional[frozenset] = None,
+    cache_ttl: int = 86400, soft_ttl: int = 3600,
 ) -> list[str]:
-    """Список USDT Perpetual Futures токенов с Binance.
-    Кэш на cache_ttl сек. При ошибке — fallback на кэш."""
-    global _cached_tokens, _cache_time
+    """Список USDT Perpetual Futures токенов с Binance (без exclude).
+    Кэш на cache_ttl сек; за soft_ttl до истечения отдаёт кэш и обновляет
+    его в фоне (одна задача). Холодная загрузка — под lock, один запрос.
+    При ошибке — fallback на кэш."""
+    lock = _loop_lock()
+    if not _cache.tokens or time.time() >= _cache.expires_at:
+        async with lock:
+            if not _cache.tokens or time.time() >= _cache.expires_at:
+                _store(await _fetch_tokens(http_client), cache_ttl, soft_ttl)
+    elif time.time() >= _cache.soft_expires and _cache.refreshing is None:
+        _cache.refreshing = asyncio.create_task(
+            _refresh_background(http_client, cache_ttl, soft_ttl)
+        )
+
+    if not exclude:
+        return list(_cache.tokens)
+    return [t for t in _cache.tokens if t not in exclude]
 
-    if _cached_tokens and (time.time() - _cache_time < cache_ttl):
-        return _cached_tokens
 
+def _store(tokens: list[str], cache_ttl: int, soft_ttl: int) -> None:
+    """Обновить кэш в памяти. Пустой список (ошибка) — кэш как есть."""
+    if not tokens:
+        return
+    now = time.time()
+    _cache.tokens = tokens
+    _cache.soft_expires = now + max(0, cache_ttl - soft_ttl)
+    _cache.expires_at = now + cache_ttl
+
+
+async def _refresh_background(
+    http_client: httpx.AsyncClient, cache_ttl: int, soft_ttl: int,
+) -> None:
+    """Фоновое обновление: мимо http_cache, с перезаписью записи в нём."""
+    try:
+        async with _loop_lock():
+            _store(await _fetch_tokens.refresh(http_client), cache_ttl, soft_ttl)
+    except Exception as e:
+        logger.warning(f"Binance background refresh failed: {e}")
+    finally:
+        _cache.refreshing = None
+
+
+@cached(CACHE_TTL_REFERENCE)
+async def _fetch_tokens(http_client: httpx.AsyncClient) -> list[str]:
+    """GET exchangeInfo -> отсортированные baseAsset. При ошибке — [].
+    Символ без нужных ключей пропускается, остальные не теряются."""
     try:
         resp = await http_client.get(
             "https://fapi.binance.com/fapi/v1/exchangeInfo", timeout=10
         )
         resp.raise_for_status()
-        data = resp.json()
-
-        tokens = {
-            s.get("baseAsset", "")
-            for s in data.get("symbols", [])
-            if s.get("status") == "TRADING"
-            and s.get("contractType") == "PERPETUAL"
-            and s.get("quoteAsset") == "USDT"
-        }
-        tokens.discard("")
-
-        if exclude:
-            tokens -= exclude
-
-        result = sorted(tokens)
-        _cached_tokens, _cache_time = result, time.time()
-        logger.info(f"Binance Futures: {len(result)} tokens (excluded {len(exclude or set())})")
+        data = orjson.loads(resp.content)
+
+        # ~3000 символов: один проход, set один раз в конце
+        tokens: list[str] = []
+        append = tokens.append
+        for s in data.get("symbols", []):
+            if (s.get("status") == "TRADING" and s.get("contractType") == "PERPETUAL"
+                    and s.get("quoteAsset") == "USDT"):
+                append(s.get("baseAsset", ""))
+
+        result = sorted(set(tokens) - {""})
+        logger.info(f"Binance Futures: {len(result)} tokens")
         return result
 
     except httpx.TimeoutException:
         logger.warning("Binance exchangeInfo timeout")
-        return _cached_tokens
+        return []
     except httpx.HTTPStatusError as e:
         logger.warning(f"Binance HTTP {e.response.status_code}")
-        return _cached_tokens
-    except (KeyError, TypeError) as e:
+        return []
+    except (AttributeError, TypeError) as e:
         logger.warning(f"Binance unexpected response: {e}")
-        return _cached_tokens
+        return []
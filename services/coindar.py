@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
-import time
+import asyncio
+from collections.abc import AsyncIterator
 
-import requests
+import httpx
+import orjson
+
+from config import CACHE_TTL_REFERENCE, RateLimitPolicy
+from services.http_cache import cached
+from services.http_client import get_with_retry
+from services.rate_limit import AdaptiveRateLimiter
 
 
 # ---------------------------------------------------------------------------
@@ -21,14 +28,16 @@ def _safe_int(val: str | None) -> int | None:
         return None
 
 
-def _safe_float(val: str | None) -> float | None:
-    """Строку в float."""
-    if not val or not str(val).strip():
-        return None
+# Флаги Coindar приходят строками "true"/"false": один lookup вместо str().lower().strip()
+_FLAGS: dict[str, int] = {"true": 1, "1": 1, "false": 0, "0": 0, "": 0}
+
+
+def _flag(val: str | None) -> int:
+    """Флаг в 0/1: "true"/"1" (любой регистр, пробелы, bool) -> 1."""
     try:
-        return float(val)
-    except (ValueError, TypeError):
-        return None
+        return _FLAGS[val]
+    except (KeyError, TypeError):
+        return 1 if str(val).lower().strip() in ("true", "1") else 0
 
 
 # ---------------------------------------------------------------------------
@@ -39,31 +48,43 @@ class CoindarClient:
     """HTTP-клиент для Coindar API v2."""
 
     def __init__(
-        self, token: str, base_url: str, timeout: int, delay: float
+        self,
+        http_client: httpx.AsyncClient,
+        token: str,
+        base_url: str,
+        timeout: int,
+        delay: float,
+        policy: RateLimitPolicy | None = None,
     ) -> None:
-        """Инициализация. token может быть пустым — тогда check_connection вернёт False."""
+        """Инициализация. token может быть пустым — тогда check_connection вернёт False.
+        http_client общий (services.http_client), policy важнее delay, если задана."""
+        self.http: httpx.AsyncClient = http_client
         self.token: str = token
         self.base_url: str = base_url.rstrip("/")
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        self._auth_params: dict[str, str] = {"access_token": token}
 
     # ------------------------------------------------------------------
     # Публичные методы
     # ------------------------------------------------------------------
 
-    def check_connection(self) -> bool:
-        """Проверка: если token пуст — False. Иначе запрос /tags, True если 200."""
+    async def check_connection(self) -> bool:
+        """Проверка: если token пуст — False. Иначе запрос /tags, True если 2xx (без разбора тела)."""
         if not self.token:
             return False
         try:
-            self._request("/tags")
-            return True
+            return await self._get("/tags") is not None
         except Exception:
             return False
 
-    def get_tags(self) -> list[dict]:
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_tags(self) -> list[dict]:
         """Все теги. Возвращает [{id: int, name: str}]."""
-        raw = self._request("/tags")
+        raw = await self._request("/tags")
         result: list[dict] = []
         for item in raw:
             tag_id = _safe_int(item.get("id"))
@@ -72,46 +93,31 @@ class CoindarClient:
             result.append({"id": tag_id, "name": item.get("name", "")})
         return result
 
-    def get_coins(self, max_pages: int = 0) -> list[dict]:
-        """Все монеты с пагинацией. Остановка: len(result) < page_size."""
-        page_size = 100
-        page = 1
-        all_coins: list[dict] = []
-
-        while True:
-            data = self._request(
-                "/coins",
-                params={"page": str(page), "page_size": str(page_size)},
-            )
-            if not data:
-                break
-
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_coins(self, max_pages: int = 0) -> list[dict]:
+        """Все монеты с пагинацией (список из iter_coins)."""
+        return [coin async for coin in self.iter_coins(max_pages)]
+
+    async def iter_coins(self, max_pages: int = 0) -> AsyncIterator[dict]:
+        """Монеты постранично, в памяти одна страница. Итог — одной строкой в конце."""
+        pages = rows = 0
+        async for data in self._iter_pages("/coins", {}, max_pages):
+            pages += 1
+            rows += len(data)
             for item in data:
                 coin_id = _safe_int(item.get("id"))
                 if coin_id is None:
                     continue
-                all_coins.append({
+                yield {
                     "id": coin_id,
                     "name": item.get("name", ""),
                     "symbol": item.get("symbol", ""),
                     "image_url": item.get("image", ""),
-                })
-
-            print(f"   Страница {page}: {len(data)}", end="")
-            if page > 1:
-                print("", end="")
-            print(" |", end="")
-
-            if len(data) < page_size:
-                break
-            if max_pages and page >= max_pages:
-                break
-            page += 1
+                }
 
-        print()  # новая строка после прогресса
-        return all_coins
+        print(f"   Страниц: {pages}, записей: {rows}")
 
-    def get_events(
+    async def get_events(
         self,
         date_start: str,
         date_end: str,
@@ -119,92 +125,100 @@ class CoindarClient:
         max_pages: int = 0,
     ) -> list[dict]:
         """События с пагинацией. Возвращает распарсенные через parse_event."""
-        page_size = 100
-        page = 1
-        all_events: list[dict] = []
-
-        while True:
-            params: dict[str, str] = {
-                "page": str(page),
-                "page_size": str(page_size),
-                "filter_date_start": date_start,
-                "filter_date_end": date_end,
-                "sort_by": "date_start",
-                "order_by": "0",
-            }
-            if coin_ids:
-                params["filter_coins"] = ",".join(str(c) for c in coin_ids)
-
-            data = self._request("/events", params=params)
-            if not data:
-                break
+        return [
+            event async for event in self.iter_events(
+                date_start, date_end, coin_ids, max_pages,
+            )
+        ]
+
+    async def iter_events(
+        self,
+        date_start: str,
+        date_end: str,
+        coin_ids: list[int] | None = None,
+        max_pages: int = 0,
+    ) -> AsyncIterator[dict]:
+        """События постранично (parse_event), в памяти одна страница."""
+        params: dict[str, str] = {
+            "filter_date_start": date_start,
+            "filter_date_end": date_end,
+            "sort_by": "date_start",
+            "order_by": "0",
+        }
+        if coin_ids:
+            params["filter_coins"] = ",".join(str(c) for c in coin_ids)
 
+        async for data in self._iter_pages("/events", params, max_pages):
             for item in data:
-                all_events.append(self.parse_event(item))
+                yield self.parse_event(item)
+
+    async def _iter_pages(
+        self, endpoint: str, params: dict[str, str], max_pages: int = 0
+    ) -> AsyncIterator[list]:
+        """
+        Сырые страницы по 100 с prefetch: запрос страницы N+1 уходит
+        до того, как вызывающий обработает страницу N.
+        Остановка: пустая страница, len < page_size или max_pages.
+        """
+        page_size = 100
+        page = 1
 
-            if len(data) < page_size:
-                break
-            if max_pages and page >= max_pages:
-                break
-            page += 1
+        def fetch(page: int) -> asyncio.Task:
+            return asyncio.create_task(self._request(
+                endpoint,
+                params={"page": str(page), "page_size": str(page_size), **params},
+            ))
 
-        return all_events
+        task: asyncio.Task | None = fetch(page)
+        try:
+            while task is not None:
+                data = await task
+                task = None
+                if not data:
+                    break
+                if len(data) == page_size and not (max_pages and page >= max_pages):
+                    page += 1
+                    task = fetch(page)
+                yield data
+        finally:
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
 
     # ------------------------------------------------------------------
     # HTTP
     # ------------------------------------------------------------------
 
-    def _request(
+    async def _request(
         self, endpoint: str, params: dict[str, str] | None = None
     ) -> list | dict:
         """
-        HTTP GET с retry. Добавляет access_token, User-Agent.
-        429 -> sleep(60), delay *= 2.  401 -> raise ValueError.
-        5xx/timeout -> retry 3 раза.
+        HTTP GET с retry (get_with_retry). Добавляет access_token.
+        401 -> raise ValueError. 429 исчерпал попытки -> [].
         """
-        url = f"{self.base_url}{endpoint}"
-        req_params = dict(params) if params else {}
-        req_params["access_token"] = self.token
-        headers = {"User-Agent": "CryptoScanner/1.0"}
-
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                time.sleep(self.delay)
-                resp = requests.get(
-                    url, params=req_params, headers=headers, timeout=self.timeout
-                )
-
-                if resp.status_code == 401:
-                    raise ValueError(
-                        f"Coindar 401 Unauthorized: невалидный токен"
-                    )
-                if resp.status_code == 429:
-                    print("   ⏳ Coindar rate limit, жду 60 сек...")
-                    time.sleep(60)
-                    self.delay *= 2
-                    continue
-                if resp.status_code >= 500:
-                    if attempt < max_retries:
-                        time.sleep(5)
-                        continue
-                    resp.raise_for_status()
-
-                resp.raise_for_status()
-                return resp.json()
-
-            except requests.ConnectionError:
-                if attempt < max_retries:
-                    time.sleep(10)
-                    continue
-                raise
-            except requests.Timeout:
-                if attempt < max_retries:
-                    time.sleep(5)
-                    continue
-                raise
+        resp = await self._get(endpoint, params)
+        return [] if resp is None else orjson.loads(resp.content)
+
+    async def _get(
+        self, endpoint: str, params: dict[str, str] | None = None
+    ) -> httpx.Response | None:
+        """GET без разбора тела: 2xx-ответ или None (429 исчерпал попытки)."""
+        resp = await get_with_retry(
+            self.http, f"{self.base_url}{endpoint}", name="Coindar",
+            limiter=self.limiter, key=self.base_url,
+            params={**params, **self._auth_params} if params else self._auth_params,
+            timeout=self.timeout,
+        )
+        if resp is None:
+            return None
+        if resp.status_code == 401:
+            raise ValueError(
+                f"Coindar 401 Unauthorized: невалидный токен"
+            )
+        resp.raise_for_status()
+        self.limiter.record_success(self.base_url)
+        return resp
 
-        return []
 
     # ------------------------------------------------------------------
     # Парсинг
@@ -213,21 +227,28 @@ class CoindarClient:
     @staticmethod
     def parse_event(raw: dict) -> dict:
         """Конвертация: coin_id->int|None, source_reliable->0/1, coin_price_changes->float|None."""
-        reliable_str = str(raw.get("source_reliable", "")).lower().strip()
-        reliable = 1 if reliable_str in ("true", "1") else 0
-
-        important_str = str(raw.get("important", "")).lower().strip()
-        important = 1 if important_str in ("true", "1") else 0
+        get = raw.get
+        # int/float инлайн (как _safe_int): горячий цикл по всем событиям страницы
+        coin_id = get("coin_id")
+        try:
+            coin_id = int(coin_id) if coin_id else None
+        except (ValueError, TypeError):
+            coin_id = None
+        price_change = get("coin_price_changes")
+        try:
+            price_change = float(price_change) if price_change else None
+        except (ValueError, TypeError):
+            price_change = None
 
         return {
-            "caption": raw.get("caption", ""),
-            "source": raw.get("source"),
-            "source_reliable": reliable,
-            "important": important,
-            "date_public": raw.get("date_public"),
-            "date_start": raw.get("date_start", ""),
-            "date_end": raw.get("date_end") or None,
-            "coin_id": _safe_int(raw.get("coin_id")),
-            "coin_price_changes": _safe_float(raw.get("coin_price_changes")),
-            "tags": raw.get("tags"),
+            "caption": get("caption", ""),
+            "source": get("source"),
+            "source_reliable": _flag(get("source_reliable", "")),
+            "important": _flag(get("important", "")),
+            "date_public": get("date_public"),
+            "date_start": get("date_start", ""),
+            "date_end": get("date_end") or None,
+            "coin_id": coin_id,
+            "coin_price_changes": price_change,
+            "tags": get("tags"),
         }
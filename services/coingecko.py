@@ -2,48 +2,70 @@
 
 from __future__ import annotations
 
-import time
+import asyncio
 
-import requests
+import httpx
+import orjson
+
+from config import CACHE_TTL_QUOTES, CACHE_TTL_REFERENCE, RateLimitPolicy
+from services.http_cache import cached
+from services.http_client import get_with_retry
+from services.rate_limit import AdaptiveRateLimiter
 
 
 class CoinGeckoClient:
     """HTTP-клиент для CoinGecko API v3."""
 
     def __init__(
-        self, api_key: str, base_url: str, timeout: int, delay: float
+        self,
+        http_client: httpx.AsyncClient,
+        api_key: str,
+        base_url: str,
+        timeout: int,
+        delay: float,
+        policy: RateLimitPolicy | None = None,
+        max_parallel: int = 4,
     ) -> None:
-        """delay рекомендуется 2.0 сек (30 calls/min = 1 call/2 sec)."""
+        """delay рекомендуется 2.0 сек (30 calls/min = 1 call/2 sec).
+        http_client общий (services.http_client), policy важнее delay, если задана.
+        max_parallel — сколько запросов одновременно в полёте (чанки get_prices)."""
+        self.http: httpx.AsyncClient = http_client
         self.api_key: str = api_key
         self.base_url: str = base_url.rstrip("/")
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        self._headers: dict[str, str] = {"x-cg-demo-api-key": api_key}
+        self._sem: asyncio.Semaphore = asyncio.Semaphore(max_parallel)
 
     # ------------------------------------------------------------------
     # Публичные методы
     # ------------------------------------------------------------------
 
-    def check_connection(self) -> bool:
+    async def check_connection(self) -> bool:
         """GET /ping, True если gecko_says в ответе."""
         try:
-            data = self._request("/ping")
+            data = await self._request("/ping")
             return "gecko_says" in data
         except Exception:
             return False
 
-    def get_coins_list(self) -> list[dict]:
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_coins_list(self) -> list[dict]:
         """Полный список монет. [{id, symbol, name}]. Один запрос, без пагинации."""
-        data = self._request("/coins/list")
+        data = await self._request("/coins/list")
         return [
             {"id": c["id"], "symbol": c["symbol"], "name": c["name"]}
             for c in data
             if "id" in c and "symbol" in c and "name" in c
         ]
 
-    def get_coin_info(self, coin_id: str) -> dict | None:
+    async def get_coin_info(self, coin_id: str) -> dict | None:
         """Детальная информация: categories, description, market_data."""
         try:
-            data = self._request(
+            data = await self._request(
                 f"/coins/{coin_id}",
                 params={
                     "localization": "false",
@@ -57,33 +79,43 @@ class CoinGeckoClient:
         except Exception:
             return None
 
-    def get_prices(self, coin_ids: list[str]) -> dict:
+    async def get_coin_infos(self, coin_ids: list[str]) -> dict[str, dict | None]:
+        """get_coin_info пачкой: {coin_id: info | None}. Запросы параллельно,
+        в полёте не больше max_parallel, темп — limiter (30 calls/min)."""
+        coin_ids = list(dict.fromkeys(coin_ids))
+        infos = await asyncio.gather(*(self.get_coin_info(cid) for cid in coin_ids))
+        return dict(zip(coin_ids, infos))
+
+    @cached(CACHE_TTL_QUOTES)
+    async def get_prices(self, coin_ids: list[str]) -> dict:
         """
         Цены пачкой. Макс 250 ids за раз.
-        Если больше — разбить на чанки по 250.
+        Если больше — разбить на чанки по 250, чанки запрашиваются параллельно.
         Возвращает {coin_id: {usd, usd_24h_change, usd_market_cap}}.
         """
-        result: dict = {}
         chunk_size = 250
-        for i in range(0, len(coin_ids), chunk_size):
-            chunk = coin_ids[i : i + chunk_size]
-            ids_str = ",".join(chunk)
-            data = self._request(
+        responses = await asyncio.gather(*(
+            self._request(
                 "/simple/price",
                 params={
-                    "ids": ids_str,
+                    "ids": ",".join(coin_ids[i : i + chunk_size]),
                     "vs_currencies": "usd",
                     "include_24hr_change": "true",
                     "include_market_cap": "true",
                 },
             )
+            for i in range(0, len(coin_ids), chunk_size)
+        ))
+        result: dict = {}
+        for data in responses:
             if isinstance(data, dict):
                 result.update(data)
         return result
 
-    def get_categories(self) -> list[dict]:
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_categories(self) -> list[dict]:
         """Список категорий. [{category_id, name}]."""
-        data = self._request("/coins/categories/list")
+        data = await self._request("/coins/categories/list")
         return [
             {"category_id": c.get("category_id", ""), "name": c.get("name", "")}
             for c in data
@@ -94,50 +126,21 @@ class CoinGeckoClient:
     # HTTP
     # ------------------------------------------------------------------
 
-    def _request(
+    async def _request(
         self, endpoint: str, params: dict[str, str] | None = None
     ) -> dict | list:
         """
-        HTTP GET. Header: x-cg-demo-api-key.
-        429 -> sleep(60), retry. 5xx -> retry 3 раза.
-        sleep(self.delay) после каждого запроса.
+        HTTP GET с retry (get_with_retry). Header: x-cg-demo-api-key.
+        429 исчерпал попытки -> {}.
         """
-        url = f"{self.base_url}{endpoint}"
-        headers = {
-            "User-Agent": "CryptoScanner/1.0",
-            "x-cg-demo-api-key": self.api_key,
-        }
-
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                time.sleep(self.delay)
-                resp = requests.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
-
-                if resp.status_code == 429:
-                    print("   ⏳ CoinGecko rate limit, жду 60 сек...")
-                    time.sleep(60)
-                    continue
-                if resp.status_code >= 500:
-                    if attempt < max_retries:
-                        time.sleep(5)
-                        continue
-                    resp.raise_for_status()
-
-                resp.raise_for_status()
-                return resp.json()
-
-            except requests.ConnectionError:
-                if attempt < max_retries:
-                    time.sleep(10)
-                    continue
-                raise
-            except requests.Timeout:
-                if attempt < max_retries:
-                    time.sleep(5)
-                    continue
-                raise
-
-        return {}
+        resp = await get_with_retry(
+            self.http, f"{self.base_url}{endpoint}", name="CoinGecko",
+            limiter=self.limiter, key=self.base_url, params=params,
+            headers=self._headers,
+            timeout=self.timeout, sem=self._sem,
+        )
+        if resp is None:
+            return {}
+        resp.raise_for_status()
+        self.limiter.record_success(self.base_url)
+        return orjson.loads(resp.content)
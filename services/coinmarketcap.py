@@ -2,31 +2,55 @@
 
 from __future__ import annotations
 
-import time
+import asyncio
 
-import requests
+import httpx
+import orjson
+
+from config import CACHE_TTL_QUOTES, CACHE_TTL_REFERENCE, RateLimitPolicy
+from services.http_cache import cached
+from services.http_client import get_with_retry
+from services.rate_limit import AdaptiveRateLimiter
 
 
 class CoinMarketCapClient:
     """HTTP-клиент для CoinMarketCap API."""
 
     def __init__(
-        self, api_key: str, base_url: str, timeout: int, delay: float
+        self,
+        http_client: httpx.AsyncClient,
+        api_key: str,
+        base_url: str,
+        timeout: int,
+        delay: float,
+        policy: RateLimitPolicy | None = None,
+        max_parallel: int = 4,
     ) -> None:
-        """delay рекомендуется 2.0 сек (30 req/min)."""
+        """delay рекомендуется 2.0 сек (30 req/min).
+        http_client общий (services.http_client), policy важнее delay, если задана.
+        max_parallel — сколько запросов одновременно в полёте (чанки get_quotes)."""
+        self.http: httpx.AsyncClient = http_client
         self.api_key: str = api_key
         self.base_url: str = base_url.rstrip("/")
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        self._headers: dict[str, str] = {
+            "X-CMC_PRO_API_KEY": api_key,
+            "Accept": "application/json",
+        }
+        self._sem: asyncio.Semaphore = asyncio.Semaphore(max_parallel)
 
     # ------------------------------------------------------------------
     # Публичные методы
     # ------------------------------------------------------------------
 
-    def check_connection(self) -> dict | None:
+    async def check_connection(self) -> dict | None:
         """GET /v1/key/info. Возвращает {plan, credits_used, credits_left} или None."""
         try:
-            data = self._request("/v1/key/info")
+            data = await self._request("/v1/key/info")
             if data is None:
                 return None
             plan_info = data.get("plan", {})
@@ -42,11 +66,13 @@ class CoinMarketCapClient:
         except Exception:
             return None
 
-    def get_map(self, limit: int = 500) -> list[dict]:
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_map(self, limit: int = 500) -> list[dict]:
         """Маппинг: [{id, name, symbol, slug}]. Отсортирован по cmc_rank."""
-        data = self._request(
+        data = await self._request(
             "/v1/cryptocurrency/map",
-            params={"limit": str(limit), "sort": "cmc_rank"},
+            # aux: без platform/first_historical_data — нужны только id/name/symbol/slug
+            params={"limit": str(limit), "sort": "cmc_rank", "aux": "is_active"},
         )
         if not data:
             return []
@@ -61,21 +87,31 @@ class CoinMarketCapClient:
             if "id" in c and "symbol" in c
         ]
 
-    def get_quotes(self, symbols: list[str]) -> dict:
+    @cached(CACHE_TTL_QUOTES)
+    async def get_quotes(self, symbols: list[str]) -> dict:
         """
         Котировки. Макс 120 символов за раз.
-        Разбивать на чанки если больше.
+        Разбивать на чанки если больше, чанки запрашиваются параллельно.
+        Дубли символов запрашиваются один раз, невалидные символы пропускаются.
         Возвращает {symbol: {price, volume_24h, market_cap, percent_change_24h}}.
         """
-        result: dict = {}
         chunk_size = 120
-        for i in range(0, len(symbols), chunk_size):
-            chunk = symbols[i : i + chunk_size]
-            symbols_str = ",".join(chunk)
-            data = self._request(
+        symbols = list(dict.fromkeys(symbols))
+        responses = await asyncio.gather(*(
+            self._request(
                 "/v1/cryptocurrency/quotes/latest",
-                params={"symbol": symbols_str, "convert": "USD"},
+                params={
+                    "symbol": ",".join(symbols[i : i + chunk_size]),
+                    "convert": "USD",
+                    # aux: вместо platform/tags/supply/date_added — одно лёгкое поле
+                    "aux": "is_active",
+                    "skip_invalid": "true",
+                },
             )
+            for i in range(0, len(symbols), chunk_size)
+        ))
+        result: dict = {}
+        for data in responses:
             if not data:
                 continue
             for sym, info in data.items():
@@ -91,13 +127,13 @@ class CoinMarketCapClient:
                 }
         return result
 
-    def check_events_available(self) -> tuple[bool, str]:
+    async def check_events_available(self) -> tuple[bool, str]:
         """
         Проверить доступен ли /v1/cryptocurrency/events на free tier.
         Возвращает (True/False, описание).
         """
         try:
-            data = self._request(
+            data = await self._request(
                 "/v1/cryptocurrency/events", params={"limit": "1"}
             )
             if data is not None:
@@ -105,14 +141,15 @@ class CoinMarketCapClient:
             return False, "Events API вернул пустой ответ"
         except ValueError as e:
             return False, f"Events API недоступен: {e}"
-        except requests.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             return False, f"Events API недоступен: HTTP {e.response.status_code}"
         except Exception as e:
             return False, f"Events API ошибка: {e}"
 
-    def get_categories(self, limit: int = 20) -> list[dict]:
+    @cached(CACHE_TTL_REFERENCE)
+    async def get_categories(self, limit: int = 20) -> list[dict]:
         """Список категорий."""
-        data = self._request(
+        data = await self._request(
             "/v1/cryptocurrency/categories", params={"limit": str(limit)}
         )
         if not data:
@@ -130,73 +167,44 @@ class CoinMarketCapClient:
     # HTTP
     # ------------------------------------------------------------------
 
-    def _request(
+    async def _request(
         self, endpoint: str, params: dict[str, str] | None = None
     ) -> dict | list | None:
         """
-        HTTP GET. Header: X-CMC_PRO_API_KEY.
+        HTTP GET с retry (get_with_retry). Header: X-CMC_PRO_API_KEY.
         Проверяет status.error_code в ответе.
         error_code 1002 (API key invalid) -> raise ValueError.
         error_code 1008 (plan limit) -> warning, return None.
-        429 -> sleep(60), retry.
+        403 -> raise ValueError. 429 исчерпал попытки -> None.
         Извлекает и возвращает поле "data".
         """
-        url = f"{self.base_url}{endpoint}"
-        headers = {
-            "User-Agent": "CryptoScanner/1.0",
-            "X-CMC_PRO_API_KEY": self.api_key,
-            "Accept": "application/json",
-        }
+        resp = await get_with_retry(
+            self.http, f"{self.base_url}{endpoint}", name="CMC",
+            limiter=self.limiter, key=self.base_url, params=params,
+            headers=self._headers,
+            timeout=self.timeout, sem=self._sem,
+        )
+        if resp is None:
+            return None
+        if resp.status_code == 403:
+            raise ValueError(
+                f"CMC 403 Forbidden: endpoint недоступен на текущем плане"
+            )
+        resp.raise_for_status()
+        body = orjson.loads(resp.content)
+
+        # Проверка CMC status wrapper
+        status = body.get("status", {})
+        error_code = status.get("error_code", 0)
+
+        if error_code == 1002:
+            raise ValueError("CMC: невалидный API ключ (error_code 1002)")
+        if error_code == 1008:
+            print("   ⚠️ CMC: лимит плана достигнут (error_code 1008)")
+            return None
+        if error_code != 0:
+            msg = status.get("error_message", "unknown error")
+            raise ValueError(f"CMC error {error_code}: {msg}")
 
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                time.sleep(self.delay)
-                resp = requests.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
-
-                if resp.status_code == 429:
-                    print("   ⏳ CMC rate limit, жду 60 сек...")
-                    time.sleep(60)
-                    continue
-                if resp.status_code == 403:
-                    raise ValueError(
-                        f"CMC 403 Forbidden: endpoint недоступен на текущем плане"
-                    )
-                if resp.status_code >= 500:
-                    if attempt < max_retries:
-                        time.sleep(5)
-                        continue
-                    resp.raise_for_status()
-
-                resp.raise_for_status()
-                body = resp.json()
-
-                # Проверка CMC status wrapper
-                status = body.get("status", {})
-                error_code = status.get("error_code", 0)
-
-                if error_code == 1002:
-                    raise ValueError("CMC: невалидный API ключ (error_code 1002)")
-                if error_code == 1008:
-                    print("   ⚠️ CMC: лимит плана достигнут (error_code 1008)")
-                    return None
-                if error_code != 0:
-                    msg = status.get("error_message", "unknown error")
-                    raise ValueError(f"CMC error {error_code}: {msg}")
-
-                return body.get("data")
-
-            except requests.ConnectionError:
-                if attempt < max_retries:
-                    time.sleep(10)
-                    continue
-                raise
-            except requests.Timeout:
-                if attempt < max_retries:
-                    time.sleep(5)
-                    continue
-                raise
-
-        return None
+        self.limiter.record_success(self.base_url)
+        return body.get("data")
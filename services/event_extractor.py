@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import re
-import time
+from collections.abc import AsyncIterator
 from pathlib import Path
+from typing import Any
 
-import requests
+import httpx
+import msgspec
+import orjson
+
+from config import RateLimitPolicy
+from services.groq_client import extract_json
+from services.http_client import request_with_retry
+from services.rate_limit import AdaptiveRateLimiter
 
 # Допустимые значения event_type
 VALID_EVENT_TYPES: set[str] = {
@@ -19,86 +28,156 @@ VALID_EVENT_TYPES: set[str] = {
 VALID_IMPORTANCE: set[str] = {"high", "medium", "low"}
 
 
+class RawEvent(msgspec.Struct, gc=False):
+    """Событие из ответа модели до нормализации. Лишние ключи игнорируются.
+    Строгие только title/coin_symbol/event_type (неверный тип — событие отбрасывается);
+    необязательные поля принимаются любыми и нормализуются в _validate_event,
+    чтобы кривой news_index или дата не стоили всего события.
+    Валидатор под эту схему msgspec генерирует при определении класса;
+    gc=False — данные из JSON, циклов нет, GC объекты не отслеживает."""
+    title: str
+    coin_symbol: str
+    event_type: str
+    importance: Any = None
+    date_event: Any = None
+    news_index: Any = None
+    source_title: Any = None
+    source_url: Any = None
+
+
+# date_event: YYYY-MM-DD (компилируется один раз, не на каждое событие).
+# Скомпилированный fullmatch быстрее ручной проверки срезов + isdecimal (~0.25 vs ~0.39 мкс)
+_is_valid_date = re.compile(r"\d{4}-\d{2}-\d{2}").fullmatch
+
+# System-промпт читается один раз на процесс: байт-в-байт одинаковый во всех
+# запросах, чтобы провайдер переиспользовал кэш префикса
+_prompt_cache: str = ""
+
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_array_items(text: str, pos: int) -> tuple[list, int]:
+    """Дописанные до конца элементы JSON-массива начиная с pos.
+    Возвращает (элементы, позиция продолжения); -1 — массив закрыт."""
+    items: list = []
+    n = len(text)
+    while True:
+        while pos < n and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= n:
+            return items, pos
+        if text[pos] == "]":
+            return items, -1
+        try:
+            item, end = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return items, pos  # элемент ещё не догенерирован
+        if end >= n:
+            return items, pos  # число могло оборваться на середине
+        items.append(item)
+        pos = end
+
+
 class EventExtractor:
     """Извлечение структурированных событий из новостей через Groq AI."""
 
     def __init__(
         self,
+        http_client: httpx.AsyncClient,
         api_key: str,
         api_url: str,
         model: str,
         delay: float = 1.0,
         timeout: int = 30,
+        policy: RateLimitPolicy | None = None,
+        max_parallel: int = 4,
     ) -> None:
+        """http_client общий (services.http_client), policy важнее delay, если задана.
+        max_parallel — сколько чанков одновременно в полёте (темп держит limiter)."""
+        self.http: httpx.AsyncClient = http_client
         self.api_key: str = api_key
         self.api_url: str = api_url
         self.model: str = model
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
         self.timeout: int = timeout
         self.prompt: str = self._load_prompt()
+        self._sem: asyncio.Semaphore = asyncio.Semaphore(max_parallel)
 
-    def _load_prompt(self) -> str:
-        """Читает prompts/extract_events.md."""
-        prompt_path = Path(__file__).parent.parent / "prompts" / "extract_events.md"
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"Промпт не найден: {prompt_path}")
-        return prompt_path.read_text(encoding="utf-8")
+    @staticmethod
+    def _load_prompt() -> str:
+        """Читает prompts/extract_events.md (один раз на процесс)."""
+        global _prompt_cache
+        if not _prompt_cache:
+            prompt_path = Path(__file__).parent.parent / "prompts" / "extract_events.md"
+            if not prompt_path.exists():
+                raise FileNotFoundError(f"Промпт не найден: {prompt_path}")
+            _prompt_cache = prompt_path.read_text(encoding="utf-8")
+        return _prompt_cache
 
     # ------------------------------------------------------------------
     # Публичные методы
     # ------------------------------------------------------------------
 
-    def check_connection(self) -> bool:
+    async def check_connection(self) -> bool:
         """Простой запрос к Groq. True если ответ OK."""
         if not self.api_key:
             return False
         try:
-            resp = self._call_groq("Respond with exactly: OK")
+            resp = await self._call_groq("Respond with exactly: OK")
             return "OK" in resp
         except Exception:
             return False
 
-    def extract_events(self, news_items: list[dict]) -> list[dict]:
+    async def extract_events(self, news_items: list[dict]) -> list[dict]:
         """
         Основной метод:
         1. Разбивает на чанки по 30
-        2. Для каждого чанка: формат -> Groq -> парсинг -> валидация
-        3. Возвращает список валидных событий
+        2. Чанки параллельно: формат -> Groq -> парсинг -> валидация
+        3. Возвращает список валидных событий (в порядке чанков)
         """
         if not news_items:
             return []
 
         chunk_size = 30
-        all_events: list[dict] = []
-
-        for i in range(0, len(news_items), chunk_size):
-            chunk = news_items[i : i + chunk_size]
-            chunk_num = i // chunk_size + 1
-            total_chunks = (len(news_items) + chunk_size - 1) // chunk_size
-            print(f"   Чанк {chunk_num}/{total_chunks} ({len(chunk)} новостей):"
-                  f" отправляю в Groq...")
-
-            try:
-                user_msg = self._format_news_for_prompt(chunk)
-                response_text = self._call_groq(user_msg)
-                raw_events = self._parse_response(response_text)
-
-                valid_events: list[dict] = []
-                for raw_ev in raw_events:
-                    ev = self._validate_event(raw_ev)
-                    if ev:
-                        # Скорректировать news_index на глобальный offset
-                        if ev.get("news_index") is not None:
-                            ev["news_index"] = ev["news_index"] + i
-                        valid_events.append(ev)
-
-                all_events.extend(valid_events)
-                print(f"   ✅ Извлечено событий: {len(valid_events)}")
-
-            except Exception as e:
-                print(f"   ❌ Ошибка чанка {chunk_num}: {e}")
-
-        return all_events
+        total_chunks = (len(news_items) + chunk_size - 1) // chunk_size
+        print(f"   Чанков: {total_chunks} по {chunk_size} новостей, отправляю в Groq...")
+
+        results = await asyncio.gather(*(
+            self._process_chunk(
+                news_items[i : i + chunk_size], i, f"{n}/{total_chunks}"
+            )
+            for n, i in enumerate(range(0, len(news_items), chunk_size), 1)
+        ))
+        return [ev for events in results for ev in events]
+
+    async def _process_chunk(
+        self, chunk: list[dict], offset: int, label: str
+    ) -> list[dict]:
+        """Один чанк. offset — индекс первой новости чанка, label — "N/M" для логов. Ошибка -> []."""
+        try:
+            user_msg = self._format_news_for_prompt(chunk)
+
+            # События валидируются по мере генерации, не дожидаясь конца ответа
+            valid_events: list[dict] = []
+            async for raw_ev in self._stream_events(user_msg):
+                ev = self._validate_event(raw_ev)
+                if ev:
+                    # Скорректировать news_index на глобальный offset
+                    if ev.get("news_index") is not None:
+                        ev["news_index"] = ev["news_index"] + offset
+                    valid_events.append(ev)
+
+            print(f"   ✅ Чанк {label} ({len(chunk)} новостей):"
+                  f" извлечено событий: {len(valid_events)}")
+            return valid_events
+
+        except Exception as e:
+            print(f"   ❌ Ошибка чанка {label}: {e}")
+            return []
 
     # ------------------------------------------------------------------
     # Форматирование
@@ -109,24 +188,23 @@ class EventExtractor:
         Формат:
         0. [BTC, ETH] "Binance Will List XYZ" (coindesk.com) url
         """
-        lines: list[str] = []
-        for idx, item in enumerate(news_items):
-            tickers = item.get("tickers", [])
-            tickers_str = f"[{', '.join(tickers)}]" if tickers else "[?]"
-            title = item.get("title", "")
-            domain = item.get("domain", item.get("source", ""))
-            url = item.get("url", "")
-            lines.append(f'{idx}. {tickers_str} "{title}" ({domain}) {url}')
-        return "\n".join(lines)
+        # Одно f-string на строку внутри comprehension: без промежуточных переменных
+        # и append (format_map по шаблону медленнее в ~3 раза)
+        return "\n".join([
+            f'{idx}. [{", ".join(item.get("tickers") or ["?"])}] '
+            f'"{item.get("title", "")}" '
+            f'({item.get("domain", item.get("source", ""))}) {item.get("url", "")}'
+            for idx, item in enumerate(news_items)
+        ])
 
     # ------------------------------------------------------------------
     # Groq API
     # ------------------------------------------------------------------
 
-    def _call_groq(self, user_message: str) -> str:
+    async def _post(self, user_message: str, stream: bool) -> httpx.Response | None:
         """
-        POST к Groq chat completions.
-        Возвращает текст ответа.
+        POST к Groq chat completions с retry (request_with_retry).
+        401 -> raise ValueError, прочие 4xx/5xx -> HTTPStatusError. 429 исчерпал попытки -> None.
         """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -140,50 +218,76 @@ class EventExtractor:
             ],
             "temperature": 0.1,
             "max_tokens": 4000,
+            "stream": stream,
         }
 
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                time.sleep(self.delay)
-                resp = requests.post(
-                    self.api_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-
-                if resp.status_code == 401:
-                    raise ValueError("Groq 401: неверный API ключ")
-                if resp.status_code == 429:
-                    print("   ⏳ Groq rate limit, жду 60 сек...")
-                    time.sleep(60)
-                    continue
-                if resp.status_code >= 500:
-                    if attempt < max_retries:
-                        time.sleep(5)
-                        continue
-                    resp.raise_for_status()
-
-                resp.raise_for_status()
-                body = resp.json()
-                choices = body.get("choices", [])
-                if not choices:
-                    return ""
-                return choices[0].get("message", {}).get("content", "")
-
-            except requests.ConnectionError:
-                if attempt < max_retries:
-                    time.sleep(10)
+        resp = await request_with_retry(
+            self.http, "POST", self.api_url, name="Groq",
+            limiter=self.limiter, key=self.api_url,
+            headers=headers, json=payload, timeout=self.timeout, sem=self._sem,
+            stream=stream,
+        )
+        if resp is None:
+            return None
+        if resp.is_error:
+            await resp.aclose()
+            if resp.status_code == 401:
+                raise ValueError("Groq 401: неверный API ключ")
+            resp.raise_for_status()
+        self.limiter.record_success(self.api_url)
+        return resp
+
+    async def _call_groq(self, user_message: str) -> str:
+        """Весь ответ одним куском. 429 исчерпал попытки -> ""."""
+        resp = await self._post(user_message, stream=False)
+        if resp is None:
+            return ""
+        body = orjson.loads(resp.content)
+        choices = body.get("choices", [])
+        if not choices:
+            return ""
+        return choices[0].get("message", {}).get("content", "")
+
+    async def _stream_events(self, user_message: str) -> AsyncIterator[dict]:
+        """
+        stream=true (SSE): delta.content копится в буфер, готовые элементы
+        JSON-массива отдаются сразу (raw_decode с первого '[').
+        Ничего не разобралось по ходу — _parse_response по всему тексту.
+        """
+        resp = await self._post(user_message, stream=True)
+        if resp is None:
+            return
+        text = ""
+        pos: int | None = None  # позиция после '[' / последнего элемента
+        yielded = 0
+        try:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
                     continue
-                raise
-            except requests.Timeout:
-                if attempt < max_retries:
-                    time.sleep(5)
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = orjson.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if not delta:
                     continue
-                raise
-
-        return ""
+                text += delta
+                if pos is None:
+                    start = text.find("[")
+                    if start == -1:
+                        continue
+                    pos = start + 1
+                if pos != -1:
+                    items, pos = _decode_array_items(text, pos)
+                    for item in items:
+                        yielded += 1
+                        yield item
+        finally:
+            await resp.aclose()
+
+        if not yielded:
+            for item in self._parse_response(text):
+                yield item
 
     # ------------------------------------------------------------------
     # Парсинг ответа
@@ -192,15 +296,15 @@ class EventExtractor:
     def _parse_response(self, response_text: str) -> list[dict]:
         """
         Извлечь JSON-массив из ответа:
-        1. json.loads
-        2. Если ошибка — regex [...] из текста
+        1. orjson.loads
+        2. Если ошибка — первый JSON-массив внутри текста (extract_json)
         3. Если всё ещё ошибка — []
         """
         text = response_text.strip()
 
         # Попытка 1: прямой парсинг
         try:
-            parsed = json.loads(text)
+            parsed = orjson.loads(text)
             if isinstance(parsed, list):
                 return parsed
             if isinstance(parsed, dict):
@@ -212,17 +316,8 @@ class EventExtractor:
         except json.JSONDecodeError:
             pass
 
-        # Попытка 2: regex для массива
-        match = re.search(r"\[.*\]", text, re.DOTALL)
-        if match:
-            try:
-                parsed = json.loads(match.group())
-                if isinstance(parsed, list):
-                    return parsed
-            except json.JSONDecodeError:
-                pass
-
-        return []
+        # Попытка 2: массив внутри текста
+        return extract_json(text, list) or []
 
     # ------------------------------------------------------------------
     # Валидация
@@ -231,38 +326,35 @@ class EventExtractor:
     @staticmethod
     def _validate_event(event: dict) -> dict | None:
         """
-        Проверить обязательные поля, нормализовать значения.
+        Проверить типы по схеме RawEvent (msgspec), нормализовать значения.
         Вернуть None если невалидный.
         """
-        if not isinstance(event, dict):
+        try:
+            raw = msgspec.convert(event, RawEvent, strict=False)
+        except msgspec.ValidationError:
             return None
 
-        title = event.get("title")
-        coin_symbol = event.get("coin_symbol")
-        event_type = event.get("event_type")
-
-        if not title or not coin_symbol or not event_type:
+        if not raw.title or not raw.coin_symbol or not raw.event_type:
             return None
 
         # Нормализация
-        coin_symbol = str(coin_symbol).upper().strip()
-        event_type = str(event_type).lower().strip()
+        event_type = raw.event_type.lower().strip()
         if event_type not in VALID_EVENT_TYPES:
             event_type = "other"
 
-        importance = str(event.get("importance", "medium")).lower().strip()
+        importance = str(raw.importance or "medium").lower().strip()
         if importance not in VALID_IMPORTANCE:
             importance = "medium"
 
         # date_event — проверка формата YYYY-MM-DD
-        date_event = event.get("date_event")
+        date_event = raw.date_event
         if date_event:
             date_event = str(date_event).strip()
-            if not re.match(r"^\d{4}-\d{2}-\d{2}$", date_event):
+            if not _is_valid_date(date_event):
                 date_event = None
 
-        # news_index
-        news_index = event.get("news_index")
+        # news_index — int или None (строка-число и float приводятся)
+        news_index = raw.news_index
         if news_index is not None:
             try:
                 news_index = int(news_index)
@@ -270,12 +362,12 @@ class EventExtractor:
                 news_index = None
 
         return {
-            "title": str(title).strip()[:100],
-            "coin_symbol": coin_symbol,
+            "title": raw.title.strip()[:100],
+            "coin_symbol": raw.coin_symbol.upper().strip(),
             "event_type": event_type,
             "date_event": date_event,
             "importance": importance,
-            "source_title": str(event.get("source_title", "")).strip(),
-            "source_url": str(event.get("source_url", "")).strip(),
+            "source_title": str(raw.source_title or "").strip(),
+            "source_url": str(raw.source_url or "").strip(),
             "news_index": news_index,
         }
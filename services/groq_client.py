@@ -1,14 +1,22 @@
 """CryptoScanner — async AI client with provider rotation."""
 
 import asyncio
+import functools
 import json
 import logging
 import os
+import re
 import time
+from dataclasses import dataclass, field
 
 import httpx
+import orjson
 
-import config  # noqa: F401 — triggers load_dotenv()
+import config
+from database.db import on_async_shutdown
+from services import llm_cache
+from services.http_client import make_http_client
+from services.rate_limit import TokenBucket
 
 logger = logging.getLogger("crypto_scanner.ai")
 
@@ -55,27 +63,73 @@ PROVIDERS = [
     },
 ]
 
-# --- Module-level state ---
-_current_provider_idx: int = 0
-_provider_cooldowns: dict = {}    # {"groq": timestamp_when_available}
-_disabled_providers: set = set()  # {"github"} — invalid key
+@dataclass
+class ProviderState:
+    """Rotation state shared by all call_groq coroutines.
+    Methods never await, so each one is atomic on the event loop — no lock needed."""
+    cursor: int = 0                                           # next round-robin start
+    cooldowns: dict[str, float] = field(default_factory=dict)  # {"groq": available_at}
+    disabled: set[str] = field(default_factory=set)           # {"github"} — invalid key
 
+    def claim_start(self, n: int) -> int:
+        """Starting slot for one call; concurrent calls get consecutive slots."""
+        start = self.cursor % n
+        self.cursor = start + 1
+        return start
 
-def _is_available(name: str) -> bool:
-    if name in _disabled_providers:
-        return False
-    return time.time() >= _provider_cooldowns.get(name, 0)
+    def is_available(self, name: str) -> bool:
+        if name in self.disabled:
+            return False
+        return time.time() >= self.cooldowns.get(name, 0)
 
+    def set_cooldown(self, name: str, seconds: int = 60) -> None:
+        """Extend only: parallel 429s from one provider don't shorten each other."""
+        self.cooldowns[name] = max(self.cooldowns.get(name, 0), time.time() + seconds)
 
-def _set_cooldown(name: str, seconds: int = 60):
-    _provider_cooldowns[name] = time.time() + seconds
+    def disable(self, name: str) -> None:
+        self.disabled.add(name)
 
 
-# Build active providers (have API keys) at import time
+_state = ProviderState()
+
+
+# Pooled client (HTTP/2, keep-alive) shared by all calls; one per event loop
+_http: httpx.AsyncClient | None = None
+_http_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Lazily create the shared client; a new event loop (new asyncio.run) gets a new one."""
+    global _http, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http is None or _http_loop is not loop:
+        _http = make_http_client()
+        _http_loop = loop
+        on_async_shutdown(aclose)
+    return _http
+
+
+async def aclose() -> None:
+    """Close the shared client (run_async calls this on shutdown)."""
+    global _http, _http_loop
+    if _http is not None and _http_loop is asyncio.get_running_loop():
+        await _http.aclose()
+    _http = _http_loop = None
+
+
+# Build active providers (have API keys) at import time; keys don't change at runtime,
+# so each copy carries its ready request headers
+config.load_env()
 _active_providers: list[dict] = []
+_buckets: dict[str, TokenBucket] = {}  # {"groq": bucket of rpm per minute}
 for _p in PROVIDERS:
-    if os.getenv(_p["key_env"], ""):
-        _active_providers.append(_p)
+    _key = os.getenv(_p["key_env"], "")
+    if _key:
+        _active_providers.append({**_p, "headers": {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {_key}",
+        }})
+        _buckets[_p["name"]] = TokenBucket(_p["rpm"])
     else:
         logger.info(f"AI [{_p['name']}] no key ({_p['key_env']}) — skipped")
 
@@ -85,98 +139,151 @@ else:
     logger.info(f"AI providers: {', '.join(p['name'] for p in _active_providers)}")
 
 
+def split_prompt(template: str, marker: str) -> tuple[str, str]:
+    """Split a prompt template at marker: (static system part, user part from marker).
+    The system part is sent unchanged on every call, so providers can reuse its prefix cache."""
+    system, sep, user = template.partition(marker)
+    if not sep:
+        return "", template
+    return system.rstrip(), sep + user
+
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+@functools.lru_cache(maxsize=16)
+def _split_placeholders(template: str) -> tuple[str, ...]:
+    """(text, name, text, name, ..., text) — parsed once per template."""
+    return tuple(_PLACEHOLDER.split(template))
+
+
+def fill_prompt(template: str, values: dict[str, str]) -> str:
+    """Substitute {name} placeholders in one pass (one allocation per call).
+    Values are never rescanned; unknown placeholders are left as-is."""
+    parts = list(_split_placeholders(template))
+    parts[1::2] = [values.get(name, f"{{{name}}}") for name in parts[1::2]]
+    return "".join(parts)
+
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(text: str, kind: type = list):
+    """First JSON value of type kind (list or dict) embedded in model prose, or None.
+    raw_decode from each '[' / '{' in turn — no greedy-regex backtracking."""
+    opener = "[" if kind is list else "{"
+    idx = text.find(opener)
+    while idx != -1:
+        try:
+            parsed, _ = _decoder.raw_decode(text, idx)
+            if isinstance(parsed, kind):
+                return parsed
+        except (json.JSONDecodeError, RecursionError):
+            pass
+        idx = text.find(opener, idx + 1)
+    return None
+
+
 async def call_groq(
     prompt: str,
     model: str = "llama-3.3-70b-versatile",
     temperature: float = 0.1,
     max_tokens: int = 500,
     timeout: int = 30,
+    system: str = "",
 ) -> str:
-    """AI request with provider rotation. Raises GroqAPIError on total failure."""
-    global _current_provider_idx
+    """AI request with provider rotation. Raises GroqAPIError on total failure.
+    system — static first message (no interpolation: keeps the provider prompt cache warm).
+    Identical (model, system, prompt, temperature, max_tokens) within LLM_CACHE_TTL
+    is served from llm_cache (disable with LLM_CACHE_ENABLED=0)."""
+    cache_key = None
+    if config.LLM_CACHE_ENABLED:
+        cache_key = llm_cache.make_key(model, system, prompt, temperature, max_tokens)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"AI cache hit (T={temperature})")
+            return cached
 
     if not _active_providers:
         raise GroqAPIError("No AI providers configured")
 
-    available = [p for p in _active_providers if p["name"] not in _disabled_providers]
+    available = [p for p in _active_providers if p["name"] not in _state.disabled]
     if not available:
         raise GroqAPIError("All AI providers disabled (bad keys)")
 
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+
     last_error = None
 
     for round_num in range(3):
         tried = 0
 
-        for _ in range(len(_active_providers)):
-            idx = _current_provider_idx % len(_active_providers)
-            prov = _active_providers[idx]
+        # Round-robin: each call claims its own start before awaiting, so concurrent
+        # calls spread across providers and each tries every provider once per round
+        n = len(_active_providers)
+        start = _state.claim_start(n)
+        for k in range(n):
+            prov = _active_providers[(start + k) % n]
             name = prov["name"]
 
-            if not _is_available(name):
-                _current_provider_idx = idx + 1
+            if not _state.is_available(name):
                 continue
 
             tried += 1
-            api_key = os.getenv(prov["key_env"], "")
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            }
             payload = {
                 "model": prov["model"],
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": messages,
                 "temperature": temperature,
                 "max_tokens": max_tokens,
             }
 
             try:
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    resp = await client.post(prov["url"], headers=headers, json=payload)
+                # Pace to the provider's rpm: no wait while it has spare capacity
+                await _buckets[name].acquire()
+                resp = await _get_client().post(
+                    prov["url"], headers=prov["headers"], json=payload, timeout=timeout)
 
                 if resp.status_code == 200:
-                    data = resp.json()
+                    data = orjson.loads(resp.content)
                     content = data["choices"][0]["message"]["content"]
                     logger.info(f"AI [{name}] 200 (T={temperature})")
-                    _current_provider_idx = idx + 1  # round-robin
+                    if cache_key is not None:
+                        llm_cache.put(cache_key, content)
                     return content
 
                 if resp.status_code == 429:
                     logger.warning(f"AI [{name}] 429 → cooldown 60s, switching")
-                    _set_cooldown(name, 60)
-                    _current_provider_idx = idx + 1
+                    _state.set_cooldown(name, 60)
                     continue
 
                 if resp.status_code == 401:
                     logger.warning(f"AI [{name}] 401 → disabled (bad key)")
-                    _disabled_providers.add(name)
-                    _current_provider_idx = idx + 1
+                    _state.disable(name)
                     continue
 
                 if resp.status_code in (500, 502, 503):
                     logger.warning(f"AI [{name}] {resp.status_code} → switching")
-                    _current_provider_idx = idx + 1
                     last_error = f"{name} HTTP {resp.status_code}"
                     continue
 
                 last_error = f"{name} HTTP {resp.status_code}"
                 logger.warning(f"AI [{name}] {resp.status_code}")
-                _current_provider_idx = idx + 1
 
             except httpx.TimeoutException as e:
                 last_error = e
                 logger.warning(f"AI [{name}] timeout → switching")
-                _current_provider_idx = idx + 1
             except (KeyError, IndexError, json.JSONDecodeError) as e:
                 last_error = e
                 logger.error(f"AI [{name}] parse error: {e}")
-                _current_provider_idx = idx + 1
 
         if tried == 0:
             non_disabled = [p for p in _active_providers
-                            if p["name"] not in _disabled_providers]
+                            if p["name"] not in _state.disabled]
             if not non_disabled:
                 break
-            earliest = min(_provider_cooldowns.get(p["name"], 0)
+            earliest = min(_state.cooldowns.get(p["name"], 0)
                            for p in non_disabled)
             wait = max(1, earliest - time.time() + 0.5)
             logger.info(
@@ -0,0 +1,99 @@
+"""CryptoScanner — TTL-кэш ответов справочных API в SQLite (таблица http_cache)."""
+
+import functools
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+
+from database.db import (async_connection, ensure_http_cache_table, get_http_cache,
+                         invalidate_http_cache, put_http_cache)
+
+logger = logging.getLogger("crypto_scanner.http_cache")
+
+_table_ready = False
+
+
+def _key_part(arg: object) -> str:
+    """Часть ключа: клиент — по base_url, httpx-клиент пропускается, множества — sorted."""
+    if isinstance(arg, httpx.AsyncClient):
+        return ""
+    base_url = getattr(arg, "base_url", None)
+    if isinstance(base_url, str):
+        return base_url
+    if isinstance(arg, (set, frozenset)):
+        return repr(sorted(arg))
+    return repr(arg)
+
+
+def _make_key(endpoint: str, args: tuple, kwargs: dict) -> str:
+    """BLAKE2b-128 от endpoint + аргументов (kwargs в sorted-порядке)."""
+    raw = "|".join([
+        endpoint,
+        *(_key_part(a) for a in args),
+        *(f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items())),
+    ])
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+async def _connection_ready(db) -> None:
+    """CREATE TABLE один раз на процесс."""
+    global _table_ready
+    if not _table_ready:
+        await ensure_http_cache_table(db)
+        _table_ready = True
+
+
+def cached(ttl: int) -> Callable:
+    """Декоратор async-функции/метода: JSON-результат в http_cache на ttl сек.
+    endpoint = __qualname__. Пустой результат не кэшируется,
+    ошибки SQLite — warning и запрос в сеть.
+    wrapper.refresh(...) — запрос в сеть мимо кэша с перезаписью записи."""
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        endpoint = func.__qualname__
+
+        async def refresh(*args: Any, **kwargs: Any) -> Any:
+            result = await func(*args, **kwargs)
+            if result:
+                try:
+                    async with async_connection() as db:
+                        await _connection_ready(db)
+                        await put_http_cache(
+                            db, _make_key(endpoint, args, kwargs), endpoint,
+                            json.dumps(result, ensure_ascii=False, separators=(",", ":")),
+                            time.time() + ttl,
+                        )
+                except sqlite3.Error as e:
+                    logger.warning(f"http_cache write {endpoint}: {e}")
+            return result
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                async with async_connection() as db:
+                    await _connection_ready(db)
+                    body = await get_http_cache(
+                        db, _make_key(endpoint, args, kwargs), time.time()
+                    )
+                if body is not None:
+                    return json.loads(body)
+            except sqlite3.Error as e:
+                logger.warning(f"http_cache read {endpoint}: {e}")
+            return await refresh(*args, **kwargs)
+
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
+
+
+async def invalidate(func: Callable | str | None = None) -> int:
+    """Сбросить кэш функции/метода (или endpoint-строки; None — весь кэш)."""
+    endpoint = getattr(func, "__qualname__", func)
+    async with async_connection() as db:
+        await _connection_ready(db)
+        return await invalidate_http_cache(db, endpoint)
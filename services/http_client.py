@@ -0,0 +1,117 @@
+"""CryptoScanner — общий httpx.AsyncClient и запросы с retry для HTTP-клиентов."""
+
+import asyncio
+import contextlib
+from typing import Any
+
+import httpx
+
+from config import USER_AGENT
+from services.rate_limit import AdaptiveRateLimiter, backoff, host_limiter, retry_after
+
+# Keep-alive пул: повторные запросы к одному API без нового TCP/TLS handshake
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+
+def make_http_client(timeout: float = 15.0) -> httpx.AsyncClient:
+    """AsyncClient с HTTP/2 и keep-alive. Один на процесс, закрывать через async with."""
+    return httpx.AsyncClient(
+        http2=True, limits=HTTP_LIMITS, timeout=timeout,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+class _SlotStream(httpx.AsyncByteStream):
+    """Тело stream-ответа: слоты sem/host_limiter освобождаются при его закрытии (aclose)."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, slots: contextlib.AsyncExitStack):
+        self._stream = stream
+        self._slots = slots
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            await self._slots.aclose()
+
+
+async def request_with_retry(
+    http: httpx.AsyncClient,
+    method: str,
+    url: str,
+    *,
+    name: str,
+    limiter: AdaptiveRateLimiter,
+    key: str,
+    params: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    json: Any = None,
+    timeout: float | None = None,
+    sem: asyncio.Semaphore | None = None,
+    max_retries: int = 3,
+    stream: bool = False,
+) -> httpx.Response | None:
+    """
+    Запрос с паузой limiter по key перед каждой попыткой, в слоте host_limiter
+    (общий на процесс предел запросов к host, пауза по Retry-After/X-RateLimit-*).
+    429 -> удвоить задержку (+ Retry-After для всех корутин key), retry.
+    5xx/timeout -> backoff 5 сек, сетевая ошибка -> 10 сек (×2 за попытку, jitter).
+    Возвращает ответ (<500, последний 5xx — как есть) или None, если все попытки — 429.
+    После последней попытки timeout/сетевая ошибка пробрасывается.
+    stream=True — тело не читается заранее (aiter_lines), ответ закрывает вызывающий (aclose);
+    до закрытия ответ держит слоты sem и host_limiter — генерация идёт в пределах лимитов.
+    """
+    host = host_limiter(httpx.URL(url).host)
+    for attempt in range(1, max_retries + 1):
+        try:
+            async with contextlib.AsyncExitStack() as slots:
+                if sem is not None:
+                    await slots.enter_async_context(sem)
+                await slots.enter_async_context(host.acquire())
+                await limiter.wait_async(key)
+                request = http.build_request(
+                    method, url, params=params, headers=headers, json=json,
+                    timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+                )
+                resp = await http.send(request, stream=stream)
+                if stream:
+                    resp.stream = _SlotStream(resp.stream, slots.pop_all())
+        except httpx.TimeoutException:
+            if attempt < max_retries:
+                await asyncio.sleep(backoff(5, attempt))
+                continue
+            raise
+        except httpx.TransportError:
+            if attempt < max_retries:
+                await asyncio.sleep(backoff(10, attempt))
+                continue
+            raise
+
+        host.observe(resp.status_code, resp.headers)
+        if stream and (resp.status_code == 429
+                       or resp.status_code >= 500 and attempt < max_retries):
+            await resp.aclose()  # повтор — соединение вернуть в пул
+        if resp.status_code == 429:
+            delay = limiter.record_rate_limit(key)
+            pause = retry_after(resp.headers)
+            if pause:
+                limiter.defer(key, pause)
+            print(f"   ⏳ {name} rate limit, задержка {max(delay, pause or 0):.0f} сек")
+            continue
+        if resp.status_code >= 500 and attempt < max_retries:
+            await asyncio.sleep(backoff(5, attempt))
+            continue
+        return resp
+
+    return None
+
+
+async def get_with_retry(
+    http: httpx.AsyncClient, url: str, **kwargs: Any
+) -> httpx.Response | None:
+    """GET через request_with_retry (те же именованные параметры)."""
+    return await request_with_retry(http, "GET", url, **kwargs)
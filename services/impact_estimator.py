@@ -1,38 +1,59 @@
 """CryptoScanner — оценка влияния на цену через multi-temperature Groq."""
 
-import json, logging, os, re  # noqa: E401
+import asyncio, json, logging, os  # noqa: E401
+
+import orjson
 
 import config
-from services.groq_client import GroqAPIError, call_groq
+from services.groq_client import GroqAPIError, call_groq, extract_json, fill_prompt, split_prompt
 
 logger = logging.getLogger("crypto_scanner.impact")
 TEMPERATURES = [0.3, 0.5, 0.7]
-_prompt_cache: str = ""
+# Общий лимит вызовов в полёте, когда события оцениваются пачкой
+_sem: asyncio.Semaphore | None = None
+_sem_loop: asyncio.AbstractEventLoop | None = None
+_prompt_cache: tuple[str, str] = ("", "")
+
+
+def _get_sem() -> asyncio.Semaphore:
+    """Семафор MAX_CONCURRENT_IMPACT_CALLS текущего event loop (run_async может запускаться повторно)."""
+    global _sem, _sem_loop
+    loop = asyncio.get_running_loop()
+    if _sem is None or loop is not _sem_loop:
+        _sem = asyncio.Semaphore(config.MAX_CONCURRENT_IMPACT_CALLS)
+        _sem_loop = loop
+    return _sem
 
 
-def _load_prompt() -> str:
+def _load_prompt() -> tuple[str, str]:
+    """(system: правила без подстановок, user-шаблон: СОБЫТИЕ + ИСХОДЫ)."""
     global _prompt_cache
-    if not _prompt_cache:
+    if not _prompt_cache[1]:
         p = os.path.join(os.path.dirname(__file__), "..", "prompts",
                          "estimate_impact.md")
         with open(p, encoding="utf-8") as f:
-            _prompt_cache = f.read()
+            _prompt_cache = split_prompt(f.read(), "СОБЫТИЕ:")
     return _prompt_cache
 
 
 def _parse_json(text: str) -> dict:
-    """2-stage: direct → regex {...}."""
-    for src in [text, None]:
-        try:
-            if src is None:
-                m = re.search(r"\{.*\}", text, re.DOTALL)
-                if not m: return {}
-                src = m.group()
-            parsed = json.loads(src)
-            if isinstance(parsed, dict): return parsed
-        except (json.JSONDecodeError, TypeError):
-            pass
-    return {}
+    """2-stage: direct → первый {...} в тексте."""
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict): return parsed
+    except json.JSONDecodeError:
+        pass
+    return extract_json(text, dict) or {}
+
+
+def _parse_json_list(text: str) -> list:
+    """2-stage: direct → первый [...] в тексте. [] если не список."""
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, list): return parsed
+    except json.JSONDecodeError:
+        pass
+    return extract_json(text, list) or []
 
 
 def _validate_impacts(impacts: dict, expected_keys: set) -> bool:
@@ -69,20 +90,30 @@ def _validate_sign_logic(impacts: dict) -> dict:
     return corrected
 
 
-async def _single_iteration(prompt: str, temperature: float,
+def _check_impacts(impacts: dict, expected_keys: set,
+                   temperature: float) -> dict:
+    """Сырой ответ → validate → sign check → clamp. {} если невалиден."""
+    try:
+        impacts = {k: float(v) for k, v in impacts.items() if k in expected_keys}
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Parse error at T={temperature}: {e}")
+        return {}
+    if not _validate_impacts(impacts, expected_keys):
+        logger.warning(f"Invalid impacts at T={temperature}: {impacts}")
+        return {}
+    impacts = _validate_sign_logic(impacts)
+    return _clamp_impacts(impacts)
+
+
+async def _single_iteration(system: str, prompt: str, temperature: float,
                              expected_keys: set) -> dict:
     """Один вызов Groq → parse → validate → sign check → clamp. {} при ошибке."""
     try:
-        text = await call_groq(
-            prompt, model=config.GROQ_SCANNER_MODEL,
-            temperature=temperature, max_tokens=200)
-        impacts = _parse_json(text)
-        impacts = {k: float(v) for k, v in impacts.items() if k in expected_keys}
-        if not _validate_impacts(impacts, expected_keys):
-            logger.warning(f"Invalid impacts at T={temperature}: {impacts}")
-            return {}
-        impacts = _validate_sign_logic(impacts)
-        return _clamp_impacts(impacts)
+        async with _get_sem():
+            text = await call_groq(
+                prompt, model=config.GROQ_SCANNER_MODEL,
+                temperature=temperature, max_tokens=200, system=system)
+        return _check_impacts(_parse_json(text), expected_keys, temperature)
     except GroqAPIError as e:
         logger.warning(f"Groq error at T={temperature}: {e}")
         return {}
@@ -112,30 +143,42 @@ def _aggregate_iterations(iterations: list[dict]) -> dict:
     return result
 
 
+def _expected_keys(outcomes: list[dict]) -> set:
+    """Ключи исходов (outcome_key из БД или key из генератора)."""
+    return {o.get("outcome_key", o.get("key", "")) for o in outcomes}
+
+
+def _fill_prompt(template: str, event: dict, outcomes: list[dict]) -> str:
+    """User-часть промпта: СОБЫТИЕ + ИСХОДЫ (с вероятностями)."""
+    lines = [
+        f"{o.get('outcome_key', o.get('key','?'))}) "
+        f"[{o.get('outcome_category', o.get('category','?'))}] "
+        f"{o.get('outcome_text', o.get('text','?'))} "
+        f"(P={o.get('probability') or 0:.2f})"
+        for o in outcomes]
+    return fill_prompt(template, {
+        "coin_symbol": event.get("coin_symbol", "?"),
+        "event_type": event.get("event_type", "?"),
+        "title": event.get("title", "?"),
+        "date_event": event.get("date_event") or "unknown",
+        "importance": event.get("importance", "medium"),
+        "outcomes_text": "\n".join(lines),
+    })
+
+
 async def estimate_event_impacts(event: dict,
                                   outcomes: list[dict]) -> dict:
     """
-    3 итерации Groq (T=0.3, 0.5, 0.7) → медиана + low/high.
+    3 итерации Groq (T=0.3, 0.5, 0.7) параллельно → медиана + low/high.
     Возвращает {"A": {"impact", "low", "high"}, ...}. {} при ошибке.
     """
-    expected = {o.get("outcome_key", o.get("key", "")) for o in outcomes}
+    expected = _expected_keys(outcomes)
     if not (3 <= len(expected) <= 4):
         logger.error(f"Invalid outcome count: {len(expected)}"); return {}
-    lines = [
-        f"{o.get('outcome_key', o.get('key','?'))}) "
-        f"[{o.get('outcome_category', o.get('category','?'))}] "
-        f"{o.get('outcome_text', o.get('text','?'))} "
-        f"(P={o.get('probability') or 0:.2f})"
-        for o in outcomes]
-    prompt = _load_prompt()
-    for old, new in [("{coin_symbol}", event.get("coin_symbol", "?")),
-                     ("{event_type}", event.get("event_type", "?")),
-                     ("{title}", event.get("title", "?")),
-                     ("{date_event}", event.get("date_event") or "unknown"),
-                     ("{importance}", event.get("importance", "medium")),
-                     ("{outcomes_text}", "\n".join(lines))]:
-        prompt = prompt.replace(old, new)
-    iters = [await _single_iteration(prompt, t, expected) for t in TEMPERATURES]
+    system, template = _load_prompt()
+    prompt = _fill_prompt(template, event, outcomes)
+    iters = await asyncio.gather(
+        *(_single_iteration(system, prompt, t, expected) for t in TEMPERATURES))
     result = _aggregate_iterations(iters)
     ok_cnt = sum(1 for i in iters if i)
     if not result:
@@ -144,3 +187,95 @@ async def estimate_event_impacts(event: dict,
         logger.info(f"Impacts for {event.get('coin_symbol')}: "
                      f"{len(result)} outcomes, {ok_cnt}/3 OK")
     return result
+
+
+async def _batch_iteration(system: str, prompt: str, temperature: float,
+                           n: int) -> list[dict]:
+    """Один вызов Groq на пачку из n событий → n сырых словарей ({} — нет ответа)."""
+    try:
+        async with _get_sem():
+            text = await call_groq(
+                prompt, model=config.GROQ_SCANNER_MODEL,
+                temperature=temperature, max_tokens=200 * n, system=system)
+    except GroqAPIError as e:
+        logger.warning(f"Groq error at T={temperature} (batch {n}): {e}")
+        return [{}] * n
+    rows = _parse_json_list(text)
+    if len(rows) != n:
+        logger.warning(f"Batch T={temperature}: {len(rows)} rows for {n} events")
+        return [{}] * n
+    return [r if isinstance(r, dict) else {} for r in rows]
+
+
+async def _estimate_batch(items: list[tuple[dict, list[dict]]]) -> list[dict]:
+    """Пачка событий: 3 вызова (по одному на T) → медиана по каждому событию.
+    Событие, не прошедшее валидацию ни в одной итерации, — отдельным estimate_event_impacts."""
+    system, template = _load_prompt()
+    n = len(items)
+    blocks = [f"=== Событие {i} ===\n{_fill_prompt(template, ev, outs)}"
+              for i, (ev, outs) in enumerate(items, 1)]
+    prompt = (
+        f"Оцени КАЖДОЕ из {n} событий ниже отдельно, по правилам выше.\n"
+        f"Ответь ТОЛЬКО валидным JSON-массивом из {n} объектов в порядке событий "
+        f"(один объект формата выше на событие), без пояснений:\n"
+        f'[{{"A": +XX.X, "B": -XX.X, ...}}, ...]\n\n' + "\n\n".join(blocks)
+    )
+    per_t = await asyncio.gather(
+        *(_batch_iteration(system, prompt, t, n) for t in TEMPERATURES))
+
+    results: list[dict] = []
+    fallback: list[int] = []
+    for j, (ev, outs) in enumerate(items):
+        expected = _expected_keys(outs)
+        iters = [_check_impacts(rows[j], expected, t)
+                 for t, rows in zip(TEMPERATURES, per_t)]
+        result = _aggregate_iterations(iters)
+        if not result:
+            fallback.append(j)
+        results.append(result)
+
+    if fallback:
+        logger.info(f"Batch: {len(fallback)}/{n} events → per-event fallback")
+        retried = await asyncio.gather(
+            *(estimate_event_impacts(*items[j]) for j in fallback))
+        for j, result in zip(fallback, retried):
+            results[j] = result
+    return results
+
+
+async def estimate_batch_impacts(items: list[tuple[dict, list[dict]]],
+                                 batch_size: int = config.IMPACT_BATCH_SIZE
+                                 ) -> list[dict]:
+    """
+    Как estimate_event_impacts, но batch_size событий в одном вызове Groq:
+    3 вызова на пачку вместо 3 на событие. items — [(event, outcomes)].
+    Возвращает результаты в порядке items ({} — не удалось / неверное число исходов).
+    Дубли (совпадающий промпт) не отправляются: получают результат первого такого item.
+    """
+    results: list[dict] = [{} for _ in items]
+    valid = [i for i, (_, outs) in enumerate(items)
+             if 3 <= len(_expected_keys(outs)) <= 4]
+    for i in set(range(len(items))) - set(valid):
+        logger.error(f"Invalid outcome count for {items[i][0].get('coin_symbol')}")
+
+    # Одинаковый user-промпт (то же событие с теми же исходами) — один раз на пачку
+    _, template = _load_prompt()
+    first_by_prompt: dict[str, int] = {}
+    same_as: dict[int, int] = {}  # индекс дубля -> индекс оцениваемого item
+    for i in valid:
+        first = first_by_prompt.setdefault(_fill_prompt(template, *items[i]), i)
+        if first != i:
+            same_as[i] = first
+    unique = [i for i in valid if i not in same_as]
+
+    batches = [unique[k:k + batch_size] for k in range(0, len(unique), batch_size)]
+    done = await asyncio.gather(
+        *(_estimate_batch([items[i] for i in b]) for b in batches))
+    for b, batch_results in zip(batches, done):
+        for i, result in zip(b, batch_results):
+            results[i] = result
+    for i, first in same_as.items():
+        results[i] = results[first]
+    logger.info(f"Batch impacts: {sum(1 for r in results if r)}/{len(items)} OK, "
+                f"{len(batches)} batches, {len(same_as)} duplicates")
+    return results
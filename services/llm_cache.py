@@ -0,0 +1,44 @@
+"""CryptoScanner — in-memory LRU + TTL cache of LLM responses (used by groq_client.call_groq)."""
+
+import hashlib
+import time
+from collections import OrderedDict
+
+import config
+
+# key -> (expires_at, content); order = recency (last = most recently used)
+_cache: "OrderedDict[bytes, tuple[float, str]]" = OrderedDict()
+
+
+def make_key(model: str, system: str, prompt: str,
+             temperature: float, max_tokens: int) -> bytes:
+    """SHA-256 of (model, system, prompt, temperature, max_tokens): each T gets its own slot."""
+    return hashlib.sha256(b"\0".join([
+        model.encode(), system.encode(), prompt.encode(),
+        repr(temperature).encode(), str(max_tokens).encode(),
+    ])).digest()
+
+
+def get(key: bytes) -> str | None:
+    """Cached response or None (missing / expired)."""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def put(key: bytes, content: str) -> None:
+    """Store for LLM_CACHE_TTL seconds; evict least recently used beyond LLM_CACHE_MAXSIZE."""
+    _cache[key] = (time.monotonic() + config.LLM_CACHE_TTL, content)
+    _cache.move_to_end(key)
+    while len(_cache) > config.LLM_CACHE_MAXSIZE:
+        _cache.popitem(last=False)
+
+
+def clear() -> None:
+    """Drop all cached responses."""
+    _cache.clear()
@@ -2,14 +2,44 @@
 
 from __future__ import annotations
 
-import time
+import asyncio
 
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from config import RateLimitPolicy
+from services.http_client import request_with_retry
+from services.rate_limit import AdaptiveRateLimiter
 
 # catalogId констант Binance CMS
 CATALOG_LISTING: int = 48
 CATALOG_LATEST: int = 49
 CATALOG_DELISTING: int = 131
+CATALOGS: dict[str, int] = {
+    "listings": CATALOG_LISTING,
+    "delistings": CATALOG_DELISTING,
+    "latest": CATALOG_LATEST,
+}
+
+# 5xx и обрывы соединения: 3 повтора с backoff 2/4/8 сек (urllib3 Retry).
+# 429 сюда не входит — его обрабатывает AdaptiveRateLimiter в _request
+_RETRY = Retry(
+    total=3, backoff_factor=2, status_forcelist=(500, 502, 503, 504),
+    allowed_methods=("GET", "POST"), raise_on_status=False,
+)
+
+
+def _make_session() -> requests.Session:
+    """Session с keep-alive пулом: запросы к binance.com без нового TCP/TLS handshake."""
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=_RETRY),
+    )
+    return session
 
 
 class BinanceAnnouncementsClient:
@@ -25,9 +55,22 @@ class BinanceAnnouncementsClient:
         "Chrome/120.0.0.0 Safari/537.36"
     )
 
-    def __init__(self, timeout: int = 15, delay: float = 2.0) -> None:
+    def __init__(
+        self, timeout: int = 15, delay: float = 2.0,
+        policy: RateLimitPolicy | None = None,
+    ) -> None:
+        """policy (config.BINANCE_POLICY) важнее delay, если задана."""
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        self._session: requests.Session = _make_session()
+        self._headers: dict[str, str] = {
+            "Content-Type": "application/json",
+            "User-Agent": self.USER_AGENT,
+            "Accept": "application/json",
+        }
 
     # ------------------------------------------------------------------
     # Публичные методы
@@ -59,6 +102,29 @@ class BinanceAnnouncementsClient:
         """catalogId=49 (Latest News)."""
         return self._fetch_articles(CATALOG_LATEST, page, page_size)
 
+    async def get_all_async(
+        self,
+        http: httpx.AsyncClient,
+        page_size: int = 20,
+        catalogs: tuple[str, ...] = ("listings", "delistings", "latest"),
+    ) -> dict[str, list[dict]]:
+        """
+        Несколько каталогов параллельно через общий httpx-клиент (HTTP/2, keep-alive).
+        Старты запросов разводит тот же limiter. {"listings": [...], ...};
+        каталог с ошибкой/без ответа -> [].
+        """
+        responses = await asyncio.gather(
+            *(self._request_async(http, CATALOGS[name], 1, page_size) for name in catalogs),
+            return_exceptions=True,
+        )
+        result: dict[str, list[dict]] = {}
+        for name, raw in zip(catalogs, responses):
+            if isinstance(raw, BaseException):
+                print(f"   ❌ Binance {name}: {raw}")
+                raw = None
+            result[name] = self._extract_articles(raw) if raw is not None else []
+        return result
+
     # ------------------------------------------------------------------
     # Внутренние
     # ------------------------------------------------------------------
@@ -81,6 +147,14 @@ class BinanceAnnouncementsClient:
         - {"data": {"articles": [...]}}
         - {"data": [...]}
         """
+        # Быстрый путь: реальная форма CMS API, один каталог на запрос
+        try:
+            articles = data["data"]["catalogs"][0]["articles"]
+            if articles and isinstance(articles, list):
+                return articles
+        except (KeyError, IndexError, TypeError):
+            pass
+
         if isinstance(data, list):
             return data
 
@@ -122,58 +196,62 @@ class BinanceAnnouncementsClient:
         POST запрос к Binance CMS API.
         Если POST не работает — попробовать GET альтернативу.
         """
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": self.USER_AGENT,
-            "Accept": "application/json",
-        }
-        payload = {
+        payload = self._payload(catalog_id, page, page_size)
+
+        # 5xx и сетевые ошибки повторяет Retry адаптера сессии; 429 — здесь, через limiter
+        max_retries = 3
+        for _ in range(max_retries):
+            self.limiter.wait(self.QUERY_URL)
+            resp = self._session.post(
+                self.QUERY_URL,
+                json=payload,
+                headers=self._headers,
+                timeout=self.timeout,
+            )
+
+            if resp.status_code == 429:
+                delay = self.limiter.record_rate_limit(self.QUERY_URL)
+                print(f"   ⏳ Binance rate limit, задержка {delay:.0f} сек")
+                continue
+            if resp.status_code in (403, 404):
+                # POST заблокирован — пробуем GET fallback
+                return self._request_get_fallback(catalog_id)
+
+            resp.raise_for_status()
+            self.limiter.record_success(self.QUERY_URL)
+            return orjson.loads(resp.content)
+
+        return None
+
+    async def _request_async(
+        self, http: httpx.AsyncClient, catalog_id: int, page: int, page_size: int
+    ) -> dict | None:
+        """Как _request, но через общий httpx-клиент (request_with_retry, wait_async)."""
+        resp = await request_with_retry(
+            http, "POST", self.QUERY_URL, name="Binance",
+            limiter=self.limiter, key=self.QUERY_URL,
+            headers=self._headers,
+            json=self._payload(catalog_id, page, page_size),
+            timeout=self.timeout,
+        )
+        if resp is None:
+            return None
+        if resp.status_code in (403, 404):
+            # POST заблокирован — GET fallback (sync, в отдельном потоке)
+            return await asyncio.to_thread(self._request_get_fallback, catalog_id)
+        resp.raise_for_status()
+        self.limiter.record_success(self.QUERY_URL)
+        return orjson.loads(resp.content)
+
+    @staticmethod
+    def _payload(catalog_id: int, page: int, page_size: int) -> dict:
+        return {
             "type": 1,
             "pageNo": page,
             "pageSize": page_size,
             "catalogId": catalog_id,
         }
 
-        max_retries = 3
-        for attempt in range(1, max_retries + 1):
-            try:
-                time.sleep(self.delay)
-                resp = requests.post(
-                    self.QUERY_URL,
-                    json=payload,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-
-                if resp.status_code == 429:
-                    print("   ⏳ Binance rate limit, жду 60 сек...")
-                    time.sleep(60)
-                    continue
-                if resp.status_code in (403, 404):
-                    # POST заблокирован — пробуем GET fallback
-                    return self._request_get_fallback(catalog_id)
-                if resp.status_code >= 500:
-                    if attempt < max_retries:
-                        time.sleep(5)
-                        continue
-                    resp.raise_for_status()
-
-                resp.raise_for_status()
-                return resp.json()
-
-            except requests.ConnectionError:
-                if attempt < max_retries:
-                    time.sleep(10)
-                    continue
-                raise
-            except requests.Timeout:
-                if attempt < max_retries:
-                    time.sleep(5)
-                    continue
-                raise
-
-        return None
-
     def _request_get_fallback(self, catalog_id: int) -> dict | None:
         """GET fallback если POST заблокирован."""
         alt_url = (
@@ -190,12 +268,12 @@ class BinanceAnnouncementsClient:
             "pageSize": "20",
         }
         try:
-            time.sleep(self.delay)
-            resp = requests.get(
+            self.limiter.wait(self.QUERY_URL)
+            resp = self._session.get(
                 alt_url, params=params, headers=headers, timeout=self.timeout
             )
             if resp.status_code == 200:
-                return resp.json()
+                return orjson.loads(resp.content)
         except Exception:
             pass
         return None
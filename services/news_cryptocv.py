@@ -4,18 +4,32 @@ from __future__ import annotations
 
 import time
 
+import httpx
+import orjson
 import requests
 
+from config import USER_AGENT, RateLimitPolicy
+from services.http_client import get_with_retry
+from services.rate_limit import AdaptiveRateLimiter, backoff, retry_after
+
 
 class CryptoCVClient:
     """Клиент для cryptocurrency.cv — бесплатный, без ключа."""
 
     def __init__(
-        self, base_url: str, timeout: int = 15, delay: float = 2.0
+        self, base_url: str, timeout: int = 15, delay: float = 2.0,
+        policy: RateLimitPolicy | None = None,
     ) -> None:
+        """policy (config.CRYPTOCV_POLICY) важнее delay, если задана."""
         self.base_url: str = base_url.rstrip("/")
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        # Keep-alive: страницы и повторные запросы без нового TCP/TLS handshake
+        self._session: requests.Session = requests.Session()
+        self._session.headers["User-Agent"] = USER_AGENT
 
     # ------------------------------------------------------------------
     # Публичные методы
@@ -39,61 +53,102 @@ class CryptoCVClient:
 
     def search_news(self, query: str, limit: int = 50) -> list[dict]:
         """GET /api/archive?q={query}&limit={limit}."""
-        base = self.base_url.replace("/api/news", "/api/archive")
-        raw = self._request(base, params={"q": query, "limit": str(limit)})
+        raw = self._request(self._archive_url, params={"q": query, "limit": str(limit)})
         return self._extract_list(raw, limit)
 
     def get_news_by_ticker(self, ticker: str, limit: int = 50) -> list[dict]:
         """GET /api/archive?ticker={ticker}&limit={limit}."""
-        base = self.base_url.replace("/api/news", "/api/archive")
-        raw = self._request(base, params={"ticker": ticker, "limit": str(limit)})
+        raw = self._request(self._archive_url, params={"ticker": ticker, "limit": str(limit)})
         return self._extract_list(raw, limit)
 
+    # Async-варианты: общий httpx-клиент (один пул с Parallel/CryptoPanic/Google)
+
+    async def check_connection_async(self, http: httpx.AsyncClient) -> bool:
+        """Как check_connection, через общий httpx-клиент."""
+        try:
+            return await self._request_async(http, self.base_url) is not None
+        except Exception:
+            return False
+
+    async def get_latest_news_async(
+        self, http: httpx.AsyncClient, limit: int = 50
+    ) -> list[dict]:
+        """Как get_latest_news, через общий httpx-клиент."""
+        raw = await self._request_async(http, self.base_url)
+        return self._extract_list(raw, limit)
+
+    async def search_news_async(
+        self, http: httpx.AsyncClient, query: str, limit: int = 50
+    ) -> list[dict]:
+        """Как search_news, через общий httpx-клиент."""
+        raw = await self._request_async(
+            http, self._archive_url, params={"q": query, "limit": str(limit)})
+        return self._extract_list(raw, limit)
+
+    async def get_news_by_ticker_async(
+        self, http: httpx.AsyncClient, ticker: str, limit: int = 50
+    ) -> list[dict]:
+        """Как get_news_by_ticker, через общий httpx-клиент."""
+        raw = await self._request_async(
+            http, self._archive_url, params={"ticker": ticker, "limit": str(limit)})
+        return self._extract_list(raw, limit)
+
+    def close(self) -> None:
+        """Закрыть соединения сессии."""
+        self._session.close()
+
     # ------------------------------------------------------------------
     # HTTP
     # ------------------------------------------------------------------
 
+    @property
+    def _archive_url(self) -> str:
+        """/api/news -> /api/archive (поиск и фильтр по тикеру)."""
+        return self.base_url.replace("/api/news", "/api/archive")
+
     def _request(
         self, url: str, params: dict[str, str] | None = None
     ) -> dict | list | None:
-        """HTTP GET. User-Agent: CryptoScanner/1.0. Retry 3x. sleep(delay)."""
-        headers = {"User-Agent": "CryptoScanner/1.0"}
+        """HTTP GET, retry 3x. 429 -> задержка ×2 (+ Retry-After), 5xx/сеть -> backoff с jitter."""
         max_retries = 3
 
         for attempt in range(1, max_retries + 1):
             try:
-                time.sleep(self.delay)
-                resp = requests.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
+                self.limiter.wait(self.base_url)
+                resp = self._session.get(url, params=params, timeout=self.timeout)
 
                 if resp.status_code == 429:
-                    print("   ⏳ cryptocurrency.cv rate limit, жду 60 сек...")
-                    time.sleep(60)
+                    delay = self.limiter.record_rate_limit(self.base_url)
+                    pause = retry_after(resp.headers)
+                    if pause:
+                        self.limiter.defer(self.base_url, pause)
+                    print(f"   ⏳ cryptocurrency.cv rate limit, задержка "
+                          f"{max(delay, pause or 0):.0f} сек")
                     continue
                 if resp.status_code >= 500:
                     if attempt < max_retries:
-                        time.sleep(5)
+                        time.sleep(backoff(5, attempt))
                         continue
                     resp.raise_for_status()
 
                 resp.raise_for_status()
+                self.limiter.record_success(self.base_url)
 
                 content_type = resp.headers.get("Content-Type", "")
-                if "json" in content_type or resp.text.strip().startswith(("{", "[")):
-                    return resp.json()
+                if "json" in content_type or resp.content.lstrip().startswith((b"{", b"[")):
+                    return orjson.loads(resp.content)
 
                 # Не JSON — вернуть None
                 return None
 
             except requests.ConnectionError:
                 if attempt < max_retries:
-                    time.sleep(10)
+                    time.sleep(backoff(10, attempt))
                     continue
                 raise
             except requests.Timeout:
                 if attempt < max_retries:
-                    time.sleep(5)
+                    time.sleep(backoff(5, attempt))
                     continue
                 raise
 
@@ -119,3 +174,21 @@ class CryptoCVClient:
             if len(list_keys) == 1:
                 return data[list_keys[0]][:limit]
         return []
+
+    async def _request_async(
+        self, http: httpx.AsyncClient, url: str, params: dict[str, str] | None = None
+    ) -> dict | list | None:
+        """Как _request, но через общий httpx-клиент (get_with_retry, wait_async)."""
+        resp = await get_with_retry(
+            http, url, name="cryptocurrency.cv", limiter=self.limiter,
+            key=self.base_url, params=params, timeout=self.timeout,
+        )
+        if resp is None:
+            return None
+        resp.raise_for_status()
+        self.limiter.record_success(self.base_url)
+
+        content_type = resp.headers.get("Content-Type", "")
+        if "json" in content_type or resp.content.lstrip().startswith((b"{", b"[")):
+            return orjson.loads(resp.content)
+        return None
@@ -2,9 +2,19 @@
 
 from __future__ import annotations
 
+import asyncio
+import math
 import time
 
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+
+from config import CACHE_TTL_NEWS, USER_AGENT, RateLimitPolicy
+from services.http_cache import cached
+from services.http_client import get_with_retry
+from services.rate_limit import AdaptiveRateLimiter, backoff, retry_after
 
 
 class CryptoPanicClient:
@@ -16,12 +26,21 @@ class CryptoPanicClient:
         base_url: str,
         timeout: int = 15,
         delay: float = 2.0,
+        policy: RateLimitPolicy | None = None,
     ) -> None:
-        """Если auth_token пуст — check_connection вернёт False."""
+        """Если auth_token пуст — check_connection вернёт False.
+        policy (config.CRYPTOPANIC_POLICY) важнее delay, если задана."""
         self.auth_token: str = auth_token
         self.base_url: str = base_url.rstrip("/")
         self.timeout: int = timeout
-        self.delay: float = delay
+        self.limiter: AdaptiveRateLimiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
+        # Keep-alive: страницы и повторные запросы без нового TCP/TLS handshake
+        self._session: requests.Session = requests.Session()
+        self._session.headers["User-Agent"] = USER_AGENT
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
     # ------------------------------------------------------------------
     # Публичные методы
@@ -44,6 +63,19 @@ class CryptoPanicClient:
         except Exception:
             return False
 
+    async def check_connection_async(self, http: httpx.AsyncClient) -> bool:
+        """Как check_connection, через общий httpx-клиент."""
+        if not self.auth_token:
+            return False
+        try:
+            data = await self._request_async(
+                http, f"{self.base_url}/posts/",
+                {"auth_token": self.auth_token, "public": "true", "page": "1"},
+            )
+            return "results" in data
+        except Exception:
+            return False
+
     def get_latest_news(
         self,
         filter_type: str | None = None,
@@ -58,16 +90,7 @@ class CryptoPanicClient:
         """
         all_items: list[dict] = []
         url: str | None = f"{self.base_url}/posts/"
-        params: dict[str, str] = {
-            "auth_token": self.auth_token,
-            "public": "true",
-            "kind": "news",
-            "regions": "en",
-        }
-        if filter_type:
-            params["filter"] = filter_type
-        if currencies:
-            params["currencies"] = currencies
+        params = self._news_params(filter_type, currencies)
 
         page = 0
         while url and len(all_items) < limit:
@@ -81,6 +104,44 @@ class CryptoPanicClient:
 
         return all_items[:limit]
 
+    @cached(CACHE_TTL_NEWS)
+    async def get_latest_news_async(
+        self,
+        http: httpx.AsyncClient,
+        filter_type: str | None = None,
+        currencies: str | None = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        """
+        Как get_latest_news, но через общий httpx-клиент.
+        По первой странице известен её размер: страницы 2..K (page=N) до limit
+        запрашиваются параллельно, темп — limiter. Страницы берутся по порядку
+        до первой пустой или упавшей (404 за последней, 5xx после retry) —
+        уже полученные новости не теряются.
+        Результат кэшируется в http_cache на CACHE_TTL_NEWS (ключ — фильтры и limit).
+        """
+        url = f"{self.base_url}/posts/"
+        params = self._news_params(filter_type, currencies)
+        data = await self._request_async(http, url, params)
+        all_items: list[dict] = data.get("results", [])
+        if not all_items or not data.get("next") or len(all_items) >= limit:
+            return all_items[:limit]
+
+        pages = math.ceil(limit / len(all_items))
+        responses = await asyncio.gather(*(
+            self._request_async(http, url, {**params, "page": str(page)})
+            for page in range(2, pages + 1)
+        ), return_exceptions=True)
+        for page, data in enumerate(responses, start=2):
+            if isinstance(data, BaseException):
+                print(f"   ⚠️ CryptoPanic страница {page}: {data}")
+                break
+            results = data.get("results", [])
+            all_items.extend(results)
+            if not results or not data.get("next"):
+                break
+        return all_items[:limit]
+
     def get_important_news(self, limit: int = 50) -> list[dict]:
         """Shortcut: get_latest_news(filter_type='important')."""
         return self.get_latest_news(filter_type="important", limit=limit)
@@ -93,50 +154,88 @@ class CryptoPanicClient:
             return []
         return [c.get("code", "") for c in currencies if c.get("code")]
 
+    def close(self) -> None:
+        """Закрыть соединения сессии."""
+        self._session.close()
+
     # ------------------------------------------------------------------
     # HTTP
     # ------------------------------------------------------------------
 
+    def _news_params(
+        self, filter_type: str | None, currencies: str | None
+    ) -> dict[str, str]:
+        """Параметры GET /posts/ для get_latest_news."""
+        params: dict[str, str] = {
+            "auth_token": self.auth_token,
+            "public": "true",
+            "kind": "news",
+            "regions": "en",
+        }
+        if filter_type:
+            params["filter"] = filter_type
+        if currencies:
+            params["currencies"] = currencies
+        return params
+
     def _request(
         self, url: str, params: dict[str, str] | None = None
     ) -> dict:
-        """HTTP GET. 429 -> sleep(60). Retry 3x."""
-        headers = {"User-Agent": "CryptoScanner/1.0"}
+        """HTTP GET, retry 3x. 429 -> задержка ×2 (+ Retry-After), 5xx/сеть -> backoff с jitter."""
         max_retries = 3
 
         for attempt in range(1, max_retries + 1):
             try:
-                time.sleep(self.delay)
-                resp = requests.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
+                self.limiter.wait(self.base_url)
+                resp = self._session.get(url, params=params, timeout=self.timeout)
 
                 if resp.status_code in (401, 403):
                     raise ValueError(
                         f"CryptoPanic {resp.status_code}: неверный auth_token"
                     )
                 if resp.status_code == 429:
-                    print("   ⏳ CryptoPanic rate limit, жду 60 сек...")
-                    time.sleep(60)
+                    delay = self.limiter.record_rate_limit(self.base_url)
+                    pause = retry_after(resp.headers)
+                    if pause:
+                        self.limiter.defer(self.base_url, pause)
+                    print(f"   ⏳ CryptoPanic rate limit, задержка "
+                          f"{max(delay, pause or 0):.0f} сек")
                     continue
                 if resp.status_code >= 500:
                     if attempt < max_retries:
-                        time.sleep(5)
+                        time.sleep(backoff(5, attempt))
                         continue
                     resp.raise_for_status()
 
                 resp.raise_for_status()
-                return resp.json()
+                self.limiter.record_success(self.base_url)
+                return orjson.loads(resp.content)
 
             except requests.ConnectionError:
                 if attempt < max_retries:
-                    time.sleep(10)
+                    time.sleep(backoff(10, attempt))
                     continue
                 raise
             except requests.Timeout:
                 if attempt < max_retries:
-                    time.sleep(5)
+                    time.sleep(backoff(5, attempt))
                     continue
                 raise
 
         return {}
+
+    async def _request_async(
+        self, http: httpx.AsyncClient, url: str, params: dict[str, str]
+    ) -> dict:
+        """Как _request, но через общий httpx-клиент (get_with_retry, wait_async)."""
+        resp = await get_with_retry(
+            http, url, name="CryptoPanic", limiter=self.limiter,
+            key=self.base_url, params=params, timeout=self.timeout,
+        )
+        if resp is None:
+            return {}
+        if resp.status_code in (401, 403):
+            raise ValueError(f"CryptoPanic {resp.status_code}: неверный auth_token")
+        resp.raise_for_status()
+        self.limiter.record_success(self.base_url)
+        return orjson.loads(resp.content)
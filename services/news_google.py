@@ -2,19 +2,40 @@
 
 from __future__ import annotations
 
-import time
+import asyncio
+import functools
 import urllib.parse
+import xml.etree.ElementTree as ET
+from collections.abc import Sequence
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 import feedparser
+import httpx
 import requests
 
+from config import CACHE_TTL_NEWS, RateLimitPolicy
+from services.http_cache import cached
+from services.rate_limit import AdaptiveRateLimiter, host_limiter
+
+
+@functools.lru_cache(maxsize=512)
+def _build_google_url(base_url: str, query: str) -> str:
+    """RSS URL для запроса; запросы повторяются от скана к скану — urlencode один раз."""
+    params = urllib.parse.urlencode({
+        "q": query,
+        "hl": "en",
+        "gl": "US",
+        "ceid": "US:en",
+    })
+    return f"{base_url}?{params}"
+
 
 class GoogleNewsClient:
     """Парсинг Google News RSS по крипто-запросам.
 
     Использует requests для загрузки (поддержка прокси, User-Agent),
-    feedparser для парсинга XML.
+    xml.etree для разбора RSS 2.0 (feedparser — fallback для битого XML).
     """
 
     _USER_AGENT = (
@@ -29,9 +50,13 @@ class GoogleNewsClient:
         max_total: int = 100,
         timeout: int = 15,
         proxies: dict | None = None,
+        policy: RateLimitPolicy | None = None,
     ) -> None:
         self.base_url = base_url
-        self.delay = delay
+        self.limiter = (
+            AdaptiveRateLimiter(policy) if policy
+            else AdaptiveRateLimiter.from_delay(delay)
+        )
         self.max_total = max_total
         self.timeout = timeout
         self.proxies = proxies
@@ -47,18 +72,111 @@ class GoogleNewsClient:
             content = self._fetch_rss(url)
             if content is None:
                 return False
-            feed = feedparser.parse(content)
-            return not feed.bozo and len(feed.entries) > 0
+            return len(self._parse_entries(content, "bitcoin", 1)) > 0
         except Exception:
             return False
 
-    def fetch_query(self, query: str, max_items: int = 30) -> list[dict]:
-        """Загрузить RSS для одного запроса. Возвращает список entry-dict."""
-        url = self._build_url(query)
+    def fetch_query(
+        self, query: str, max_items: int = 30, url: str | None = None
+    ) -> list[dict]:
+        """Загрузить RSS для одного запроса. Возвращает список entry-dict.
+        url — готовый RSS URL (config.GOOGLE_NEWS_URLS), иначе собирается."""
+        url = url or self._build_url(query)
         content = self._fetch_rss(url)
         if content is None:
             return []
 
+        return self._parse_entries(content, query, max_items)
+
+    def fetch_all(
+        self, queries: list[str], urls: Sequence[str] | None = None
+    ) -> list[dict]:
+        """Загрузить RSS для всех запросов с дедупликацией по title (_title_key).
+        urls — готовые RSS URL в том же порядке, что queries."""
+        all_entries: list[dict] = []
+        seen_titles: set[str] = set()
+
+        for i, query in enumerate(queries):
+            if len(all_entries) >= self.max_total:
+                break
+
+            # Слоты limiter: старты не чаще current_delay, первый — без паузы
+            self.limiter.wait(self.base_url)
+            entries = self.fetch_query(query, url=urls[i] if urls else None)
+            for entry in entries:
+                key = self._title_key(entry["title"])
+                if key not in seen_titles and len(all_entries) < self.max_total:
+                    seen_titles.add(key)
+                    all_entries.append(entry)
+
+        return all_entries
+
+    async def fetch_all_async(
+        self,
+        http: httpx.AsyncClient,
+        queries: list[str],
+        urls: Sequence[str] | None = None,
+        concurrency: int = 4,
+    ) -> list[dict]:
+        """Как fetch_all, но запросы параллельно: в полёте не больше concurrency,
+        старты разводит limiter (wait_async), разбор XML — в отдельном потоке.
+        Дедупликация по _title_key в порядке queries, не больше max_total."""
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(i: int, query: str) -> list[dict]:
+            async with sem:
+                content = await self._fetch_rss_async(
+                    http, urls[i] if urls else self._build_url(query)
+                )
+            if content is None:
+                return []
+            return await asyncio.to_thread(self._parse_entries, content, query, 30)
+
+        results = await asyncio.gather(
+            *(one(i, q) for i, q in enumerate(queries)), return_exceptions=True
+        )
+        all_entries: list[dict] = []
+        seen_titles: set[str] = set()
+        for entries in results:
+            if isinstance(entries, BaseException):
+                continue
+            for entry in entries:
+                key = self._title_key(entry["title"])
+                if key not in seen_titles and len(all_entries) < self.max_total:
+                    seen_titles.add(key)
+                    all_entries.append(entry)
+        return all_entries
+
+    def _parse_entries(self, content: str, query: str, max_items: int) -> list[dict]:
+        """XML -> список entry-dict. Читаются только нужные поля <item>;
+        XML, который не разбирается etree, — через feedparser (bozo -> [])."""
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError:
+            return self._parse_entries_feedparser(content, query, max_items)
+
+        entries: list[dict] = []
+        for item in root.iter("item"):
+            if len(entries) >= max_items:
+                break
+            title = (item.findtext("title") or "").strip()
+            published = (item.findtext("pubDate") or "").strip()
+            source = item.findtext("source")
+            entries.append({
+                "title": title,
+                "link": (item.findtext("link") or "").strip(),
+                "published": published,
+                "published_parsed": self._parse_pubdate(published),
+                "source_name": (source.strip() if source and source.strip()
+                                else self._extract_source({"title": title})),
+                "query": query,
+            })
+        return entries
+
+    def _parse_entries_feedparser(
+        self, content: str, query: str, max_items: int
+    ) -> list[dict]:
+        """Fallback _parse_entries: feedparser терпит битый XML (bozo -> [])."""
         feed = feedparser.parse(content)
         if feed.bozo:
             return []
@@ -75,46 +193,59 @@ class GoogleNewsClient:
             })
         return entries
 
-    def fetch_all(self, queries: list[str]) -> list[dict]:
-        """Загрузить RSS для всех запросов с дедупликацией по title."""
-        all_entries: list[dict] = []
-        seen_titles: set[str] = set()
-
-        for i, query in enumerate(queries):
-            if len(all_entries) >= self.max_total:
-                break
-
-            entries = self.fetch_query(query)
-            for entry in entries:
-                title = entry["title"]
-                if title not in seen_titles and len(all_entries) < self.max_total:
-                    seen_titles.add(title)
-                    all_entries.append(entry)
-
-            if i < len(queries) - 1:
-                time.sleep(self.delay)
-
-        return all_entries
+    @cached(CACHE_TTL_NEWS)
+    async def _fetch_rss_async(self, http: httpx.AsyncClient, url: str) -> str | None:
+        """_fetch_rss через общий httpx-клиент (прокси — только в sync-версии).
+        XML кэшируется в http_cache по URL на CACHE_TTL_NEWS: повторный запуск не ходит в сеть."""
+        host = host_limiter(httpx.URL(url).host)
+        try:
+            async with host.acquire():
+                await self.limiter.wait_async(self.base_url)
+                resp = await http.get(
+                    url, headers={"User-Agent": self._USER_AGENT}, timeout=self.timeout
+                )
+        except httpx.HTTPError:
+            return None
+        host.observe(resp.status_code, resp.headers)
+        if resp.status_code == 200:
+            self.limiter.record_success(self.base_url)
+            return resp.text
+        if resp.status_code == 429:
+            self.limiter.record_rate_limit(self.base_url)
+        return None
 
     def _fetch_rss(self, url: str) -> str | None:
         """Загрузить RSS через requests. Возвращает XML-строку или None."""
         try:
             resp = self._session.get(url, timeout=self.timeout)
             if resp.status_code == 200:
+                self.limiter.record_success(self.base_url)
                 return resp.text
+            if resp.status_code == 429:
+                self.limiter.record_rate_limit(self.base_url)
             return None
         except requests.RequestException:
             return None
 
     def _build_url(self, query: str) -> str:
         """Сформировать URL для Google News RSS."""
-        params = urllib.parse.urlencode({
-            "q": query,
-            "hl": "en",
-            "gl": "US",
-            "ceid": "US:en",
-        })
-        return f"{self.base_url}?{params}"
+        return _build_google_url(self.base_url, query)
+
+    @staticmethod
+    def _parse_pubdate(published: str):
+        """RFC 822 pubDate -> time.struct_time в UTC (как feedparser published_parsed)."""
+        if not published:
+            return None
+        try:
+            return parsedate_to_datetime(published).utctimetuple()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        """Ключ дедупликации: title без суффикса " - Source", casefold —
+        одна новость из разных изданий и разных запросов считается один раз."""
+        return title.rsplit(" - ", 1)[0].strip().casefold()
 
     @staticmethod
     def _extract_source(entry: dict) -> str:
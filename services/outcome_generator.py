@@ -3,68 +3,104 @@
 import json
 import logging
 import os
-import re
+from typing import NamedTuple
 
-from services.groq_client import call_groq, GroqAPIError
+import orjson
+
+from services.groq_client import call_groq, extract_json, fill_prompt, GroqAPIError, split_prompt
 from services.outcome_templates import OUTCOME_TEMPLATES, GENERIC_OUTCOMES
 from config import GROQ_OUTCOME_MODEL, GROQ_OUTCOME_TEMPERATURE, GROQ_OUTCOME_MAX_TOKENS
 
 logger = logging.getLogger(__name__)
+_prompt_cache: tuple[str, str] = ("", "")
+
+
+def _load_prompt() -> tuple[str, str]:
+    """(system: правила и формат ответа, user-шаблон: СОБЫТИЕ). Читается один раз."""
+    global _prompt_cache
+    if not _prompt_cache[1]:
+        prompt_path = os.path.join(
+            os.path.dirname(__file__), "..", "prompts", "generate_outcomes.md"
+        )
+        with open(prompt_path, "r", encoding="utf-8") as f:
+            _prompt_cache = split_prompt(f.read(), "СОБЫТИЕ:")
+    return _prompt_cache
+
+
+VALID_CATEGORIES: frozenset[str] = frozenset({"positive", "neutral", "negative", "cancelled"})
 
 
 def validate_outcomes(outcomes: list) -> bool:
-    """Проверить что исходы валидны (MECE)."""
-    if not isinstance(outcomes, list):
-        return False
-    if len(outcomes) < 3 or len(outcomes) > 4:
-        return False
-    keys = [o.get("key") for o in outcomes]
-    if len(set(keys)) != len(keys):
-        return False
-    valid_cats = {"positive", "neutral", "negative", "cancelled"}
-    categories = [o.get("category") for o in outcomes]
-    if not all(c in valid_cats for c in categories):
-        return False
-    if "positive" not in categories:
-        return False
-    if "negative" not in categories and "cancelled" not in categories:
+    """Проверить что исходы валидны (MECE). Один проход, выход на первой ошибке."""
+    if not isinstance(outcomes, list) or not 3 <= len(outcomes) <= 4:
         return False
+    seen: set = set()
+    has_positive = has_negative = False
     for o in outcomes:
-        if not o.get("key") or not o.get("text") or not o.get("category"):
+        if not isinstance(o, dict):
+            return False
+        key, category = o.get("key"), o.get("category")
+        if not key or not o.get("text") or category not in VALID_CATEGORIES or key in seen:
             return False
-    return True
-
-
-def _apply_template(event: dict) -> list:
-    """Подставить шаблон для стандартного типа."""
-    template = OUTCOME_TEMPLATES[event["event_type"]]
-    coin = event.get("coin_symbol", "???")
-    title = event.get("title", "")
-    outcomes = []
-    for o in template["outcomes"]:
-        text = o["text"].replace("{coin}", coin).replace("{title}", title)
-        outcomes.append({
-            "key": o["key"],
-            "text": text[:100],
-            "category": o["category"],
+        seen.add(key)
+        if category == "positive":
+            has_positive = True
+        elif category != "neutral":  # negative / cancelled
+            has_negative = True
+    return has_positive and has_negative
+
+
+class _TemplateOutcome(NamedTuple):
+    """Исход шаблона, разобранный один раз. Статичный текст сразу обрезан до 100 —
+    на событие только копия в новый dict."""
+    key: str
+    text: str
+    category: str
+    dynamic: bool  # есть {coin}/{title} — подставлять на каждое событие
+
+
+_Prepared = tuple[_TemplateOutcome, ...]
+
+
+def _prepare(outcomes: list[dict]) -> _Prepared:
+    return tuple(
+        _TemplateOutcome(
+            o["key"], o["text"] if "{" in o["text"] else o["text"][:100],
+            o["category"], "{" in o["text"],
+        )
+        for o in outcomes
+    )
+
+
+_PREPARED: dict[str, _Prepared] = {
+    etype: _prepare(t["outcomes"]) for etype, t in OUTCOME_TEMPLATES.items()
+}
+_PREPARED_GENERIC: _Prepared = _prepare(GENERIC_OUTCOMES["outcomes"])
+
+
+def _render(prepared: _Prepared, coin: str, title: str) -> list:
+    """Новые dict исходов (вызывающий может их менять); подстановка только где нужна."""
+    return [
+        {
+            "key": key,
+            "text": (text.replace("{coin}", coin).replace("{title}", title)[:100]
+                     if dynamic else text),
+            "category": category,
             "is_template": True,
-        })
-    return outcomes
+        }
+        for key, text, category, dynamic in prepared
+    ]
+
+
+def _apply_template(event: dict, prepared: _Prepared) -> list:
+    """Подставить шаблон для стандартного типа (prepared — из _PREPARED)."""
+    return _render(prepared, event.get("coin_symbol", "???"), event.get("title", ""))
 
 
 def _apply_generic(event: dict) -> list:
     """Generic fallback когда AI не смог."""
-    coin = event.get("coin_symbol", "???")
-    outcomes = []
-    for o in GENERIC_OUTCOMES["outcomes"]:
-        text = o["text"].replace("{coin}", coin)
-        outcomes.append({
-            "key": o["key"],
-            "text": text[:100],
-            "category": o["category"],
-            "is_template": True,
-        })
-    return outcomes
+    return _render(_PREPARED_GENERIC,
+                   event.get("coin_symbol", "???"), event.get("title", ""))
 
 
 def _parse_ai_response(text: str) -> list:
@@ -72,46 +108,35 @@ def _parse_ai_response(text: str) -> list:
     text = text.strip()
     # Попытка 1: прямой парсинг
     try:
-        data = json.loads(text)
+        data = orjson.loads(text)
         if isinstance(data, list):
             return data
         if isinstance(data, dict) and "outcomes" in data:
             return data["outcomes"]
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         pass
-    # Попытка 2: regex массив
-    match = re.search(r'\[.*\]', text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-    # Попытка 3: regex объект
-    match = re.search(r'\{.*\}', text, re.DOTALL)
-    if match:
-        try:
-            data = json.loads(match.group())
-            if "outcomes" in data:
-                return data["outcomes"]
-        except json.JSONDecodeError:
-            pass
+    # Попытка 2: первый массив в тексте (raw_decode, без regex)
+    data = extract_json(text, list)
+    if data is not None:
+        return data
+    # Попытка 3: объект {"outcomes": [...]} в тексте
+    data = extract_json(text, dict)
+    if data is not None and "outcomes" in data:
+        return data["outcomes"]
     raise json.JSONDecodeError("Cannot parse AI response", text, 0)
 
 
 async def _generate_via_ai(event: dict) -> list:
     """Сгенерировать исходы через Groq AI. 3 попытки, fallback на generic."""
-    prompt_path = os.path.join(
-        os.path.dirname(__file__), "..", "prompts", "generate_outcomes.md"
-    )
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        prompt_template = f.read()
+    system, prompt_template = _load_prompt()
 
-    # Подстановка через .replace() — НЕ .format(), НЕ f-string
-    prompt = prompt_template
-    prompt = prompt.replace("{event_type}", event.get("event_type", "other"))
-    prompt = prompt.replace("{coin_symbol}", event.get("coin_symbol", "???"))
-    prompt = prompt.replace("{title}", event.get("title", ""))
-    prompt = prompt.replace("{date_event}", event.get("date_event") or "не указано")
+    # Подстановка fill_prompt — НЕ .format(), НЕ f-string; только в user-часть
+    prompt = fill_prompt(prompt_template, {
+        "event_type": event.get("event_type", "other"),
+        "coin_symbol": event.get("coin_symbol", "???"),
+        "title": event.get("title", ""),
+        "date_event": event.get("date_event") or "не указано",
+    })
 
     for attempt in range(3):
         try:
@@ -120,6 +145,7 @@ async def _generate_via_ai(event: dict) -> list:
                 model=GROQ_OUTCOME_MODEL,
                 temperature=GROQ_OUTCOME_TEMPERATURE,
                 max_tokens=GROQ_OUTCOME_MAX_TOKENS,
+                system=system,
             )
             outcomes = _parse_ai_response(response_text)
             if validate_outcomes(outcomes):
@@ -140,7 +166,7 @@ async def _generate_via_ai(event: dict) -> list:
 
 async def generate_outcomes(event: dict) -> list:
     """Главная функция. Шаблон для 7 типов, AI для остальных."""
-    event_type = event.get("event_type", "other")
-    if event_type in OUTCOME_TEMPLATES:
-        return _apply_template(event)
+    prepared = _PREPARED.get(event.get("event_type", "other"))
+    if prepared is not None:
+        return _apply_template(event, prepared)
     return await _generate_via_ai(event)
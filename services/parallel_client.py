@@ -4,17 +4,26 @@ import asyncio
 import logging
 
 import httpx
+import orjson
+
+from services.rate_limit import host_limiter
 
 logger = logging.getLogger("crypto_scanner.parallel")
 
+SEARCH_URL = "https://api.parallel.ai/v1beta/search"
+SEARCH_HOST = "api.parallel.ai"
+
 
 async def search_token_events(
     http_client: httpx.AsyncClient, token: str, api_key: str,
     max_results: int = 5, max_chars: int = 2000, timeout: int = 15,
 ) -> list[dict]:
     """Поиск событий для токена через Parallel Search API.
-    Возвращает [{"url", "title", "excerpt"}]. При ошибке — []."""
-    url = "https://api.parallel.ai/v1beta/search"
+    Возвращает [{"url", "title", "excerpt"}]. При ошибке — [].
+    http_client — общий make_http_client() на процесс: запросы идут потоками
+    HTTP/2 по одному соединению, без TLS handshake на каждый токен.
+    Темп и число запросов в полёте — общий host_limiter: 429 ставит на паузу
+    все корутины поиска (Retry-After, иначе 10 сек), а не только эту."""
     headers = {"Content-Type": "application/json", "x-api-key": api_key}
     payload = {
         "objective": (
@@ -31,12 +40,15 @@ async def search_token_events(
         "excerpts": {"max_chars_per_result": max_chars},
     }
 
+    host = host_limiter(SEARCH_HOST)
     try:
-        resp = await http_client.post(
-            url, headers=headers, json=payload, timeout=timeout
-        )
+        async with host.acquire():
+            resp = await http_client.post(
+                SEARCH_URL, headers=headers, json=payload, timeout=timeout
+            )
+        host.observe(resp.status_code, resp.headers, default_429=10)
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
 
         logger.info(f"Parallel raw response keys: {list(data.keys())}")
         results = data.get("results", [])
@@ -61,8 +73,7 @@ async def search_token_events(
     except httpx.HTTPStatusError as e:
         status = e.response.status_code
         if status == 429:
-            logger.warning(f"Parallel rate limit for {token}, sleep 10s")
-            await asyncio.sleep(10)
+            logger.warning(f"Parallel rate limit for {token}, host paused")
         elif status in (500, 502, 503):
             logger.warning(f"Parallel server error {status} for {token}")
         elif status == 401:
@@ -73,3 +84,23 @@ async def search_token_events(
     except (KeyError, IndexError, TypeError) as e:
         logger.warning(f"Parallel unexpected response for {token}: {e}")
         return []
+
+
+async def search_many(
+    http_client: httpx.AsyncClient, tokens: list[str], api_key: str,
+    max_results: int = 5, max_chars: int = 2000, concurrency: int = 8,
+    timeout: int = 15,
+) -> dict[str, list[dict]]:
+    """search_token_events пачкой: {token: results}, порядок tokens.
+    В полёте не больше concurrency запросов этой пачки, темп — host_limiter.
+    Один токен — один запрос: objective у API один, смешивать токены нельзя."""
+    tokens = list(dict.fromkeys(tokens))
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(token: str) -> list[dict]:
+        async with sem:
+            return await search_token_events(
+                http_client, token, api_key, max_results, max_chars, timeout)
+
+    results = await asyncio.gather(*(_one(t) for t in tokens))
+    return dict(zip(tokens, results))
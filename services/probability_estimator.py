@@ -1,38 +1,50 @@
 """CryptoScanner — оценка вероятностей исходов через multi-temperature Groq."""
 
-import json, logging, os, re  # noqa: E401
+import asyncio, json, logging, os  # noqa: E401
+
+import orjson
 
 import config
-from services.groq_client import GroqAPIError, call_groq
+from services.groq_client import (GroqAPIError, call_groq, extract_json, fill_prompt,
+                                  split_prompt)
 
 logger = logging.getLogger("crypto_scanner.probability")
 TEMPERATURES = [0.3, 0.5, 0.7]
-_prompt_cache: str = ""
+# Общий лимит вызовов в полёте: температуры (и события) идут параллельно
+_sem: asyncio.Semaphore | None = None
+_sem_loop: asyncio.AbstractEventLoop | None = None
+_prompt_cache: tuple[str, str] = ("", "")
+
 
+def _get_sem() -> asyncio.Semaphore:
+    """Семафор MAX_CONCURRENT_PROBABILITY_CALLS текущего event loop (run_async может запускаться повторно)."""
+    global _sem, _sem_loop
+    loop = asyncio.get_running_loop()
+    if _sem is None or loop is not _sem_loop:
+        _sem = asyncio.Semaphore(config.MAX_CONCURRENT_PROBABILITY_CALLS)
+        _sem_loop = loop
+    return _sem
 
-def _load_prompt() -> str:
+
+def _load_prompt() -> tuple[str, str]:
+    """(system: правила без подстановок, user-шаблон: СОБЫТИЕ + ИСХОДЫ)."""
     global _prompt_cache
-    if not _prompt_cache:
+    if not _prompt_cache[1]:
         p = os.path.join(os.path.dirname(__file__), "..", "prompts",
                          "estimate_probabilities.md")
         with open(p, encoding="utf-8") as f:
-            _prompt_cache = f.read()
+            _prompt_cache = split_prompt(f.read(), "СОБЫТИЕ:")
     return _prompt_cache
 
 
 def _parse_json(text: str) -> dict:
-    """2-stage: direct → regex {...}."""
-    for src in [text, None]:
-        try:
-            if src is None:
-                m = re.search(r"\{.*\}", text, re.DOTALL)
-                if not m: return {}
-                src = m.group()
-            parsed = json.loads(src)
-            if isinstance(parsed, dict): return parsed
-        except (json.JSONDecodeError, TypeError):
-            pass
-    return {}
+    """2-stage: direct → первый {...} в тексте."""
+    try:
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict): return parsed
+    except json.JSONDecodeError:
+        pass
+    return extract_json(text, dict) or {}
 
 
 def _validate_probabilities(probs: dict, expected_keys: set) -> bool:
@@ -51,13 +63,14 @@ def _normalize_probabilities(probs: dict) -> dict:
     return {k: round(v / total, 4) for k, v in clamped.items()}
 
 
-async def _single_iteration(prompt: str, temperature: float,
+async def _single_iteration(system: str, prompt: str, temperature: float,
                              expected_keys: set) -> dict:
     """Один вызов Groq → parse → validate → normalize. {} при ошибке."""
     try:
-        text = await call_groq(
-            prompt, model=config.GROQ_SCANNER_MODEL,
-            temperature=temperature, max_tokens=200)
+        async with _get_sem():
+            text = await call_groq(
+                prompt, model=config.GROQ_SCANNER_MODEL,
+                temperature=temperature, max_tokens=200, system=system)
         probs = _parse_json(text)
         probs = {k: float(v) for k, v in probs.items() if k in expected_keys}
         if not _validate_probabilities(probs, expected_keys):
@@ -109,15 +122,18 @@ async def estimate_event_probabilities(event: dict,
         f"[{o.get('outcome_category', o.get('category','?'))}] "
         f"{o.get('outcome_text', o.get('text','?'))}"
         for o in outcomes]
-    prompt = _load_prompt()
-    for old, new in [("{coin_symbol}", event.get("coin_symbol", "?")),
-                     ("{event_type}", event.get("event_type", "?")),
-                     ("{title}", event.get("title", "?")),
-                     ("{date_event}", event.get("date_event") or "unknown"),
-                     ("{importance}", event.get("importance", "medium")),
-                     ("{outcomes_text}", "\n".join(lines))]:
-        prompt = prompt.replace(old, new)
-    iters = [await _single_iteration(prompt, t, expected) for t in TEMPERATURES]
+    system, template = _load_prompt()
+    # Заполняется один раз на событие, все температуры шлют ту же строку
+    prompt = fill_prompt(template, {
+        "coin_symbol": event.get("coin_symbol", "?"),
+        "event_type": event.get("event_type", "?"),
+        "title": event.get("title", "?"),
+        "date_event": event.get("date_event") or "unknown",
+        "importance": event.get("importance", "medium"),
+        "outcomes_text": "\n".join(lines),
+    })
+    iters = await asyncio.gather(
+        *(_single_iteration(system, prompt, t, expected) for t in TEMPERATURES))
     result = _aggregate_iterations(iters)
     ok_cnt = sum(1 for i in iters if i)
     if not result:
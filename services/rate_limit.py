@@ -0,0 +1,186 @@
+"""CryptoScanner — адаптивная задержка между запросами (ATB, per-host)."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+import time
+from collections.abc import AsyncIterator, Mapping
+
+from config import HOST_CONCURRENCY, HOST_RATES, RateLimitPolicy
+
+
+class AdaptiveRateLimiter:
+    """Задержка перед запросом, подстраивается под ответы сервера.
+
+    429 -> задержка ×2 (не больше max_delay).
+    success_streak успешных ответов подряд -> задержка − min_delay
+    (не меньше min_delay). Состояние хранится отдельно для каждого host/URL.
+    """
+
+    def __init__(self, policy: RateLimitPolicy, success_streak: int = 5) -> None:
+        self.policy: RateLimitPolicy = policy
+        self.success_streak: int = success_streak
+        self._delays: dict[str, float] = {}
+        self._streaks: dict[str, int] = {}
+        self._next_slot: dict[str, float] = {}
+
+    @classmethod
+    def from_delay(cls, delay: float, max_delay: float = 60.0) -> AdaptiveRateLimiter:
+        """Лимитер из старого скалярного delay (он же минимум)."""
+        return cls(RateLimitPolicy(
+            min_delay=delay, max_delay=max(delay, max_delay), initial_delay=delay,
+        ))
+
+    def current_delay(self, key: str) -> float:
+        """Текущая задержка для host/URL (initial_delay если запросов не было)."""
+        return self._delays.get(key, self.policy.initial_delay)
+
+    def _reserve(self, key: str) -> float:
+        """Занять ближайший слот старта для host/URL; сколько секунд до него ждать."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(key, 0.0))
+        self._next_slot[key] = slot + self.current_delay(key)
+        return slot - now
+
+    def wait(self, key: str) -> None:
+        """Блокирующая пауза: как wait_async, первый запрос и запрос после
+        долгого перерыва — без паузы."""
+        pause = self._reserve(key)
+        if pause > 0:
+            time.sleep(pause)
+
+    async def wait_async(self, key: str) -> None:
+        """Неблокирующая пауза: старты запросов к host/URL не чаще current_delay.
+        Слот резервируется до sleep — конкурентные корутины встают в очередь."""
+        pause = self._reserve(key)
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def defer(self, key: str, seconds: float) -> None:
+        """Не стартовать запросы к host/URL раньше чем через seconds (Retry-After)."""
+        self._next_slot[key] = max(
+            self._next_slot.get(key, 0.0), time.monotonic() + seconds
+        )
+
+    def record_success(self, key: str) -> None:
+        """Успешный ответ. После серии успехов — сузить задержку."""
+        streak = self._streaks.get(key, 0) + 1
+        if streak >= self.success_streak:
+            self._delays[key] = max(
+                self.policy.min_delay,
+                self.current_delay(key) - self.policy.min_delay,
+            )
+            streak = 0
+        self._streaks[key] = streak
+
+    def record_rate_limit(self, key: str) -> float:
+        """Ответ 429. Удвоить задержку, вернуть новое значение."""
+        self._streaks[key] = 0
+        delay = min(self.policy.max_delay, max(self.current_delay(key) * 2, 1.0))
+        self._delays[key] = delay
+        return delay
+
+
+class TokenBucket:
+    """Token bucket: rate запросов за per сек, всплеск до capacity (по умолчанию rate).
+
+    Пока токены есть — запрос без паузы; пустое ведро — ждать ровно до своего токена.
+    Токен резервируется до sleep (баланс может уйти в минус): конкурентные корутины
+    встают в очередь, а не просыпаются разом.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, capacity: float | None = None) -> None:
+        self.capacity: float = capacity if capacity is not None else rate
+        self._refill: float = rate / per  # токенов в секунду
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Взять токен; пауза только если ведро пусто."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._refill)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._refill)
+
+
+def header_seconds(headers: Mapping[str, str], name: str) -> float | None:
+    """Числовой заголовок в секундах (Retry-After, X-RateLimit-Reset); HTTP-date — None."""
+    try:
+        return float(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    """Retry-After в секундах (HTTP-date не поддерживается)."""
+    return header_seconds(headers, "Retry-After")
+
+
+def backoff(base: float, attempt: int) -> float:
+    """Экспоненциальная пауза base·2^(attempt-1) с jitter ±50%."""
+    return base * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+class HostLimiter:
+    """Общий предел для одного host: не больше concurrency запросов в полёте,
+    не чаще rate в секунду (если задан). Retry-After и исчерпанный
+    X-RateLimit-Remaining ставят на паузу все корутины host, а не одну."""
+
+    def __init__(self, concurrency: int, rate: float | None = None) -> None:
+        self._sem: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self._bucket: TokenBucket | None = TokenBucket(rate, per=1.0) if rate else None
+        self._paused_until: float = 0.0
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Слот на время запроса: дождаться токена ведра, затем паузы host
+        (пауза, назначенная пока корутина ждала токен, тоже соблюдается)."""
+        async with self._sem:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            yield
+
+    def pause(self, seconds: float) -> None:
+        """Не стартовать запросы к host раньше чем через seconds (только продлевает)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(
+        self, status: int, headers: Mapping[str, str], default_429: float = 0.0
+    ) -> float:
+        """Подстроиться под ответ. 429 -> пауза Retry-After (нет — default_429);
+        X-RateLimit-Remaining: 0 -> пауза до X-RateLimit-Reset (секунды или epoch).
+        Возвращает назначенную паузу (0 — без паузы)."""
+        pause = 0.0
+        if status == 429:
+            pause = header_seconds(headers, "Retry-After") or default_429
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            reset = header_seconds(headers, "X-RateLimit-Reset") or 0.0
+            pause = reset - time.time() if reset > 1e9 else reset
+        if pause > 0:
+            self.pause(pause)
+        return max(pause, 0.0)
+
+
+# {host: HostLimiter}; семафор привязан к event loop — новый loop, новые лимитеры
+_hosts: dict[str, HostLimiter] = {}
+_hosts_loop: asyncio.AbstractEventLoop | None = None
+
+
+def host_limiter(host: str) -> HostLimiter:
+    """Общий HostLimiter для host (HOST_CONCURRENCY, темп из HOST_RATES)."""
+    global _hosts_loop
+    loop = asyncio.get_running_loop()
+    if loop is not _hosts_loop:
+        _hosts.clear()
+        _hosts_loop = loop
+    limiter = _hosts.get(host)
+    if limiter is None:
+        limiter = _hosts[host] = HostLimiter(HOST_CONCURRENCY, HOST_RATES.get(host))
+    return limiter
@@ -14,32 +14,25 @@ def _nn(val, fallback):
 
 
 def calculate_event_expected_return(outcomes: list[dict]) -> dict | None:
-    """E[return] для одного события = Σ(P × impact). None при невалидных данных."""
+    """E[return] для одного события = Σ(P × impact). None при невалидных данных.
+    Один проход: проверка и все четыре суммы вместе."""
     if not outcomes:
         return None
+    e_ret = e_bull = e_bear = conf_sum = 0.0
     for o in outcomes:
         p, imp = o.get("probability"), o.get("price_impact_pct")
         if p is None or imp is None or not (0.0 <= p <= 1.0):
             return None
-
-    e_ret = sum(o["probability"] * o["price_impact_pct"] for o in outcomes)
-    e_bull = sum(
-        o["probability"] * _nn(o.get("price_impact_high"), o["price_impact_pct"])
-        for o in outcomes)
-    e_bear = sum(
-        o["probability"] * _nn(o.get("price_impact_low"), o["price_impact_pct"])
-        for o in outcomes)
-
-    deltas = [(_nn(o.get("probability_high"), o["probability"])
-               - _nn(o.get("probability_low"), o["probability"])) / 2
-              for o in outcomes]
-    conf_d = sum(deltas) / len(deltas) if deltas else 0
+        e_ret += p * imp
+        e_bull += p * _nn(o.get("price_impact_high"), imp)
+        e_bear += p * _nn(o.get("price_impact_low"), imp)
+        conf_sum += (_nn(o.get("probability_high"), p) - _nn(o.get("probability_low"), p)) / 2
 
     return {
         "e_return": round(e_ret, 4),
         "e_return_bull": round(e_bull, 4),
         "e_return_bear": round(e_bear, 4),
-        "confidence_delta": round(conf_d, 4),
+        "confidence_delta": round(conf_sum / len(outcomes), 4),
         "outcomes_count": len(outcomes),
     }
 
@@ -50,11 +43,14 @@ def _clamp(val: float, limit: float) -> float:
 
 def calculate_token_signal(token: str, events_data: list[dict]) -> dict:
     """Агрегация E[return] по всем событиям одного токена → сигнал."""
-    total_er = sum(ed["e_return"]["e_return"] for ed in events_data)
-    total_bull = sum(ed["e_return"]["e_return_bull"] for ed in events_data)
-    total_bear = sum(ed["e_return"]["e_return_bear"] for ed in events_data)
-    avg_conf = (sum(ed["e_return"]["confidence_delta"] for ed in events_data)
-                / len(events_data)) if events_data else 0
+    total_er = total_bull = total_bear = conf_sum = 0.0
+    for ed in events_data:
+        er = ed["e_return"]
+        total_er += er["e_return"]
+        total_bull += er["e_return_bull"]
+        total_bear += er["e_return_bear"]
+        conf_sum += er["confidence_delta"]
+    avg_conf = conf_sum / len(events_data) if events_data else 0
 
     cap = config.MAX_TOKEN_E_RETURN
     capped = (abs(total_er) > cap or abs(total_bull) > cap
@@ -88,14 +84,10 @@ def calculate_token_signal(token: str, events_data: list[dict]) -> dict:
 
 async def generate_all_signals(db, limit: int = 50) -> list[dict]:
     """Собрать все сигналы по всем токенам из БД."""
-    from database.db import get_events_with_complete_data
-
-    rows = await get_events_with_complete_data(db, limit=limit * 10)
-    if not rows:
-        return []
+    from database.db import iter_events_with_complete_data
 
     events_map: dict = {}
-    for row in rows:
+    async for row in iter_events_with_complete_data(db, limit=limit * 10):
         eid = row["id"]
         if eid not in events_map:
             events_map[eid] = {
@@ -0,0 +1,135 @@
+"""CryptoScanner — единый маппинг symbol -> {coingecko_id, cmc_id, coindar_id}."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+from config import COINGECKO_ID_MAP
+from services.coindar import CoindarClient
+from services.coingecko import CoinGeckoClient
+from services.coinmarketcap import CoinMarketCapClient
+
+logger = logging.getLogger("crypto_scanner.symbol_registry")
+
+# {"BTC": {"coingecko_id": "bitcoin", "cmc_id": 1, "coindar_id": 7}}
+_registry: dict[str, dict] = {}
+# Списки монет загруженных провайдеров ("CMC"/"CoinGecko"/"Coindar"); из них собирается _registry
+_lists: dict[str, list[dict]] = {}
+_lock: asyncio.Lock | None = None
+_lock_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_lock() -> asyncio.Lock:
+    """Lock загрузки реестра для текущего event loop (run_async может запускаться повторно)."""
+    global _lock, _lock_loop
+    loop = asyncio.get_running_loop()
+    if _lock is None or loop is not _lock_loop:
+        _lock = asyncio.Lock()
+        _lock_loop = loop
+    return _lock
+
+
+async def load(
+    gecko: Optional[CoinGeckoClient] = None,
+    cmc: Optional[CoinMarketCapClient] = None,
+    coindar: Optional[CoindarClient] = None,
+    cmc_limit: int = 5000,
+) -> dict[str, dict]:
+    """Дополнить реестр списками монет (параллельно, списки — через http_cache).
+    Загружаются только провайдеры, которых ещё нет в реестре: уже загруженные
+    не запрашиваются повторно, упавшие — повторяются при следующем вызове.
+    None-клиент или ошибка провайдера — его id в реестре нет."""
+    async with _get_lock():
+        fetches = {
+            name: fetch
+            for name, client, fetch in (
+                ("CMC", cmc, lambda: cmc.get_map(limit=cmc_limit)),
+                ("CoinGecko", gecko, lambda: gecko.get_coins_list()),
+                ("Coindar", coindar, lambda: coindar.get_coins()),
+            )
+            if client is not None and name not in _lists
+        }
+        if not fetches and _registry:
+            return _registry
+
+        results = await asyncio.gather(
+            *(fetch() for fetch in fetches.values()), return_exceptions=True,
+        )
+        for name, r in zip(fetches, results):
+            if isinstance(r, BaseException):
+                logger.warning(f"symbol_registry: {name} недоступен: {r}")
+            else:
+                _lists[name] = r
+
+        registry = _build(
+            _lists.get("CMC", []), _lists.get("CoinGecko", []), _lists.get("Coindar", []),
+        )
+        _registry.clear()
+        _registry.update(registry)
+        logger.info(f"symbol_registry: {len(_registry)} символов, загружены: {list(_lists)}")
+        return _registry
+
+
+def _build(
+    cmc_coins: list[dict], gecko_coins: list[dict], coindar_coins: list[dict],
+) -> dict[str, dict]:
+    """Индекс по symbol.upper(). CMC — первый по cmc_rank; CoinGecko — хардкод
+    COINGECKO_ID_MAP, иначе совпадение имени с CMC, иначе первый; Coindar так же по имени."""
+    registry: dict[str, dict] = {}
+    names: dict[str, str] = {}      # symbol -> имя монеты CMC (lower)
+    matched: set[tuple[str, str]] = set()  # (field, symbol) с совпавшим именем
+
+    def entry(sym: str) -> dict:
+        ids = registry.get(sym)
+        if ids is None:
+            ids = registry[sym] = {"coingecko_id": None, "cmc_id": None, "coindar_id": None}
+        return ids
+
+    for c in cmc_coins:
+        sym = c["symbol"].upper()
+        if sym and sym not in names:
+            entry(sym)["cmc_id"] = c["id"]
+            names[sym] = c["name"].lower()
+
+    for field, coins in (("coingecko_id", gecko_coins), ("coindar_id", coindar_coins)):
+        for c in coins:
+            sym = c["symbol"].upper()
+            if not sym or (field, sym) in matched:
+                continue
+            ids = entry(sym)
+            if c["name"].lower() == names.get(sym):
+                ids[field] = c["id"]
+                matched.add((field, sym))
+            elif ids[field] is None:
+                ids[field] = c["id"]
+
+    for sym, cg_id in COINGECKO_ID_MAP.items():
+        entry(sym)["coingecko_id"] = cg_id
+    return registry
+
+
+def lookup(symbol: str) -> Optional[dict]:
+    """{coingecko_id, cmc_id, coindar_id} по символу или None (реестр не загружен/нет символа)."""
+    return _registry.get(symbol.upper())
+
+
+def coingecko_ids(symbols: list[str]) -> dict[str, str]:
+    """{symbol: coingecko_id} для известных символов (порядок symbols)."""
+    result: dict[str, str] = {}
+    for sym in symbols:
+        ids = _registry.get(sym.upper())
+        if ids and ids["coingecko_id"]:
+            result[sym] = ids["coingecko_id"]
+    return result
+
+
+async def get_prices(gecko: CoinGeckoClient, symbols: list[str]) -> dict[str, dict]:
+    """Цены CoinGecko по символам: {symbol: {usd, usd_24h_change, usd_market_cap}}.
+    Список CoinGecko ещё не загружен — догружается в реестр (остальные провайдеры не трогаются)."""
+    if "CoinGecko" not in _lists:
+        await load(gecko=gecko)
+    sym_to_id = coingecko_ids(symbols)
+    prices = await gecko.get_prices(list(dict.fromkeys(sym_to_id.values())))
+    return {sym: prices[cg_id] for sym, cg_id in sym_to_id.items() if cg_id in prices}
@@ -1,26 +1,29 @@
 """CryptoScanner — token scanner: Parallel Search → Groq AI → events_v2."""
 
-import asyncio, json, logging, os, re, traceback  # noqa: E401
+import asyncio, json, logging, os, traceback  # noqa: E401
 from datetime import date, timedelta
-import httpx
+import orjson
 import config
 from database.db import ensure_outcome_tables, make_event_id, save_event
 from services.binance_tokens import get_futures_tokens
-from services.groq_client import GroqAPIError, call_groq
+from services.groq_client import (GroqAPIError, call_groq, extract_json, fill_prompt,
+                                  split_prompt)
+from services.http_client import make_http_client
 from services.parallel_client import search_token_events
 
 logger = logging.getLogger("crypto_scanner.token_scanner")
 KNOWN_TYPES = {"listing", "launch", "burn", "unlock", "fork", "partnership",
                "airdrop", "governance", "upgrade", "conference", "regulatory", "other"}
-_prompt_cache: str = ""
+_prompt_cache: tuple[str, str] = ("", "")
 
 
-def _load_prompt() -> str:
+def _load_prompt() -> tuple[str, str]:
+    """(system: правила и формат ответа, user-шаблон: ТОКЕН + дата + поиск)."""
     global _prompt_cache
-    if not _prompt_cache:
+    if not _prompt_cache[1]:
         p = os.path.join(os.path.dirname(__file__), "..", "prompts", "extract_token_events.md")
         with open(p, encoding="utf-8") as f:
-            _prompt_cache = f.read()
+            _prompt_cache = split_prompt(f.read(), "ТОКЕН:")
     return _prompt_cache
 
 
@@ -43,21 +46,15 @@ def _is_within_horizon(date_str: str, horizon_days: int) -> bool:
 
 
 def _parse_events_json(text: str, token: str) -> list[dict]:
-    """3-stage: direct → regex [...] → regex {...}."""
-    raw = None
-    for pattern, wrap in [(None, False), (r"\[.*\]", False), (r"\{.*\}", True)]:
-        if raw is not None:
-            break
-        try:
-            if pattern is None:
-                raw = json.loads(text)
-            else:
-                m = re.search(pattern, text, re.DOTALL)
-                if m:
-                    parsed = json.loads(m.group())
-                    raw = [parsed] if wrap else parsed
-        except (json.JSONDecodeError, TypeError):
-            pass
+    """3-stage: direct → первый [...] в тексте → первый {...} (одно событие)."""
+    try:
+        raw = orjson.loads(text)
+    except json.JSONDecodeError:
+        raw = extract_json(text, list)
+        if raw is None:
+            raw = extract_json(text, dict)
+    if isinstance(raw, dict):
+        raw = [raw]
     if not isinstance(raw, list):
         return []
     valid = []
@@ -76,10 +73,11 @@ def _parse_events_json(text: str, token: str) -> list[dict]:
 
 
 async def _process_results(token: str, results: list[dict], db) -> list[dict]:
-    prompt = _load_prompt().replace("{TOKEN}", token)
-    prompt = prompt.replace("{today}", str(date.today()))
-    prompt = prompt.replace("{search_results}", _format_search_results(results))
-    response = await call_groq(prompt, max_tokens=1000)
+    system, template = _load_prompt()
+    prompt = fill_prompt(template, {
+        "TOKEN": token, "today": str(date.today()),
+        "search_results": _format_search_results(results)})
+    response = await call_groq(prompt, max_tokens=1000, system=system)
     saved = []
     for ev in _parse_events_json(response, token):
         if _is_within_horizon(ev.get("date_event"), config.SCAN_HORIZON_DAYS):
@@ -108,41 +106,54 @@ async def scan_single_token(token: str, db, http_client) -> list[dict]:
 
 
 async def scan_all_tokens(db) -> dict:
-    """Основной пайплайн: сканирует все токены Binance Futures."""
+    """Основной пайплайн: сканирует все токены Binance Futures.
+    До SCAN_CONCURRENCY токенов параллельно; темп Parallel — host_limiter,
+    Groq — TokenBucket провайдеров в call_groq."""
     s = {"tokens_total": 0, "tokens_with_results": 0, "parallel_requests": 0,
          "groq_calls": 0, "events_found": 0, "events_new": 0,
          "events_duplicate": 0, "errors_parallel": 0, "errors_groq": 0}
     seen: set[str] = set()
-    async with httpx.AsyncClient() as http:
-        tokens = await get_futures_tokens(http, exclude=config.TOP_EXCLUDE)
-        s["tokens_total"] = len(tokens)
-        logger.info(f"Scanning {len(tokens)} tokens...")
-        await ensure_outcome_tables(db)
-        for token in tokens:
-            await asyncio.sleep(config.PARALLEL_DELAY)
+    groq_left = config.MAX_GROQ_CALLS_PER_SCAN
+    sem = asyncio.Semaphore(config.SCAN_CONCURRENCY)
+
+    async def _scan(token: str, http) -> list[dict] | None:
+        """События токена; None — бюджет Groq исчерпан или ошибка (учтено в s)."""
+        nonlocal groq_left
+        async with sem:
             s["parallel_requests"] += 1
-            if s["groq_calls"] >= config.MAX_GROQ_CALLS_PER_SCAN:
+            if groq_left <= 0:
                 try:
                     r = await search_token_events(http, token, config.PARALLEL_API_KEY,
                                                   config.PARALLEL_MAX_RESULTS, config.PARALLEL_MAX_CHARS)
                     if r: s["tokens_with_results"] += 1
                 except Exception: s["errors_parallel"] += 1
-                continue
+                return None
+            groq_left -= 1  # резерв до await: параллельные токены не превысят бюджет
             try:
                 events = await scan_single_token(token, db, http)
             except GroqAPIError:
-                s["errors_groq"] += 1; s["groq_calls"] += 1; continue
+                s["errors_groq"] += 1; s["groq_calls"] += 1; return None
             except Exception:
-                s["errors_parallel"] += 1; continue
+                groq_left += 1; s["errors_parallel"] += 1; return None
             s["groq_calls"] += 1
-            if events: s["tokens_with_results"] += 1
-            for ev in events:
-                eid = make_event_id(ev.get("coin_symbol", ""),
-                                    ev.get("event_type", ""), ev.get("title", ""))
-                s["events_found"] += 1
-                if eid in seen: s["events_duplicate"] += 1
-                else: seen.add(eid); s["events_new"] += 1
             if events:
                 logger.info(f"SCAN {token}: {len(events)} events saved")
+            return events
+
+    async with make_http_client() as http:
+        tokens = await get_futures_tokens(http, exclude=config.TOP_EXCLUDE)
+        s["tokens_total"] = len(tokens)
+        logger.info(f"Scanning {len(tokens)} tokens...")
+        await ensure_outcome_tables(db)
+        results = await asyncio.gather(*(_scan(t, http) for t in tokens))
+
+    for events in results:
+        if events: s["tokens_with_results"] += 1
+        for ev in events or ():
+            eid = make_event_id(ev.get("coin_symbol", ""),
+                                ev.get("event_type", ""), ev.get("title", ""))
+            s["events_found"] += 1
+            if eid in seen: s["events_duplicate"] += 1
+            else: seen.add(eid); s["events_new"] += 1
     logger.info(f"Scan complete: {s}")
     return s
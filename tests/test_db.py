@@ -0,0 +1,74 @@
+"""CryptoScanner — database/db.py: пул read-only соединений и db_scope."""
+
+import atexit
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import config
+from database import db
+
+
+class ReaderPoolTest(unittest.TestCase):
+    """Чтение без conn= не должно брать writer-блокировку."""
+
+    _stuck = False  # зависший поток держит _writer_lock до конца процесса
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self._db_path = config.DB_PATH
+        if not self._stuck:
+            db.close_connections()
+        config.DB_PATH = Path(self._tmp.name) / "scanner.db"
+
+    def tearDown(self) -> None:
+        if not self._stuck:
+            db.close_connections()
+        config.DB_PATH = self._db_path
+        self._tmp.cleanup()
+
+    def _run(self, fn) -> dict:
+        """fn в отдельном потоке с таймаутом: дедлок -> провал теста, а не зависание."""
+        result: dict = {}
+
+        def target() -> None:
+            try:
+                result["value"] = fn()
+            except BaseException as exc:  # noqa: BLE001 — пробрасывается в тест
+                result["error"] = exc
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(10)
+        if thread.is_alive():
+            ReaderPoolTest._stuck = True
+            atexit.unregister(db.close_connections)
+        self.assertFalse(thread.is_alive(), "вызов завис (дедлок на _writer_lock)")
+        if "error" in result:
+            raise result["error"]
+        return result
+
+    def test_read_inside_db_scope(self) -> None:
+        db.init_db()
+
+        def read_in_scope():
+            with db.db_scope():
+                return db.get_news_stats()
+
+        stats = self._run(read_in_scope)["value"]
+        self.assertEqual(stats["total"], 0)
+
+    def test_reader_creates_missing_file(self) -> None:
+        self.assertFalse(config.DB_PATH.exists())
+
+        def read_raw():
+            with db._get_reader() as conn:
+                return conn.execute("SELECT 1").fetchone()[0]
+
+        self.assertEqual(self._run(read_raw)["value"], 1)
+        self.assertTrue(config.DB_PATH.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""CryptoScanner — services/news_cryptopanic.py: параллельные страницы get_latest_news_async."""
+
+import unittest
+
+import httpx
+
+from config import RateLimitPolicy
+from services.news_cryptopanic import CryptoPanicClient
+
+# Без http_cache: тест не трогает SQLite
+_get_latest_news_async = CryptoPanicClient.get_latest_news_async.__wrapped__
+_PAGE_SIZE = 20
+
+
+def _handler(failing: dict[int, int]):
+    """MockTransport: страницы по _PAGE_SIZE постов, failing = {page: status}."""
+    def handle(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", "1"))
+        if page in failing:
+            return httpx.Response(failing[page])
+        results = [{"id": page * 100 + i, "title": f"p{page}-{i}"} for i in range(_PAGE_SIZE)]
+        return httpx.Response(200, json={"results": results, "next": f"{request.url}&page={page + 1}"})
+    return handle
+
+
+class LatestNewsAsyncTest(unittest.IsolatedAsyncioTestCase):
+    """Упавшая страница обрывает пагинацию, но не теряет уже полученные."""
+
+    def setUp(self) -> None:
+        self.client = CryptoPanicClient(
+            "token", "https://cryptopanic.test/api/v1",
+            policy=RateLimitPolicy(min_delay=0, max_delay=0, initial_delay=0),
+        )
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    async def _fetch(self, failing: dict[int, int], limit: int) -> list[dict]:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler(failing))) as http:
+            return await _get_latest_news_async(self.client, http, limit=limit)
+
+    async def test_all_pages(self) -> None:
+        items = await self._fetch({}, limit=70)
+        self.assertEqual(len(items), 70)
+
+    async def test_page_3_not_found(self) -> None:
+        items = await self._fetch({3: 404}, limit=100)
+        self.assertEqual(len(items), 2 * _PAGE_SIZE)
+        self.assertEqual(items[-1]["title"], f"p2-{_PAGE_SIZE - 1}")
+
+
+if __name__ == "__main__":
+    unittest.main()
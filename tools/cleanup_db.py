@@ -10,6 +10,7 @@ JUNK = ["price prediction", "forecast", "2027", "2028", "2029", "2030",
 
 def main():
     db = sqlite3.connect(str(config.DB_PATH)); db.row_factory = sqlite3.Row
+    db.execute("PRAGMA foreign_keys=ON")  # ON DELETE CASCADE для event_tags
     excl = tuple(config.TOP_EXCLUDE)
     # 1. TOP_EXCLUDE events
     for tbl in ["events_v2", "events"]:
@@ -5,18 +5,22 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import asyncio
 import json
 import os
 from collections import Counter
 from datetime import datetime, timedelta
 
+import httpx
 from tabulate import tabulate
 
 import config
 from database import db
+from services import symbol_registry
 from services.coindar import CoindarClient
 from services.coingecko import CoinGeckoClient
 from services.coinmarketcap import CoinMarketCapClient
+from services.http_client import make_http_client
 from services.snapshot import SnapshotClient
 
 
@@ -109,23 +113,51 @@ def validate_config() -> dict[str, bool]:
     return status
 
 
+# ---------------------------------------------------------------------------
+# Шаг 3: клиенты API монет
+# ---------------------------------------------------------------------------
+
+def _make_clients(http: httpx.AsyncClient, api_status: dict[str, bool]) -> dict:
+    """Клиенты для API с ключами: {"coindar"|"coingecko"|"cmc": client}."""
+    clients: dict = {}
+    if api_status.get("coindar"):
+        clients["coindar"] = CoindarClient(
+            http,
+            token=config.COINDAR_TOKEN,
+            base_url=config.COINDAR_BASE_URL,
+            timeout=config.REQUEST_TIMEOUT,
+            delay=config.DEFAULT_DELAY,
+        )
+    if api_status.get("coingecko"):
+        clients["coingecko"] = CoinGeckoClient(
+            http,
+            api_key=config.COINGECKO_KEY,
+            base_url=config.COINGECKO_BASE_URL,
+            timeout=config.REQUEST_TIMEOUT,
+            delay=2.0,
+        )
+    if api_status.get("cmc"):
+        clients["cmc"] = CoinMarketCapClient(
+            http,
+            api_key=config.CMC_KEY,
+            base_url=config.CMC_BASE_URL,
+            timeout=config.REQUEST_TIMEOUT,
+            delay=2.0,
+        )
+    return clients
+
+
 # ---------------------------------------------------------------------------
 # Шаг 3A: Coindar
 # ---------------------------------------------------------------------------
 
-def explore_coindar(report: dict) -> None:
-    """Исследование Coindar API."""
+async def explore_coindar(
+    client: CoindarClient, connected: bool, report: dict
+) -> None:
+    """Исследование Coindar API. connected — результат check_connection()."""
     print("\n══════════════ COINDAR ══════════════")
 
-    client = CoindarClient(
-        token=config.COINDAR_TOKEN,
-        base_url=config.COINDAR_BASE_URL,
-        timeout=config.REQUEST_TIMEOUT,
-        delay=config.DEFAULT_DELAY,
-    )
-
-    print("🔌 Проверяю подключение...")
-    if not client.check_connection():
+    if not connected:
         print("❌ Подключение не удалось")
         report["apis"]["coindar"] = {"status": "error", "reason": "connection failed"}
         return
@@ -133,14 +165,14 @@ def explore_coindar(report: dict) -> None:
 
     # Теги
     print("\n📋 Загружаю теги...")
-    tags = client.get_tags()
+    tags = await client.get_tags()
     db.upsert_tags(tags)
     tag_names = ", ".join(t["name"] for t in tags[:10])
     print(f"✅ {len(tags)} тегов: {tag_names}{'...' if len(tags) > 10 else ''}")
 
     # Монеты
     print("\n🪙 Загружаю монеты (все страницы)...")
-    coins = client.get_coins()
+    coins = await client.get_coins()
     db.upsert_coindar_coins(coins)
     binance_map = db.get_coins_by_symbols("coins_coindar", config.BINANCE_SYMBOLS)
     binance_count = len(binance_map)
@@ -151,7 +183,7 @@ def explore_coindar(report: dict) -> None:
     date_start = today.strftime("%Y-%m-%d")
     date_end = (today + timedelta(days=7)).strftime("%Y-%m-%d")
     print(f"\n📅 Загружаю события на 7 дней ({date_start} — {date_end})...")
-    events = client.get_events(date_start=date_start, date_end=date_end)
+    events = await client.get_events(date_start=date_start, date_end=date_end)
     db.upsert_events(events)
 
     binance_coin_ids = set(binance_map.values())
@@ -165,7 +197,7 @@ def explore_coindar(report: dict) -> None:
     bnb_id = binance_map.get("BNB")
     if bnb_id:
         print(f"\n🔍 События по BNB (30 дней)...")
-        bnb_events = client.get_events(
+        bnb_events = await client.get_events(
             date_start=date_start, date_end=date_end_30,
             coin_ids=[bnb_id],
         )
@@ -192,19 +224,13 @@ def explore_coindar(report: dict) -> None:
 # Шаг 3B: CoinGecko
 # ---------------------------------------------------------------------------
 
-def explore_coingecko(report: dict) -> None:
-    """Исследование CoinGecko API."""
+async def explore_coingecko(
+    client: CoinGeckoClient, connected: bool, report: dict
+) -> None:
+    """Исследование CoinGecko API. connected — результат check_connection()."""
     print("\n══════════════ COINGECKO ══════════════")
 
-    client = CoinGeckoClient(
-        api_key=config.COINGECKO_KEY,
-        base_url=config.COINGECKO_BASE_URL,
-        timeout=config.REQUEST_TIMEOUT,
-        delay=2.0,
-    )
-
-    print("🔌 Проверяю подключение...")
-    if not client.check_connection():
+    if not connected:
         print("❌ Подключение не удалось")
         report["apis"]["coingecko"] = {"status": "error", "reason": "connection failed"}
         return
@@ -212,45 +238,34 @@ def explore_coingecko(report: dict) -> None:
 
     # Список монет
     print("\n🪙 Загружаю список монет...")
-    coins = client.get_coins_list()
+    coins = await client.get_coins_list()
     db.upsert_coingecko_coins(coins)
     print(f"✅ {len(coins):,} монет")
 
     # Категории
     print("\n📋 Загружаю категории...")
-    categories = client.get_categories()
+    categories = await client.get_categories()
     print(f"✅ {len(categories)} категорий")
 
-    # Маппинг symbol → coingecko id: сначала хардкод, потом fallback из coins_list
-    symbol_to_cg: dict[str, str] = dict(config.COINGECKO_ID_MAP)
-    for c in coins:
-        sym = c["symbol"].upper()
-        if sym in config.BINANCE_SYMBOLS and sym not in symbol_to_cg:
-            symbol_to_cg[sym] = c["id"]
+    # Маппинг symbol → coingecko id — из общего реестра (хардкод + coins_list)
+    symbol_to_cg = symbol_registry.coingecko_ids(sorted(config.BINANCE_SYMBOLS))
 
     # Цены топ-10 (детерминированный порядок)
-    top10_symbols = TOP10_SYMBOLS
-    top10_ids = [symbol_to_cg[s] for s in top10_symbols if s in symbol_to_cg]
-
     print(f"\n💰 Загружаю цены топ-10 Binance монет...")
-    prices = client.get_prices(top10_ids)
+    prices = await symbol_registry.get_prices(client, TOP10_SYMBOLS)
     price_parts: list[str] = []
-    btc_price: float | None = None
-    btc_change: float | None = None
-    for cg_id in top10_ids:
-        p = prices.get(cg_id, {})
-        usd = p.get("usd")
-        sym = next((s for s, i in symbol_to_cg.items() if i == cg_id), cg_id)
-        price_parts.append(f"{sym}={_fmt_price(usd)}")
-        if cg_id == symbol_to_cg.get("BTC"):
-            btc_price = usd
-            btc_change = p.get("usd_24h_change")
+    for sym in TOP10_SYMBOLS:
+        if sym in symbol_to_cg:
+            price_parts.append(f"{sym}={_fmt_price(prices.get(sym, {}).get('usd'))}")
+    btc = prices.get("BTC", {})
+    btc_price: float | None = btc.get("usd")
+    btc_change: float | None = btc.get("usd_24h_change")
     print(f"✅ {' '.join(price_parts)}")
 
     # Детали BTC
     btc_cg_id = symbol_to_cg.get("BTC", "bitcoin")
     print(f"\n🔍 Детальная информация по BTC...")
-    btc_info = client.get_coin_info(btc_cg_id)
+    btc_info = await client.get_coin_info(btc_cg_id)
     if btc_info:
         cats = btc_info.get("categories", [])
         cats_str = ", ".join(c for c in cats if c) if cats else "N/A"
@@ -276,19 +291,12 @@ def explore_coingecko(report: dict) -> None:
 # Шаг 3C: CoinMarketCap
 # ---------------------------------------------------------------------------
 
-def explore_cmc(report: dict) -> None:
-    """Исследование CoinMarketCap API."""
+async def explore_cmc(
+    client: CoinMarketCapClient, key_info: dict | None, report: dict
+) -> None:
+    """Исследование CoinMarketCap API. key_info — результат check_connection()."""
     print("\n══════════════ COINMARKETCAP ══════════════")
 
-    client = CoinMarketCapClient(
-        api_key=config.CMC_KEY,
-        base_url=config.CMC_BASE_URL,
-        timeout=config.REQUEST_TIMEOUT,
-        delay=2.0,
-    )
-
-    print("🔌 Проверяю подключение...")
-    key_info = client.check_connection()
     if key_info is None:
         print("❌ Подключение не удалось")
         report["apis"]["coinmarketcap"] = {
@@ -304,18 +312,18 @@ def explore_cmc(report: dict) -> None:
 
     # Маппинг
     print("\n🪙 Загружаю маппинг монет (топ-500)...")
-    coins = client.get_map(limit=500)
+    coins = await client.get_map(limit=500)
     db.upsert_cmc_coins(coins)
     print(f"✅ {len(coins)} монет")
 
     # Категории
     print("\n📋 Загружаю категории...")
-    categories = client.get_categories(limit=20)
+    categories = await client.get_categories(limit=20)
     print(f"✅ {len(categories)} категорий")
 
     # Events
     print("\n🔍 Проверяю доступность Events API...")
-    events_ok, events_msg = client.check_events_available()
+    events_ok, events_msg = await client.check_events_available()
     if events_ok:
         print(f"✅ {events_msg}")
     else:
@@ -324,7 +332,7 @@ def explore_cmc(report: dict) -> None:
     # Котировки топ-10
     top10 = TOP10_SYMBOLS
     print(f"\n💰 Загружаю котировки топ-10 Binance...")
-    quotes = client.get_quotes(top10)
+    quotes = await client.get_quotes(top10)
     quote_parts: list[str] = []
     for sym in top10:
         q = quotes.get(sym, {})
@@ -333,7 +341,7 @@ def explore_cmc(report: dict) -> None:
     print(f"✅ {' '.join(quote_parts)}")
 
     # Подсчёт credits
-    key_info_after = client.check_connection()
+    key_info_after = await client.check_connection()
     credits_end = key_info_after.get("credits_used", used) if key_info_after else used
     credits_spent = credits_end - credits_start
     print(f"   Использовано credits: ~{credits_spent}")
@@ -778,7 +786,7 @@ def _simplify_api_report(api_name: str, info: dict) -> dict:
 # main
 # ---------------------------------------------------------------------------
 
-def main() -> None:
+async def main() -> None:
     """Точка входа explore.py."""
     print("🚀 CryptoScanner Multi-API Explorer")
     print(f"   Дата: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -797,35 +805,61 @@ def main() -> None:
         "apis": {},
     }
 
-    # 3A: Coindar
-    if api_status.get("coindar"):
-        try:
-            explore_coindar(report)
-        except Exception as e:
-            report["apis"]["coindar"] = {"status": "error", "reason": str(e)}
-            print(f"❌ Coindar ошибка: {e}")
-    else:
-        report["apis"]["coindar"] = {"status": "skip", "reason": "no key"}
+    # Один httpx-клиент (HTTP/2, keep-alive) на все API монет
+    async with make_http_client(config.REQUEST_TIMEOUT) as http:
+        clients = _make_clients(http, api_status)
+        print(f"\n🔌 Проверяю подключения ({', '.join(clients)})...")
+        checks = await asyncio.gather(
+            *(c.check_connection() for c in clients.values()),
+            return_exceptions=True,
+        )
+        connected = {
+            name: None if isinstance(r, BaseException) else r
+            for name, r in zip(clients, checks)
+        }
 
-    # 3B: CoinGecko
-    if api_status.get("coingecko"):
-        try:
-            explore_coingecko(report)
-        except Exception as e:
-            report["apis"]["coingecko"] = {"status": "error", "reason": str(e)}
-            print(f"❌ CoinGecko ошибка: {e}")
-    else:
-        report["apis"]["coingecko"] = {"status": "skip", "reason": "no key"}
+        # Реестр symbol → id провайдеров: каждый провайдер загружается один раз, списки монет — из http_cache
+        print("\n🧭 Строю реестр символов...")
+        registry = await symbol_registry.load(
+            gecko=clients["coingecko"] if connected.get("coingecko") else None,
+            cmc=clients["cmc"] if connected.get("cmc") else None,
+            coindar=clients["coindar"] if connected.get("coindar") else None,
+        )
+        print(f"✅ {len(registry):,} символов")
 
-    # 3C: CMC
-    if api_status.get("cmc"):
-        try:
-            explore_cmc(report)
-        except Exception as e:
-            report["apis"]["coinmarketcap"] = {"status": "error", "reason": str(e)}
-            print(f"❌ CoinMarketCap ошибка: {e}")
-    else:
-        report["apis"]["coinmarketcap"] = {"status": "skip", "reason": "no key"}
+        # 3A: Coindar
+        if api_status.get("coindar"):
+            try:
+                await explore_coindar(
+                    clients["coindar"], bool(connected["coindar"]), report
+                )
+            except Exception as e:
+                report["apis"]["coindar"] = {"status": "error", "reason": str(e)}
+                print(f"❌ Coindar ошибка: {e}")
+        else:
+            report["apis"]["coindar"] = {"status": "skip", "reason": "no key"}
+
+        # 3B: CoinGecko
+        if api_status.get("coingecko"):
+            try:
+                await explore_coingecko(
+                    clients["coingecko"], bool(connected["coingecko"]), report
+                )
+            except Exception as e:
+                report["apis"]["coingecko"] = {"status": "error", "reason": str(e)}
+                print(f"❌ CoinGecko ошибка: {e}")
+        else:
+            report["apis"]["coingecko"] = {"status": "skip", "reason": "no key"}
+
+        # 3C: CMC
+        if api_status.get("cmc"):
+            try:
+                await explore_cmc(clients["cmc"], connected["cmc"], report)
+            except Exception as e:
+                report["apis"]["coinmarketcap"] = {"status": "error", "reason": str(e)}
+                print(f"❌ CoinMarketCap ошибка: {e}")
+        else:
+            report["apis"]["coinmarketcap"] = {"status": "skip", "reason": "no key"}
 
     # 3D: Snapshot
     try:
@@ -846,7 +880,7 @@ def main() -> None:
 
 if __name__ == "__main__":
     try:
-        main()
+        db.run_async(main())
     except KeyboardInterrupt:
         print("\n⛔ Прервано пользователем")
         sys.exit(0)
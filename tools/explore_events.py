@@ -12,7 +12,9 @@ from datetime import datetime, timedelta
 from tabulate import tabulate
 
 import config
+from database.db import run_async
 from services.coinmarketcal_events import CoinMarketCalClient
+from services.http_client import make_http_client
 
 
 # ---------------------------------------------------------------------------
@@ -93,24 +95,24 @@ def step_validate() -> None:
     print(f"✅ RAPIDAPI_KEY задан ({config.RAPIDAPI_KEY[:8]}...)")
 
 
-def step_check_connection(client: CoinMarketCalClient) -> bool:
+async def step_check_connection(client: CoinMarketCalClient) -> bool:
     """Шаг 2: Проверка подключения."""
     print("\n🔌 Проверяю CoinMarketCal через RapidAPI...")
-    if not client.check_connection():
+    if not await client.check_connection():
         print("❌ Подключение не удалось")
         return False
     print("✅ Подключение OK")
     return True
 
 
-def step_categories(
+async def step_categories(
     client: CoinMarketCalClient, report: dict
 ) -> None:
     """Шаг 3: Загрузка категорий."""
     print("\n" + "=" * 50)
     print("📋 GET /categories")
 
-    raw = client.get_categories()
+    raw = await client.get_categories()
     items, path_desc = _extract_list(raw)
 
     print(f"✅ Ответ получен. Тип: {path_desc}, кол-во: {len(items)}")
@@ -130,14 +132,14 @@ def step_categories(
     report["categories_fields"] = {r[0]: r[1] for r in fields}
 
 
-def step_coins(
+async def step_coins(
     client: CoinMarketCalClient, report: dict
 ) -> None:
     """Шаг 4: Загрузка монет."""
     print("\n" + "=" * 50)
     print("🪙 GET /coins?page=1&max=20")
 
-    raw = client.get_coins(page=1, max_results=20)
+    raw = await client.get_coins(page=1, max_results=20)
     items, path_desc = _extract_list(raw)
 
     print(f"✅ Ответ получен. Тип: {path_desc}, кол-во: {len(items)}")
@@ -155,7 +157,7 @@ def step_coins(
     # Проверка пагинации — запрос page=2
     has_pagination = False
     try:
-        raw2 = client.get_coins(page=2, max_results=20)
+        raw2 = await client.get_coins(page=2, max_results=20)
         items2, _ = _extract_list(raw2)
         has_pagination = len(items2) > 0
         print(f"\n🪙 Пагинация (page=2): {'✅ есть' if has_pagination else '❌ нет'}"
@@ -169,14 +171,14 @@ def step_coins(
     report["coins_pagination"] = has_pagination
 
 
-def step_events_raw(
+async def step_events_raw(
     client: CoinMarketCalClient, report: dict
 ) -> None:
     """Шаг 5: Загрузка событий без фильтров."""
     print("\n" + "=" * 50)
     print("📅 GET /events (без фильтров, первая страница)")
 
-    raw = client.get_events(page=1, max_results=50)
+    raw = await client.get_events(page=1, max_results=50)
     items, path_desc = _extract_list(raw)
 
     print(f"✅ Ответ получен. Тип: {path_desc}, кол-во: {len(items)}")
@@ -197,7 +199,7 @@ def step_events_raw(
     report["events_fields"] = {r[0]: r[1] for r in fields}
 
 
-def step_events_by_date(
+async def step_events_by_date(
     client: CoinMarketCalClient, report: dict
 ) -> None:
     """Шаг 6: Загрузка событий с фильтром по дате."""
@@ -219,7 +221,7 @@ def step_events_by_date(
     # Попытка 1: dd/mm/yyyy
     print(f"📅 GET /events?dateRangeStart={date_start_dmy}&dateRangeEnd={date_end_dmy}")
     try:
-        raw = client.get_events(
+        raw = await client.get_events(
             dateRangeStart=date_start_dmy, dateRangeEnd=date_end_dmy
         )
         items, _ = _extract_list(raw)
@@ -236,7 +238,7 @@ def step_events_by_date(
     if not date_filter_works:
         print(f"\n📅 GET /events?dateRangeStart={date_start_iso}&dateRangeEnd={date_end_iso}")
         try:
-            raw = client.get_events(
+            raw = await client.get_events(
                 dateRangeStart=date_start_iso, dateRangeEnd=date_end_iso
             )
             items, _ = _extract_list(raw)
@@ -256,7 +258,7 @@ def step_events_by_date(
     report["filter_date_format"] = date_format_used
 
 
-def step_events_by_coin(
+async def step_events_by_coin(
     client: CoinMarketCalClient, report: dict
 ) -> None:
     """Шаг 7: Загрузка событий по монете."""
@@ -268,7 +270,7 @@ def step_events_by_coin(
     # Попытка 1: coins=bitcoin
     print("📅 GET /events?coins=bitcoin")
     try:
-        raw = client.get_events(coins="bitcoin")
+        raw = await client.get_events(coins="bitcoin")
         items, _ = _extract_list(raw)
         if items:
             coin_filter_works = True
@@ -283,7 +285,7 @@ def step_events_by_coin(
     if not coin_filter_works:
         print("\n📅 GET /events?coins=btc")
         try:
-            raw = client.get_events(coins="btc")
+            raw = await client.get_events(coins="btc")
             items, _ = _extract_list(raw)
             if items:
                 coin_filter_works = True
@@ -298,7 +300,7 @@ def step_events_by_coin(
     if not coin_filter_works:
         print("\n📅 GET /events?coins=1")
         try:
-            raw = client.get_events(coins="1")
+            raw = await client.get_events(coins="1")
             items, _ = _extract_list(raw)
             if items:
                 coin_filter_works = True
@@ -475,7 +477,7 @@ def _make_serializable(data: object) -> object:
 # main
 # ---------------------------------------------------------------------------
 
-def main() -> None:
+async def main() -> None:
     """Точка входа explore_events.py."""
     print("🚀 CoinMarketCal Events Explorer")
     print(f"   Дата: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -486,57 +488,59 @@ def main() -> None:
     step_validate()
 
     # Клиент
-    client = CoinMarketCalClient(
-        rapidapi_key=config.RAPIDAPI_KEY,
-        host=config.COINMARKETCAL_HOST,
-        base_url=config.COINMARKETCAL_BASE_URL,
-        timeout=config.REQUEST_TIMEOUT,
-        delay=config.DEFAULT_DELAY,
-    )
+    async with make_http_client(config.REQUEST_TIMEOUT) as http:
+        client = CoinMarketCalClient(
+            http,
+            rapidapi_key=config.RAPIDAPI_KEY,
+            host=config.COINMARKETCAL_HOST,
+            base_url=config.COINMARKETCAL_BASE_URL,
+            timeout=config.REQUEST_TIMEOUT,
+            delay=config.DEFAULT_DELAY,
+        )
 
-    # Шаг 2
-    connected = step_check_connection(client)
-    report["connection"] = connected
-    if not connected:
-        text_report = build_summary(report)
-        print(text_report)
-        save_reports(report, text_report)
-        sys.exit(1)
+        # Шаг 2
+        connected = await step_check_connection(client)
+        report["connection"] = connected
+        if not connected:
+            text_report = build_summary(report)
+            print(text_report)
+            save_reports(report, text_report)
+            sys.exit(1)
 
-    # Шаг 3: Категории
-    try:
-        step_categories(client, report)
-    except Exception as e:
-        print(f"❌ Категории ошибка: {e}")
-        report["categories_count"] = 0
+        # Шаг 3: Категории
+        try:
+            await step_categories(client, report)
+        except Exception as e:
+            print(f"❌ Категории ошибка: {e}")
+            report["categories_count"] = 0
 
-    # Шаг 4: Монеты
-    try:
-        step_coins(client, report)
-    except Exception as e:
-        print(f"❌ Монеты ошибка: {e}")
-        report["coins_count"] = 0
+        # Шаг 4: Монеты
+        try:
+            await step_coins(client, report)
+        except Exception as e:
+            print(f"❌ Монеты ошибка: {e}")
+            report["coins_count"] = 0
 
-    # Шаг 5: События (raw)
-    try:
-        step_events_raw(client, report)
-    except Exception as e:
-        print(f"❌ События ошибка: {e}")
-        report["events_count"] = 0
+        # Шаг 5: События (raw)
+        try:
+            await step_events_raw(client, report)
+        except Exception as e:
+            print(f"❌ События ошибка: {e}")
+            report["events_count"] = 0
 
-    # Шаг 6: События с фильтром по дате
-    try:
-        step_events_by_date(client, report)
-    except Exception as e:
-        print(f"❌ Фильтр по дате ошибка: {e}")
-        report["filter_date_works"] = False
+        # Шаг 6: События с фильтром по дате
+        try:
+            await step_events_by_date(client, report)
+        except Exception as e:
+            print(f"❌ Фильтр по дате ошибка: {e}")
+            report["filter_date_works"] = False
 
-    # Шаг 7: События с фильтром по монете
-    try:
-        step_events_by_coin(client, report)
-    except Exception as e:
-        print(f"❌ Фильтр по монете ошибка: {e}")
-        report["filter_coin_works"] = False
+        # Шаг 7: События с фильтром по монете
+        try:
+            await step_events_by_coin(client, report)
+        except Exception as e:
+            print(f"❌ Фильтр по монете ошибка: {e}")
+            report["filter_coin_works"] = False
 
     # Шаг 8: Сводка
     text_report = build_summary(report)
@@ -550,7 +554,7 @@ def main() -> None:
 
 if __name__ == "__main__":
     try:
-        main()
+        run_async(main())
     except KeyboardInterrupt:
         print("\n⛔ Прервано пользователем")
         sys.exit(0)
@@ -1,12 +1,12 @@
-"""Тест оценки ценового влияния: события → 3x Groq → медиана → save."""
+"""Тест оценки ценового влияния: события пачками → 3x Groq на пачку → медиана → save."""
 
-import asyncio, logging, os, sqlite3, sys, time, traceback  # noqa: E401
+import logging, os, sys, time, traceback  # noqa: E401
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-import aiosqlite  # noqa: E402
-from config import DB_PATH
-from database.db import (ensure_impact_columns, get_events_without_impacts,
-                         get_outcomes_for_event, update_outcome_impact)
-from services.impact_estimator import estimate_event_impacts
+from config import DB_PATH, IMPACT_BATCH_SIZE
+from database.db import (async_connection, ensure_outcome_extra_columns,
+                         get_events_without_impacts, get_outcomes_for_event,
+                         run_async, update_outcome_impact)
+from services.impact_estimator import estimate_batch_impacts
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 SEP = "\u2550" * 50
@@ -17,10 +17,8 @@ async def main():
           f"\nБД: {os.path.abspath(str(DB_PATH))}\n{SEP}")
     t0 = time.time()
 
-    async with aiosqlite.connect(str(DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
-        await ensure_impact_columns(db)
+    async with async_connection() as db:
+        await ensure_outcome_extra_columns(db)
 
         events = await get_events_without_impacts(db, limit=10)
         if not events:
@@ -30,20 +28,23 @@ async def main():
         print(f"\nСобытий без ценовых оценок: {len(events)}\n")
         st = {"ok": 0, "err": 0, "groq": 0, "previews": []}
 
-        for i, event in enumerate(events, 1):
+        # Исходы всех событий → одна оценка пачками
+        items = []
+        for event in events:
+            rows = await get_outcomes_for_event(db, event["id"])
+            if rows:
+                items.append((event, [dict(r) for r in rows]))
+        batches = -(-len(items) // IMPACT_BATCH_SIZE)
+        st["groq"] = 3 * batches
+        results = await estimate_batch_impacts(items) if items else []
+
+        for i, ((event, outcomes), result) in enumerate(zip(items, results), 1):
             eid = event["id"]
             coin, etype = event["coin_symbol"], event["event_type"]
             imp = event.get("importance", "?")
-            print(f"[{i}/{len(events)}] {coin} | {etype} | {imp}")
+            print(f"[{i}/{len(items)}] {coin} | {etype} | {imp}")
 
             try:
-                rows = await get_outcomes_for_event(db, eid)
-                if not rows:
-                    print("  No outcomes, skip\n"); continue
-                outcomes = [dict(r) for r in rows]
-                st["groq"] += 3
-
-                result = await estimate_event_impacts(event, outcomes)
                 if not result:
                     print("  \u274c Не удалось оценить\n"); st["err"] += 1; continue
 
@@ -75,7 +76,7 @@ async def main():
         for label, val in [("Событий:", len(events)), ("Оценено:", st["ok"]),
                            ("Ошибки:", st["err"]),
                            ("Groq вызовов:",
-                            f"{st['groq']} (3 \u00d7 {st['ok']+st['err']})"),
+                            f"{st['groq']} (3 \u00d7 {batches} пачек, без fallback)"),
                            ("Время:", f"{elapsed:.0f} сек")]:
             print(f"  {label:20s} {val}")
 
@@ -87,4 +88,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
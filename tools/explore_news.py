@@ -5,6 +5,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import asyncio
 import json
 import os
 from datetime import datetime
@@ -18,6 +19,7 @@ from services.news_cryptopanic import CryptoPanicClient
 from services.news_binance import BinanceAnnouncementsClient
 from services.news_google import GoogleNewsClient
 from services.event_extractor import EventExtractor
+from services.http_client import make_http_client
 
 
 # ---------------------------------------------------------------------------
@@ -96,19 +98,24 @@ def explore_cryptocv(report: dict) -> list[dict]:
     client = CryptoCVClient(
         base_url=config.CRYPTOCV_NEWS_URL,
         timeout=config.REQUEST_TIMEOUT,
-        delay=config.CRYPTOCV_DELAY,
+        policy=config.CRYPTOCV_POLICY,
     )
 
-    print("🔌 Проверяю подключение...")
-    if not client.check_connection():
+    # Проверка и загрузка — одним event loop на общем httpx-клиенте
+    async def _fetch() -> list[dict] | None:
+        async with make_http_client(client.timeout) as http:
+            if not await client.check_connection_async(http):
+                return None
+            return await client.get_latest_news_async(http, limit=50)
+
+    print("🔌 Проверяю подключение и загружаю последние новости...")
+    raw_items = db.run_async(_fetch())
+    client.close()
+    if raw_items is None:
         print("❌ Подключение не удалось")
         report["sources"]["cryptocv"] = {"status": "error", "count": 0}
         return []
-    print("✅ OK")
-
-    print("\n📰 Загружаю последние новости...")
-    raw_items = client.get_latest_news(limit=50)
-    print(f"✅ Получено: {len(raw_items)} новостей")
+    print(f"✅ OK, получено: {len(raw_items)} новостей")
 
     if raw_items:
         print(f"\n📰 RAW (первые 2):")
@@ -173,25 +180,28 @@ def explore_cryptopanic(report: dict) -> list[dict]:
         auth_token=config.CRYPTOPANIC_TOKEN,
         base_url=config.CRYPTOPANIC_BASE_URL,
         timeout=config.REQUEST_TIMEOUT,
-        delay=config.CRYPTOPANIC_DELAY,
+        policy=config.CRYPTOPANIC_POLICY,
     )
 
-    print("🔌 Проверяю подключение...")
-    if not client.check_connection():
+    # Важные и все последние — параллельно, страницы каждой ленты тоже
+    async def _fetch() -> list[list[dict]] | None:
+        async with make_http_client(client.timeout) as http:
+            if not await client.check_connection_async(http):
+                return None
+            return await asyncio.gather(
+                client.get_latest_news_async(http, filter_type="important", limit=30),
+                client.get_latest_news_async(http, limit=50),
+            )
+
+    print("🔌 Проверяю подключение и загружаю важные (filter=important) и все последние...")
+    feeds = db.run_async(_fetch())
+    client.close()
+    if feeds is None:
         print("❌ Подключение не удалось")
         report["sources"]["cryptopanic"] = {"status": "error", "count": 0}
         return []
-    print("✅ OK")
-
-    # Важные новости
-    print("\n📰 Загружаю важные новости (filter=important)...")
-    important = client.get_important_news(limit=30)
-    print(f"✅ Получено: {len(important)} важных")
-
-    # Все последние
-    print("\n📰 Загружаю все последние...")
-    latest = client.get_latest_news(limit=50)
-    print(f"✅ Получено: {len(latest)} последних")
+    important, latest = feeds
+    print(f"✅ OK, получено: {len(important)} важных, {len(latest)} последних")
 
     if latest:
         print(f"\n📰 RAW (первые 2):")
@@ -249,7 +259,7 @@ def explore_binance(report: dict) -> list[dict]:
 
     client = BinanceAnnouncementsClient(
         timeout=config.REQUEST_TIMEOUT,
-        delay=config.BINANCE_DELAY,
+        policy=config.BINANCE_POLICY,
     )
 
     print("🔌 Проверяю подключение...")
@@ -259,19 +269,18 @@ def explore_binance(report: dict) -> list[dict]:
         return []
     print("✅ OK")
 
-    all_articles: list[dict] = []
+    # Листинги и делистинги — параллельно, один httpx-клиент
+    print("\n📰 Загружаю листинги (catalogId=48) и делистинги (catalogId=131)...")
 
-    # Листинги
-    print("\n📰 Загружаю листинги (catalogId=48)...")
-    listings = client.get_listings(page_size=20)
-    print(f"✅ Получено: {len(listings)}")
-    all_articles.extend(listings)
+    async def _fetch() -> dict[str, list[dict]]:
+        async with make_http_client(config.REQUEST_TIMEOUT) as http:
+            return await client.get_all_async(
+                http, page_size=20, catalogs=("listings", "delistings"))
 
-    # Делистинги
-    print("\n📰 Загружаю делистинги (catalogId=131)...")
-    delistings = client.get_delistings(page_size=20)
-    print(f"✅ Получено: {len(delistings)}")
-    all_articles.extend(delistings)
+    pages = db.run_async(_fetch())
+    listings, delistings = pages["listings"], pages["delistings"]
+    print(f"✅ Листинги: {len(listings)}, делистинги: {len(delistings)}")
+    all_articles: list[dict] = listings + delistings
 
     if all_articles:
         print(f"\n📰 RAW (первые 2):")
@@ -330,7 +339,7 @@ def explore_google_news(report: dict) -> list[dict]:
 
     client = GoogleNewsClient(
         base_url=config.GOOGLE_NEWS_RSS_BASE,
-        delay=config.GOOGLE_NEWS_DELAY,
+        policy=config.GOOGLE_NEWS_POLICY,
         max_total=config.MAX_GOOGLE_NEWS_TOTAL,
     )
 
@@ -345,7 +354,13 @@ def explore_google_news(report: dict) -> list[dict]:
     for q in config.GOOGLE_NEWS_QUERIES:
         print(f"   • {q}")
 
-    all_entries = client.fetch_all(config.GOOGLE_NEWS_QUERIES)
+    # Запросы параллельно через один httpx-клиент
+    async def _fetch() -> list[dict]:
+        async with make_http_client(client.timeout) as http:
+            return await client.fetch_all_async(
+                http, config.GOOGLE_NEWS_QUERIES, urls=config.GOOGLE_NEWS_URLS)
+
+    all_entries = db.run_async(_fetch())
     print(f"✅ Получено: {len(all_entries)} новостей (дедупликация по title)")
 
     if all_entries:
@@ -406,58 +421,58 @@ def _convert_google(entry: dict) -> dict:
 # Шаг 4: AI Event Extraction
 # ---------------------------------------------------------------------------
 
-def explore_ai_extraction(report: dict) -> None:
-    """AI-парсинг новостей через Groq."""
+async def explore_ai_extraction(report: dict) -> None:
+    """AI-парсинг новостей через Groq (чанки параллельно)."""
     print("\n══════════════ AI EVENT EXTRACTION ══════════════")
 
-    extractor = EventExtractor(
-        api_key=config.GROQ_API_KEY,
-        api_url=config.GROQ_API_URL,
-        model=config.GROQ_MODEL,
-        delay=config.GROQ_DELAY,
-        timeout=30,
-    )
-
-    print("🔌 Проверяю Groq API...")
-    if not extractor.check_connection():
-        print("❌ Groq API не отвечает")
-        report["ai"] = {"status": "error"}
-        return
-    print(f"✅ Groq OK (модель: {config.GROQ_MODEL})")
-
-    # Загрузить необработанные новости
-    print("\n🤖 Обрабатываю непроцессированные новости...")
-    unprocessed = db.get_unprocessed_news(limit=100)
-    print(f"   Новостей для обработки: {len(unprocessed)}")
-
-    if not unprocessed:
-        print("   Нет новых новостей для обработки")
-        report["ai"] = {"status": "ok", "processed": 0, "events": 0}
-        return
-
-    # Подготовка для AI
-    news_for_ai: list[dict] = []
-    news_ids: list[int] = []
-    for n in unprocessed:
-        tickers = n.get("tickers", "")
-        ticker_list = [t.strip() for t in tickers.split(",") if t.strip()]
-        news_for_ai.append({
-            "title": n["title"],
-            "url": n.get("url", ""),
-            "source": n.get("domain", n.get("source", "")),
-            "domain": n.get("domain", ""),
-            "published_at": n.get("published_at", ""),
-            "tickers": ticker_list,
-        })
-        news_ids.append(n["id"])
-
-    # Извлечение событий
-    extracted = extractor.extract_events(news_for_ai)
-
-    # Пометить обработанными
-    db.mark_news_processed(news_ids)
-
-    # Конвертация в events и сохранение
+    # Один httpx-клиент на все чанки (HTTP/2, keep-alive)
+    async with make_http_client(30) as http:
+        extractor = EventExtractor(
+            http,
+            api_key=config.GROQ_API_KEY,
+            api_url=config.GROQ_API_URL,
+            model=config.GROQ_MODEL,
+            policy=config.GROQ_POLICY,
+            timeout=30,
+        )
+
+        print("🔌 Проверяю Groq API...")
+        if not await extractor.check_connection():
+            print("❌ Groq API не отвечает")
+            report["ai"] = {"status": "error"}
+            return
+        print(f"✅ Groq OK (модель: {config.GROQ_MODEL})")
+
+        # Загрузить необработанные новости
+        print("\n🤖 Обрабатываю непроцессированные новости...")
+        unprocessed = db.get_unprocessed_news(limit=100)
+        print(f"   Новостей для обработки: {len(unprocessed)}")
+
+        if not unprocessed:
+            print("   Нет новых новостей для обработки")
+            report["ai"] = {"status": "ok", "processed": 0, "events": 0}
+            return
+
+        # Подготовка для AI
+        news_for_ai: list[dict] = []
+        news_ids: list[int] = []
+        for n in unprocessed:
+            tickers = n.get("tickers", "")
+            ticker_list = [t.strip() for t in tickers.split(",") if t.strip()]
+            news_for_ai.append({
+                "title": n["title"],
+                "url": n.get("url", ""),
+                "source": n.get("domain", n.get("source", "")),
+                "domain": n.get("domain", ""),
+                "published_at": n.get("published_at", ""),
+                "tickers": ticker_list,
+            })
+            news_ids.append(n["id"])
+
+        # Извлечение событий
+        extracted = await extractor.extract_events(news_for_ai)
+
+    # Конвертация в events
     events_to_save: list[dict] = []
     for ev in extracted:
         ni = ev.get("news_index")
@@ -476,7 +491,10 @@ def explore_ai_extraction(report: dict) -> None:
             "news_id": news_id,
         })
 
-    saved = db.upsert_events(events_to_save)
+    # Пометить обработанными и сохранить события одной транзакцией
+    with db.db_scope() as conn:
+        db.mark_news_processed(news_ids, conn=conn)
+        saved = db.upsert_events(events_to_save, conn=conn)
 
     # Статистика
     from collections import Counter
@@ -713,7 +731,7 @@ def main() -> None:
     # Шаг 4: AI
     if api_status.get("groq"):
         try:
-            explore_ai_extraction(report)
+            db.run_async(explore_ai_extraction(report))
         except Exception as e:
             report["ai"] = {"status": "error"}
             print(f"❌ AI-парсинг ошибка: {e}")
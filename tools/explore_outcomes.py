@@ -1,20 +1,18 @@
 """Тест генерации исходов: создаёт тестовые события, генерирует исходы, выводит результат."""
 
-import asyncio
 import logging
 import os
-import sqlite3
 import sys
 import traceback
 
 # Добавить корень проекта в path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-import aiosqlite
-
 from database.db import (
+    async_connection,
     ensure_outcome_tables,
     get_unprocessed_events,
+    run_async,
     save_event,
     save_outcomes,
 )
@@ -52,9 +50,7 @@ async def main():
     print(f"\nБД: {os.path.abspath(db_path)}")
     print("═══ Генерация исходов ══════════════════════════════\n")
 
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
+    async with async_connection() as db:
         await ensure_outcome_tables(db)
 
         # Вставить тестовые если таблица пуста
@@ -114,4 +110,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
@@ -1,11 +1,11 @@
 """Тест оценки вероятностей: события с исходами → 3x Groq → медиана → save."""
 
-import asyncio, logging, os, sqlite3, sys, time, traceback  # noqa: E401
+import logging, os, sys, time, traceback  # noqa: E401
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-import aiosqlite  # noqa: E402
 from config import DB_PATH
-from database.db import (ensure_probability_columns, get_events_with_outcomes,
-                         get_outcomes_for_event, update_outcome_probability)
+from database.db import (async_connection, ensure_outcome_extra_columns,
+                         get_events_with_outcomes, get_outcomes_for_event,
+                         run_async, update_outcome_probability)
 from services.probability_estimator import estimate_event_probabilities
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -16,10 +16,8 @@ async def main():
     print(f"\n{SEP}\nPROBABILITY ESTIMATION (Step 3)\nDB: {os.path.abspath(str(DB_PATH))}\n{SEP}")
     t0 = time.time()
 
-    async with aiosqlite.connect(str(DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
-        await ensure_probability_columns(db)
+    async with async_connection() as db:
+        await ensure_outcome_extra_columns(db)
 
         events = await get_events_with_outcomes(db, limit=10)
         if not events:
@@ -92,4 +90,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
@@ -1,13 +1,13 @@
 """Тест сканера токенов: Parallel Search → Groq AI → events_v2."""
 
-import asyncio, logging, os, sqlite3, sys, time  # noqa: E401
+import logging, os, sys, time  # noqa: E401
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-import aiosqlite, httpx  # noqa: E401
 import config
-from database.db import ensure_outcome_tables
+from database.db import async_connection, ensure_outcome_tables, run_async
 from services.binance_tokens import get_futures_tokens
 from services.groq_client import GroqAPIError
-from services.parallel_client import search_token_events
+from services.http_client import make_http_client
+from services.parallel_client import search_many
 from services.token_scanner import _process_results
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -21,10 +21,8 @@ async def main():
     if not config.PARALLEL_API_KEY:
         print("\nPARALLEL_API_KEY not set in .env"); return
     t0 = time.time()
-    async with httpx.AsyncClient() as http, \
-               aiosqlite.connect(str(config.DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
+    async with make_http_client() as http, \
+               async_connection() as db:
         await ensure_outcome_tables(db)
         tokens = await get_futures_tokens(http, exclude=config.TOP_EXCLUDE)
         if not tokens:
@@ -40,15 +38,16 @@ async def main():
             print(f"Mode: test ({len(scan_list)} tokens)\n")
         st = {"res": 0, "groq": 0, "found": 0, "new": 0, "dup": 0, "err": 0}
         seen: set[str] = set()
+        searched = await search_many(
+            http, scan_list, config.PARALLEL_API_KEY, config.PARALLEL_MAX_RESULTS,
+            config.PARALLEL_MAX_CHARS, config.PARALLEL_CONCURRENCY)
         for i, token in enumerate(scan_list, 1):
             print(f"[{i}/{len(scan_list)}] {token}")
             try:
-                results = await search_token_events(
-                    http, token, config.PARALLEL_API_KEY,
-                    config.PARALLEL_MAX_RESULTS, config.PARALLEL_MAX_CHARS)
+                results = searched.get(token, [])
                 print(f"  Parallel: {len(results)} results")
                 if not results:
-                    print("  -> skip\n"); await asyncio.sleep(config.PARALLEL_DELAY); continue
+                    print("  -> skip\n"); continue
                 st["res"] += 1; st["groq"] += 1
                 events = await _process_results(token, results, db)
                 print(f"  Groq: {len(events)} events")
@@ -67,7 +66,6 @@ async def main():
             except Exception as e:
                 print(f"  Error: {e}"); st["err"] += 1
             print()
-            await asyncio.sleep(config.PARALLEL_DELAY)
         cur = await db.execute("SELECT COUNT(*) as cnt FROM events_v2")
         row = await cur.fetchone()
         db_cnt = row["cnt"] if row else 0
@@ -83,4 +81,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
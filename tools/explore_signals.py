@@ -1,9 +1,9 @@
 """Тест сигналов: E[return] + торговые сигналы по данным из БД."""
 
-import asyncio, logging, os, sqlite3, sys, time  # noqa: E401
+import logging, os, sys, time  # noqa: E401
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-import aiosqlite  # noqa: E402
 from config import DB_PATH, SIGNAL_THRESHOLD
+from database.db import async_connection, run_async
 from services.signal_calculator import generate_all_signals
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -16,10 +16,7 @@ async def main():
           f"\n\u041f\u043e\u0440\u043e\u0433: \u00b1{SIGNAL_THRESHOLD}%\n{SEP}")
     t0 = time.time()
 
-    async with aiosqlite.connect(str(DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
-
+    async with async_connection() as db:
         signals = await generate_all_signals(db, limit=50)
         if not signals:
             print("\n\u26a0\ufe0f  \u041d\u0435\u0442 \u0434\u0430\u043d\u043d\u044b\u0445 \u0441 \u043f\u043e\u043b\u043d\u044b\u043c\u0438 \u043e\u0446\u0435\u043d\u043a\u0430\u043c\u0438")
@@ -81,4 +78,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
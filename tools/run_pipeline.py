@@ -1,17 +1,17 @@
 """CryptoScanner — полный пайплайн: 6 шагов от поиска до сигналов."""
-import asyncio, logging, os, sqlite3, sys, time, traceback  # noqa: E401
+import asyncio, logging, os, sys, time, traceback  # noqa: E401
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-import aiosqlite, httpx  # noqa: E402
 import config
-from database.db import (ensure_outcome_tables, ensure_probability_columns,
-    ensure_impact_columns, get_unprocessed_events, get_events_with_outcomes,
+from database.db import (async_connection, ensure_outcome_tables, ensure_outcome_extra_columns,
+    get_unprocessed_events, run_async, get_events_with_outcomes,
     get_events_without_impacts, get_outcomes_for_event, save_outcomes,
     update_outcome_probability, update_outcome_impact)
 from services.binance_tokens import get_futures_tokens
+from services.http_client import make_http_client
 from services.token_scanner import scan_single_token
 from services.outcome_generator import generate_outcomes, validate_outcomes
 from services.probability_estimator import estimate_event_probabilities
-from services.impact_estimator import estimate_event_impacts
+from services.impact_estimator import estimate_batch_impacts
 from services.signal_calculator import generate_all_signals
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -38,6 +38,23 @@ async def _run_estimate(db, events, est_fn, upd_fn, val_key):
         except Exception as e:
             logging.warning(f"Estimate {ev.get('coin_symbol')}: {e}")
     return groq
+async def _run_impacts(db, events):
+    """Шаг 4: исходы всех событий → estimate_batch_impacts (пачками) → update. Returns groq_calls."""
+    items = []
+    for ev in events:
+        try:
+            rows = await get_outcomes_for_event(db, ev["id"])
+            if rows: items.append((ev, [dict(r) for r in rows]))
+        except Exception as e:
+            logging.warning(f"Estimate {ev.get('coin_symbol')}: {e}")
+    if not items: return 0
+    for (ev, outs), res in zip(items, await estimate_batch_impacts(items)):
+        for o in outs:
+            r = res.get(o["outcome_key"])
+            if r:
+                await update_outcome_impact(db, ev["id"], o["outcome_key"],
+                                            r["impact"], r["low"], r["high"])
+    return 3 * -(-len(items) // config.IMPACT_BATCH_SIZE)
 async def main():
     full = "--full" in sys.argv
     mode = f"full (50 токенов)" if full else f"test ({len(TEST_TOKENS)} токенов)"
@@ -49,13 +66,10 @@ async def main():
         print("\u274c GROQ_API_KEY не задан"); return
 
     t_all, groq_all, n_tok = time.time(), 0, 0
-    async with httpx.AsyncClient() as http, \
-               aiosqlite.connect(str(config.DB_PATH)) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
+    async with make_http_client() as http, \
+               async_connection() as db:
         await ensure_outcome_tables(db)
-        await ensure_probability_columns(db)
-        await ensure_impact_columns(db)
+        await ensure_outcome_extra_columns(db)
 
         t1, ev_new = time.time(), 0  # Step 1: scan tokens
         try:
@@ -107,8 +121,10 @@ async def main():
             evts4 = await get_events_without_impacts(db, limit=100)
         except Exception as e:
             evts4 = []; print(f"  Шаг 4 ошибка: {e}")
-        g4 = await _run_estimate(db, evts4, estimate_event_impacts,
-                                 update_outcome_impact, "impact")
+        try:
+            g4 = await _run_impacts(db, evts4)
+        except Exception as e:
+            g4 = 0; print(f"  Шаг 4 ошибка: {e}")
         groq_all += g4
         print(f"Шаг 4: Оценка ценового влияния ... {len(evts4)} событий, "
               f"{g4} Groq вызовов      [{_ft(time.time()-t4)}]")
@@ -147,4 +163,4 @@ async def main():
             print(f"  {str(lbl):20s} {v}")
         print(SEP)
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
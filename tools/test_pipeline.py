@@ -1,12 +1,13 @@
 """CryptoScanner — тест пайплайна: Новости → События → Исходы."""
-import asyncio, logging, os, sqlite3, sys, traceback
+import logging, os, sys, traceback
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-import aiosqlite
 import config
-from database.db import ensure_outcome_tables, get_unprocessed_events, save_event, save_outcomes
+from database.db import (async_connection, ensure_outcome_tables, get_unprocessed_events,
+                         run_async, save_event, save_outcomes)
 from services.event_extractor import EventExtractor
+from services.http_client import make_http_client
 from services.news_binance import BinanceAnnouncementsClient
 from services.outcome_generator import generate_outcomes, validate_outcomes
 from services.outcome_templates import OUTCOME_TEMPLATES
@@ -16,10 +17,10 @@ MAX_ARTICLES = 5
 MAX_EVENTS = 10
 
 
-def step1_collect() -> tuple[list[dict], list[dict]]:
-    """Шаг 1 (sync): сбор статей Binance + извлечение событий через Groq."""
+async def step1_collect() -> tuple[list[dict], list[dict]]:
+    """Шаг 1: сбор статей Binance (sync) + извлечение событий через Groq (async)."""
     client = BinanceAnnouncementsClient(
-        timeout=config.REQUEST_TIMEOUT, delay=config.BINANCE_DELAY,
+        timeout=config.REQUEST_TIMEOUT, policy=config.BINANCE_POLICY,
     )
     articles = client.get_listings(page_size=20)
     if not articles:
@@ -33,11 +34,12 @@ def step1_collect() -> tuple[list[dict], list[dict]]:
             "title": title, "url": url, "source": "binance.com",
             "domain": "binance.com", "published_at": "", "tickers": [],
         })
-    extractor = EventExtractor(
-        api_key=config.GROQ_API_KEY, api_url=config.GROQ_API_URL,
-        model=config.GROQ_MODEL, delay=config.GROQ_DELAY, timeout=30,
-    )
-    return articles, extractor.extract_events(news_for_ai)
+    async with make_http_client(30) as http:
+        extractor = EventExtractor(
+            http, api_key=config.GROQ_API_KEY, api_url=config.GROQ_API_URL,
+            model=config.GROQ_MODEL, policy=config.GROQ_POLICY, timeout=30,
+        )
+        return articles, await extractor.extract_events(news_for_ai)
 
 
 async def main() -> None:
@@ -46,9 +48,9 @@ async def main() -> None:
     print("ТЕСТ ПАЙПЛАЙНА: Новости → События → Исходы")
     print(f"БД: {os.path.abspath(db_path)}")
     print("══════════════════════════════════════════════════")
-    # --- Шаг 1 (sync) ---
+    # --- Шаг 1 ---
     print("\n📡 Шаг 1: Сбор новостей...")
-    articles, extracted = step1_collect()
+    articles, extracted = await step1_collect()
     print(f"  Статей получено: {len(articles)}")
     if not articles:
         print("  ❌ Нет статей (проверь интернет)")
@@ -61,9 +63,7 @@ async def main() -> None:
     for ev in extracted[:MAX_EVENTS]:
         print(f"  → {ev.get('coin_symbol','?')} | {ev.get('event_type','?')} | {ev.get('title','?')[:50]}")
     # --- Шаг 2 (async) ---
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = sqlite3.Row
-        await db.execute("PRAGMA journal_mode=WAL")
+    async with async_connection() as db:
         await ensure_outcome_tables(db)
         saved = 0
         for ev in extracted[:MAX_EVENTS]:
@@ -115,4 +115,4 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())